@@ -1,1412 +1,1558 @@
-import streamlit as st
-import pandas as pd
-import tempfile
-import os
-from datetime import datetime
-import math
-import base64
-from io import BytesIO
-
-def check_expiry():
-    """Check if the app has expired"""
-    expiry_date = datetime(2025, 12, 10)
-    current_date = datetime.now()
-    
-    if current_date > expiry_date:
-        st.error("🚫 This application has expired as of December 10th, 2025.")
-        st.error("📞 Pls contact App Developer")
-        st.stop()
-
-class KamalBerijuApp:
-    def __init__(self):
-        self.initialize_session_state()
-    
-    def initialize_session_state(self):
-        if 'kamal_data' not in st.session_state:
-            st.session_state.kamal_data = []
-        if 'kamal_editing_index' not in st.session_state:
-            st.session_state.kamal_editing_index = None
-    
-    def parse_extent(self, extent_text, field_name=""):
-        try:
-            if not extent_text or extent_text in ["A-G-A", "", "0"]:
-                return 0.0
-            
-            parts = extent_text.split('-')
-            if len(parts) == 1:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                return acres * 40
-            elif len(parts) == 2:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                gunta = float(parts[1].strip()) if parts[1].strip() else 0.0
-                if gunta >= 40:
-                    raise ValueError(f"{field_name} gunta must be less than 40.")
-                return acres * 40 + gunta
-            elif len(parts) == 3:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                gunta = float(parts[1].strip()) if parts[1].strip() else 0.0
-                aana = float(parts[2].strip()) if parts[2].strip() else 0.0
-                if gunta >= 40:
-                    raise ValueError(f"{field_name} gunta must be less than 40.")
-                if aana >= 16:
-                    raise ValueError(f"{field_name} aana must be less than 16.")
-                return acres * 40 + gunta + aana / 16.0
-            else:
-                raise ValueError(f"Invalid extent format for {field_name}. Use format like '12-15' or '12-15-13'.")
-        except ValueError as e:
-            if str(e).startswith(field_name):
-                raise
-            raise ValueError(f"Invalid input for {field_name} extent.")
-    
-    def parse_assessment(self, assessment_text):
-        try:
-            assessment = 0 if assessment_text in ["", "0"] else float(assessment_text.strip())
-            if assessment < 0:
-                raise ValueError("Assessment cannot be negative.")
-            return assessment
-        except ValueError:
-            raise ValueError("Invalid assessment input.")
-    
-    def format_extent(self, gunta_float):
-        if gunta_float <= 0:
-            return "0-0-0"
-        acres = int(gunta_float // 40)
-        gunta_rem = gunta_float % 40
-        gunta = int(gunta_rem)
-        aana_rem = (gunta_rem - gunta) * 16
-        aana = int(round(aana_rem))
-        
-        if aana >= 16:
-            gunta += 1
-            aana = 0
-            if gunta >= 40:
-                acres += 1
-                gunta = 0
-        
-        return f"{acres}-{gunta}-{aana}"
-    
-    def get_extent_float(self, extent_str):
-        if not extent_str or extent_str in ["0-0", "0-0-0", "", "-"]:
-            return 0.0
-        parts = extent_str.split("-")
-        acres = float(parts[0].strip() or 0)
-        gunta = float(parts[1].strip() or 0) if len(parts) > 1 else 0
-        aana = float(parts[2].strip() or 0) if len(parts) > 2 else 0
-        return acres * 40 + gunta + aana / 16
-    
-    def get_kjp_location_data(self):
-        """Get location data from KJP app session state"""
-        if 'kjp_location_data' in st.session_state:
-            return st.session_state.kjp_location_data
-        return {
-            'district': '', 'taluka': '', 'hobli': '', 
-            'village': '', 'kjp_share': ''
-        }
-    
-    def generate_print_html(self):
-        location_data = self.get_kjp_location_data()
-        
-        # Prepare table data
-        table_rows = ""
-        for record in st.session_state.kamal_data:
-            if record.get("type") == "separator":
-                table_rows += '<tr class="separator-row"><td colspan="10"></td></tr>'
-            elif record.get("type") == "total":
-                table_rows += '<tr class="total-row">'
-                table_rows += f'<td>{record.get("AsIs_LandType", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Remark", "")}</td>'
-                table_rows += '</tr>'
-            else:
-                table_rows += '<tr class="data-row">'
-                table_rows += f'<td>{record.get("AsIs_LandType", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Remark", "")}</td>'
-                table_rows += '</tr>'
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="kn">
-        <head>
-            <meta charset="UTF-8">
-            <title>ಕಮಾಲ ಬೇರಿಜು - Print</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; text-align: center; background: #fff; }}
-                .header {{ font-size: 20px; font-weight: bold; margin-bottom: 10px; color: #333; }}
-                .location-info {{ display: flex; justify-content: space-between; margin: 15px 0; font-size: 13px; color: #555; background: #f0f0f0; padding: 8px; border-radius: 4px; }}
-                .location-info div {{ margin: 0 8px; }}
-                table {{ width: 100%; border-collapse: collapse; margin-top: 15px; font-size: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }}
-                th, td {{ border: 1px solid #999; padding: 6px; text-align: center; }}
-                th.section-header {{ background-color: #d0d0d0; font-size: 12px; font-weight: bold; }}
-                th.column-header {{ background-color: #e0e0e0; font-weight: bold; font-size: 13px; }}
-                .data-row:nth-child(even) {{ background-color: #f5f5f5; }}
-                .data-row:nth-child(odd) {{ background-color: #ffffff; }}
-                .total-row {{ background-color: #e0e0e0; font-weight: bold; }}
-                .separator-row td {{ border: none; height: 8px; background-color: #d3d3d3; }}
-                .signature-row {{ display: flex; justify-content: space-between; gap: 20px; margin: 20px auto 10px; width: 95%; flex-wrap: nowrap; }}
-                .signature-row p {{ margin: 0; font-size: 14px; border-top: 1px solid #000; padding-top: 10px; width: 180px; text-align: center; }}
-                @media print {{
-                    body {{ margin: 10px; }}
-                    table {{ page-break-inside: auto; }}
-                    tr {{ page-break-inside: avoid; page-break-after: auto; }}
-                    thead {{ display: table-header-group; }}
-                    @page {{
-                        size: A4 landscape;
-                        margin: 10mm;
-                    }}
-                }}
-                .print-controls {{ margin: 15px 0; text-align: center; }}
-                .print-btn, .close-btn {{ 
-                    padding: 8px 16px; margin: 0 10px; font-size: 14px; cursor: pointer; 
-                    border: none; border-radius: 4px; color: white; 
-                }}
-                .print-btn {{ background-color: #4CAF50; }}
-                .close-btn {{ background-color: #f44336; }}
-            </style>
-        </head>
-        <body>
-            <div class="print-controls">
-                <button class="print-btn" onclick="window.print()">Print</button>
-                <button class="close-btn" onclick="window.close()">Close</button>
-            </div>
-            <div class="header">ಕರ್ನಾಟಕ ಸರ್ಕಾರ</div>
-            <div class="header">ಕಮಾಲ ಬೇರಿಜು</div>
-            
-            <div class="location-info">
-                <div>ಗ್ರಾಮ: {location_data['village']}</div>
-                <div>ಹೋಬಳಿ: {location_data['hobli']}</div>
-                <div>ತಾಲೂಕು: {location_data['taluka']}</div>
-                <div>ಜಿಲ್ಲೆ: {location_data['district']}</div>
-                <div>ಕ.ಜ.ಪ ಶೇ.ನಂ.: {location_data['kjp_share']}</div>
-            </div>
-            
-            <table>
-                <thead>
-                    <tr class="section-header">
-                        <th colspan="5">ಈಗಿನ ಪ್ರಕಾರ</th>
-                        <th colspan="5">ದುರಸ್ತಿ ಪ್ರಕಾರ</th>
-                    </tr>
-                    <tr class="column-header">
-                        <th>ಜಮೀನ ತರಹೆ</th>
-                        <th>ಒಟ್ಟು ಕ್ಷೇತ್ರ</th>
-                        <th>ಖರಾಬ</th>
-                        <th>ಸಾಗು ಕ್ಷೇತ್ರ</th>
-                        <th>ಆಕಾರ (₹)</th>
-                        <th>ಒಟ್ಟು</th>
-                        <th>ಖರಾಬ</th>
-                        <th>ಸಾಗು ಕ್ಷೇತ್ರ</th>
-                        <th>ಆಕಾರ (₹)</th>
-                        <th>ಷರಾ</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {table_rows}
-                </tbody>
-            </table>
-            
-            <div class="signature-row">
-                <p>ದುರಸ್ತಿ ಭೂಮಾಪಕರ ಸಹಿ</p>
-                <p>ತಪಾಸಕರ ಸಹಿ</p>
-                <p>ಭೂ.ದಾ.ಸ.ನಿ {location_data['taluka']} ಸಹಿ</p>
-                <p>ಭೂ.ದಾ.ಉ.ನಿ {location_data['district']} ಸಹಿ</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_content
-    
-    def render(self):
-        # Check expiry before rendering anything
-        check_expiry()
-        
-        # Stylish modern heading with smaller font
-        st.markdown(
-            """
-            <div style='
-                text-align: center; 
-                margin-top: 0; 
-                padding-top: 0;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-                margin-bottom: 20px;
-            '>
-                <h1 style='
-                    color: white; 
-                    font-size: 24px; 
-                    font-weight: 700;
-                    margin: 0;
-                    text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-                    font-family: "Arial", sans-serif;
-                '>M. J. Sikandar's KJP App</h1>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
-        
-        # Location inputs like original app - in main content area
-        st.subheader("Location Information")
-        loc_col1, loc_col2, loc_col3, loc_col4, loc_col5 = st.columns(5)
-        
-        with loc_col1:
-            district = st.text_input("ಜಿಲ್ಲೆ", placeholder="Enter District", 
-                                   value=st.session_state.kjp_location_data['district'],
-                                   key="kamal_district")
-            st.session_state.kjp_location_data['district'] = district
-        
-        with loc_col2:
-            taluka = st.text_input("ತಾಲೂಕು", placeholder="Enter Taluka",
-                                 value=st.session_state.kjp_location_data['taluka'],
-                                 key="kamal_taluka")
-            st.session_state.kjp_location_data['taluka'] = taluka
-        
-        with loc_col3:
-            hobli = st.text_input("ಹೋಬಳಿ", placeholder="Enter Hobli",
-                                value=st.session_state.kjp_location_data['hobli'],
-                                key="kamal_hobli")
-            st.session_state.kjp_location_data['hobli'] = hobli
-        
-        with loc_col4:
-            village = st.text_input("ಗ್ರಾಮ", placeholder="Enter Village",
-                                  value=st.session_state.kjp_location_data['village'],
-                                  key="kamal_village")
-            st.session_state.kjp_location_data['village'] = village
-        
-        with loc_col5:
-            kjp_share = st.text_input("ಕ.ಜ.ಪ ಶೇ.ನಂ.", placeholder="Enter KJP Share",
-                                    value=st.session_state.kjp_location_data['kjp_share'],
-                                    key="kamal_kjp_share")
-            st.session_state.kjp_location_data['kjp_share'] = kjp_share
-        
-        # Input form - Matching original layout
-        st.subheader("Enter Record Details")
-        
-        # First row of inputs
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown("**ಜಮೀನ ತರಹೆ**")
-            land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], label_visibility="collapsed", key="land_type")
-        
-        with col2:
-            st.markdown("**ಒಟ್ಟು ಕ್ಷೇತ್ರ**")
-            total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="total_extent")
-        
-        with col3:
-            st.markdown("**ಖರಾಬ**")
-            kharab_extent = st.text_input("ಖರಾಬ", placeholder="A-G-A", label_visibility="collapsed", key="kharab_extent")
-        
-        with col4:
-            st.markdown("**ಆಕಾರ**")
-            assessment = st.text_input("ಆಕಾರ", placeholder="Enter Assessment", label_visibility="collapsed", key="assessment")
-        
-        # Second row of inputs
-        col5, col6, col7, col8 = st.columns(4)
-        
-        with col5:
-            st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
-            kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="kjp_extent")
-        
-        with col6:
-            st.markdown("**ಆಕಾರ**")
-            kjp_assessment = st.text_input("ಆಕಾರ", placeholder="Enter Assessment", label_visibility="collapsed", key="kjp_assessment")
-        
-        with col7:
-            st.markdown("**ಜಮೀನ ತರಹೆ**")
-            kjp_land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], label_visibility="collapsed", key="kjp_land_type")
-        
-        with col8:
-            st.markdown("&nbsp;")
-            # Empty space since Add button is moved to buttons row
-        
-        # Action buttons - Add button in buttons row like KJP app
-        st.markdown("---")
-        col9, col10, col11, col12, col13 = st.columns(5)
-        
-        with col9:
-            add_clicked = st.button("Add", use_container_width=True, key="add_btn")
-        
-        with col10:
-            edit_clicked = st.button("Edit", use_container_width=True, key="edit_btn")
-        
-        with col11:
-            delete_clicked = st.button("Delete", use_container_width=True, key="delete_btn")
-        
-        with col12:
-            total_clicked = st.button("Total", use_container_width=True, key="total_btn")
-        
-        with col13:
-            print_clicked = st.button("Print", use_container_width=True, key="print_btn")
-        
-        # Handle Add button
-        if add_clicked:
-            try:
-                total_extent_val = self.parse_extent(total_extent, "Total Extent")
-                kharab_extent_val = self.parse_extent(kharab_extent, "Kharab")
-                assessment_val = self.parse_assessment(assessment)
-                kjp_extent_val = self.parse_extent(kjp_extent, "KJP Extent")
-                kjp_assessment_val = self.parse_assessment(kjp_assessment)
-                
-                if not land_type:
-                    st.error("Land type is mandatory.")
-                    return
-                
-                if kharab_extent_val > total_extent_val:
-                    st.error("Kharab extent cannot exceed total extent.")
-                    return
-                
-                if kjp_extent_val > 0 and not kjp_land_type:
-                    st.error("KJP land type is mandatory when KJP extent is provided.")
-                    return
-                
-                cultivable_extent = total_extent_val - kharab_extent_val
-                amended_total_extent = total_extent_val
-                amended_kharab_extent = kharab_extent_val
-                amended_cultivable_extent = cultivable_extent
-                amended_assessment = assessment_val
-                remark = "-"
-
-                if kjp_extent_val > 0:
-                    if land_type == kjp_land_type:
-                        amended_kharab_extent = kharab_extent_val + kjp_extent_val
-                        amended_cultivable_extent = total_extent_val - amended_kharab_extent
-                        amended_assessment = assessment_val - kjp_assessment_val
-                        remark = self.format_extent(kjp_extent_val)
-                    else:
-                        remark = "-"
-                
-                record = {
-                    "AsIs_LandType": land_type,
-                    "AsIs_TotalExtent": self.format_extent(total_extent_val),
-                    "AsIs_Kharab": self.format_extent(kharab_extent_val),
-                    "AsIs_Cultivable": self.format_extent(cultivable_extent),
-                    "AsIs_Assessment": f"{assessment_val:.2f}" if assessment_val > 0 else "",
-                    "Amended_TotalExtent": self.format_extent(amended_total_extent),
-                    "Amended_Kharab": self.format_extent(amended_kharab_extent),
-                    "Amended_Cultivable": self.format_extent(amended_cultivable_extent),
-                    "Amended_Assessment": f"{amended_assessment:.2f}" if amended_assessment != 0 else "",
-                    "Remark": remark,
-                    "type": "data"
-                }
-                
-                st.session_state.kamal_data.append(record)
-                st.success("Record added successfully!")
-                st.rerun()
-                
-            except ValueError as e:
-                st.error(str(e))
-        
-        # Handle other buttons
-        if edit_clicked:
-            self.edit_record()
-        
-        if delete_clicked:
-            self.delete_record()
-        
-        if total_clicked:
-            self.update_totals()
-        
-        if print_clicked:
-            self.print_data()
-        
-        # Display data table
-        st.markdown("---")
-        if st.session_state.kamal_data:
-            # Prepare display data
-            display_data = []
-            for record in st.session_state.kamal_data:
-                if record.get("type") in ["data", "total"]:
-                    display_record = {
-                        "ಜಮೀನ ತರಹೆ": record["AsIs_LandType"],
-                        "ಒಟ್ಟು ಕ್ಷೇತ್ರ": record["AsIs_TotalExtent"],
-                        "ಖರಾಬ": record["AsIs_Kharab"],
-                        "ಸಾಗು ಕ್ಷೇತ್ರ": record["AsIs_Cultivable"],
-                        "ಆಕಾರ (₹)": record["AsIs_Assessment"],
-                        "ದುರಸ್ತಿ_ಒಟ್ಟು": record["Amended_TotalExtent"],
-                        "ದುರಸ್ತಿ_ಖರಾಬ": record["Amended_Kharab"],
-                        "ದುರಸ್ತಿ_ಸಾಗು": record["Amended_Cultivable"],
-                        "ದುರಸ್ತಿ_ಆಕಾರ": record["Amended_Assessment"],
-                        "ಷರಾ": record["Remark"]
-                    }
-                    display_data.append(display_record)
-            
-            if display_data:
-                df = pd.DataFrame(display_data)
-                st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No records added yet.")
-    
-    def edit_record(self):
-        if not st.session_state.kamal_data:
-            st.warning("No records to edit.")
-            return
-        
-        # Filter only data records (not separators or totals)
-        data_records = [i for i, record in enumerate(st.session_state.kamal_data) if record.get("type") == "data"]
-        
-        if not data_records:
-            st.warning("No data records to edit.")
-            return
-        
-        selected_index = st.selectbox("Select record to edit:", data_records, format_func=lambda x: f"Record {x+1}")
-        
-        if st.button("Load for Editing", key="load_edit"):
-            st.session_state.kamal_editing_index = selected_index
-            self.show_edit_form()
-    
-    def show_edit_form(self):
-        if st.session_state.kamal_editing_index is None:
-            return
-        
-        record = st.session_state.kamal_data[st.session_state.kamal_editing_index]
-        
-        st.subheader("Edit Record")
-        
-        with st.form("edit_kamal_form"):
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], 
-                                       index=["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"].index(record["AsIs_LandType"]),
-                                       key="edit_land_type")
-                total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", value=record["AsIs_TotalExtent"], key="edit_total_extent")
-            
-            with col2:
-                kharab_extent = st.text_input("ಖರಾಬ", value=record["AsIs_Kharab"], key="edit_kharab_extent")
-                assessment = st.text_input("ಆಕಾರ", value=record["AsIs_Assessment"], key="edit_assessment")
-            
-            with col3:
-                # Extract KJP extent from remark
-                kjp_extent = "0-0-0" if record["Remark"] == "-" else record["Remark"]
-                kjp_extent_input = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", value=kjp_extent, key="edit_kjp_extent")
-                
-                # Calculate KJP assessment
-                as_is_assessment = float(record["AsIs_Assessment"] or 0)
-                amended_assessment = float(record["Amended_Assessment"] or 0)
-                kjp_assessment_val = as_is_assessment - amended_assessment
-                kjp_assessment = st.text_input("ಆಕಾರ", value=f"{kjp_assessment_val:.2f}", key="edit_kjp_assessment")
-            
-            with col4:
-                kjp_land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], 
-                                           key="edit_kjp_land_type_select")
-            
-            col_save, col_cancel = st.columns(2)
-            with col_save:
-                save_clicked = st.form_submit_button("Save", use_container_width=True)
-            
-            with col_cancel:
-                cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
-            
-            if save_clicked:
-                try:
-                    total_extent_val = self.parse_extent(total_extent, "Total Extent")
-                    kharab_extent_val = self.parse_extent(kharab_extent, "Kharab")
-                    assessment_val = self.parse_assessment(assessment)
-                    kjp_extent_val = self.parse_extent(kjp_extent_input, "KJP Extent")
-                    kjp_assessment_val = self.parse_assessment(kjp_assessment)
-                    
-                    if not land_type:
-                        st.error("Land type is mandatory.")
-                        return
-                    
-                    if kharab_extent_val > total_extent_val:
-                        st.error("Kharab extent cannot exceed total extent.")
-                        return
-                    
-                    if kjp_extent_val > 0 and not kjp_land_type:
-                        st.error("KJP land type is mandatory when KJP extent is provided.")
-                        return
-                    
-                    cultivable_extent = total_extent_val - kharab_extent_val
-                    amended_total_extent = total_extent_val
-                    amended_kharab_extent = kharab_extent_val
-                    amended_cultivable_extent = cultivable_extent
-                    amended_assessment = assessment_val
-                    remark = "-"
-                    
-                    if kjp_extent_val > 0:
-                        if land_type == kjp_land_type:
-                            amended_kharab_extent = kharab_extent_val + kjp_extent_val
-                            amended_cultivable_extent = total_extent_val - amended_kharab_extent
-                            amended_assessment = assessment_val - kjp_assessment_val
-                            remark = self.format_extent(kjp_extent_val)
-                        else:
-                            remark = "-"
-                    
-                    updated_record = {
-                        "AsIs_LandType": land_type,
-                        "AsIs_TotalExtent": self.format_extent(total_extent_val),
-                        "AsIs_Kharab": self.format_extent(kharab_extent_val),
-                        "AsIs_Cultivable": self.format_extent(cultivable_extent),
-                        "AsIs_Assessment": f"{assessment_val:.2f}" if assessment_val > 0 else "",
-                        "Amended_TotalExtent": self.format_extent(amended_total_extent),
-                        "Amended_Kharab": self.format_extent(amended_kharab_extent),
-                        "Amended_Cultivable": self.format_extent(amended_cultivable_extent),
-                        "Amended_Assessment": f"{amended_assessment:.2f}" if amended_assessment != 0 else "",
-                        "Remark": remark,
-                        "type": "data"
-                    }
-                    
-                    st.session_state.kamal_data[st.session_state.kamal_editing_index] = updated_record
-                    st.session_state.kamal_editing_index = None
-                    st.success("Record updated successfully!")
-                    st.rerun()
-                    
-                except ValueError as e:
-                    st.error(str(e))
-            
-            if cancel_clicked:
-                st.session_state.kamal_editing_index = None
-                st.rerun()
-    
-    def delete_record(self):
-        if not st.session_state.kamal_data:
-            st.warning("No records to delete.")
-            return
-        
-        # Filter only data records (not separators or totals)
-        data_records = [i for i, record in enumerate(st.session_state.kamal_data) if record.get("type") == "data"]
-        
-        if not data_records:
-            st.warning("No data records to delete.")
-            return
-        
-        selected_index = st.selectbox("Select record to delete:", data_records, format_func=lambda x: f"Record {x+1}", key="delete_select")
-        
-        if st.button("Delete Selected Record", key="confirm_delete"):
-            # Adjust index since we're showing only data records
-            actual_index = data_records[selected_index]
-            deleted_record = st.session_state.kamal_data.pop(actual_index)
-            st.success("Record deleted successfully!")
-            st.rerun()
-    
-    def update_totals(self):
-        if not st.session_state.kamal_data:
-            st.warning("No records to calculate totals.")
-            return
-        
-        # Remove existing totals and separators
-        st.session_state.kamal_data = [record for record in st.session_state.kamal_data if record.get("type") not in ["separator", "total"]]
-        
-        # Add separator
-        separator_record = {f"AsIs_{col}": "-" for col in ["LandType", "TotalExtent", "Kharab", "Cultivable", "Assessment"]}
-        separator_record.update({f"Amended_{col}": "-" for col in ["TotalExtent", "Kharab", "Cultivable", "Assessment"]})
-        separator_record["Remark"] = "-"
-        separator_record["type"] = "separator"
-        st.session_state.kamal_data.append(separator_record)
-        
-        # Calculate totals
-        total_columns = {
-            "AsIs_TotalExtent": 0,
-            "AsIs_Kharab": 0,
-            "AsIs_Cultivable": 0,
-            "AsIs_Assessment": 0,
-            "Amended_TotalExtent": 0,
-            "Amended_Kharab": 0,
-            "Amended_Cultivable": 0,
-            "Amended_Assessment": 0
-        }
-        
-        data_records = [record for record in st.session_state.kamal_data if record.get("type") == "data"]
-        
-        for record in data_records:
-            for col in total_columns:
-                if col in ["AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable", "Amended_TotalExtent", "Amended_Kharab", "Amended_Cultivable"]:
-                    if record[col] and record[col] != "0-0-0":
-                        total_columns[col] += self.get_extent_float(record[col])
-                else:
-                    if record[col]:
-                        total_columns[col] += float(record[col])
-        
-        # Add total row
-        total_record = {
-            "AsIs_LandType": "Total",
-            "AsIs_TotalExtent": self.format_extent(total_columns["AsIs_TotalExtent"]) if total_columns["AsIs_TotalExtent"] > 0 else "0-0-0",
-            "AsIs_Kharab": self.format_extent(total_columns["AsIs_Kharab"]) if total_columns["AsIs_Kharab"] > 0 else "0-0-0",
-            "AsIs_Cultivable": self.format_extent(total_columns["AsIs_Cultivable"]) if total_columns["AsIs_Cultivable"] > 0 else "0-0-0",
-            "AsIs_Assessment": f"{total_columns['AsIs_Assessment']:.2f}" if total_columns['AsIs_Assessment'] > 0 else "",
-            "Amended_TotalExtent": self.format_extent(total_columns["Amended_TotalExtent"]) if total_columns["Amended_TotalExtent"] > 0 else "0-0-0",
-            "Amended_Kharab": self.format_extent(total_columns["Amended_Kharab"]) if total_columns["Amended_Kharab"] > 0 else "0-0-0",
-            "Amended_Cultivable": self.format_extent(total_columns["Amended_Cultivable"]) if total_columns["Amended_Cultivable"] > 0 else "0-0-0",
-            "Amended_Assessment": f"{total_columns['Amended_Assessment']:.2f}" if total_columns['Amended_Assessment'] > 0 else "",
-            "Remark": "-",
-            "type": "total"
-        }
-        
-        st.session_state.kamal_data.append(total_record)
-        st.success("Totals updated successfully!")
-        st.rerun()
-    
-    def print_data(self):
-        if not st.session_state.kamal_data:
-            st.warning("No data available to print.")
-            return
-        
-        location_data = self.get_kjp_location_data()
-        if not all([location_data['village'], location_data['taluka'], location_data['district'], location_data['kjp_share']]):
-            st.warning("Please enter location details before printing.")
-            return
-        
-        html_content = self.generate_print_html()
-        
-        # Improved JS: Open popup, load content, no auto-print
-        js = f"""
-        <script>
-            function openPreview() {{
-                var htmlContent = `{html_content}`;
-                var previewWindow = window.open('', '_blank', 'width=1000,height=600,resizable=yes,scrollbars=yes');
-                if (previewWindow) {{
-                    previewWindow.document.write(htmlContent);
-                    previewWindow.document.close();
-                    previewWindow.focus();  // Bring to front
-                }} else {{
-                    alert('Popup blocked! Please allow popups for this site.');
-                }}
-            }}
-            openPreview();
-        </script>
-        """
-        st.components.v1.html(js, height=0)
-        st.success("Print preview opened in a popup window!")
-
-
-class KJPLandSurveyApp:
-    def __init__(self):
-        self.initialize_session_state()
-    
-    def initialize_session_state(self):
-        if 'kjp_data' not in st.session_state:
-            st.session_state.kjp_data = []
-        if 'kjp_editing_index' not in st.session_state:
-            st.session_state.kjp_editing_index = None
-        if 'ex_kjp_mode' not in st.session_state:
-            st.session_state.ex_kjp_mode = False
-        if 'kjp_location_data' not in st.session_state:
-            st.session_state.kjp_location_data = {
-                'district': '', 'taluka': '', 'hobli': '', 
-                'village': '', 'kjp_share': ''
-            }
-        if 'current_survey_no' not in st.session_state:
-            st.session_state.current_survey_no = ""
-        if 'current_hissa_no' not in st.session_state:
-            st.session_state.current_hissa_no = 1
-    
-    def parse_extent(self, extent_text, field_name=""):
-        try:
-            if not extent_text or extent_text in ["A-G-A", "", "0"]:
-                return 0.0
-            
-            parts = extent_text.split('-')
-            if len(parts) == 1:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                return acres * 40
-            elif len(parts) == 2:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                gunta = float(parts[1].strip()) if parts[1].strip() else 0.0
-                if gunta >= 40:
-                    raise ValueError(f"{field_name} gunta must be less than 40.")
-                return acres * 40 + gunta
-            elif len(parts) == 3:
-                acres = float(parts[0].strip()) if parts[0].strip() else 0.0
-                gunta = float(parts[1].strip()) if parts[1].strip() else 0.0
-                aana = float(parts[2].strip()) if parts[2].strip() else 0.0
-                if gunta >= 40:
-                    raise ValueError(f"{field_name} gunta must be less than 40.")
-                if aana >= 16:
-                    raise ValueError(f"{field_name} aana must be less than 16.")
-                return acres * 40 + gunta + aana / 16.0
-            else:
-                raise ValueError(f"Invalid extent format for {field_name}. Use format like '12-15' or '12-15-13'.")
-        except ValueError as e:
-            if str(e).startswith(field_name):
-                raise
-            raise ValueError(f"Invalid input for {field_name} extent.")
-    
-    def parse_rate(self, rate_text):
-        try:
-            rate = 0 if rate_text in ["", "0"] else float(rate_text.strip())
-            if rate < 0:
-                raise ValueError("Rate cannot be negative.")
-            return rate
-        except ValueError:
-            raise ValueError("Invalid rate input.")
-    
-    def format_extent(self, gunta_float):
-        if gunta_float <= 0:
-            return "0-0-0"
-        acres = int(gunta_float // 40)
-        gunta_rem = gunta_float % 40
-        gunta = int(gunta_rem)
-        aana_rem = (gunta_rem - gunta) * 16
-        aana = int(round(aana_rem))
-        
-        if aana >= 16:
-            gunta += 1
-            aana = 0
-            if gunta >= 40:
-                acres += 1
-                gunta = 0
-        
-        return f"{acres}-{gunta}-{aana}"
-    
-    def get_extent_float(self, extent_str):
-        if not extent_str or extent_str in ["0-0", "0-0-0", "", "-"]:
-            return 0.0
-        parts = extent_str.split("-")
-        acres = float(parts[0].strip() or 0)
-        gunta = float(parts[1].strip() or 0) if len(parts) > 1 else 0
-        aana = float(parts[2].strip() or 0) if len(parts) > 2 else 0
-        return acres * 40 + gunta + aana / 16
-    
-    def generate_print_html(self):
-        location_data = st.session_state.kjp_location_data
-        
-        # Prepare table data
-        table_rows = ""
-        for record in st.session_state.kjp_data:
-            if record.get("type") == "separator":
-                table_rows += '<tr class="separator-row"><td colspan="12"></td></tr>'
-            elif record.get("type") == "total":
-                table_rows += '<tr class="total-row">'
-                table_rows += f'<td>{record.get("AsIs_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Rate", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Rate", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Assessment", "")}</td>'
-                table_rows += '</tr>'
-            elif record.get("type") == "kjp_row":
-                # KJP Row (B row) with merged cells
-                table_rows += '<tr class="kjp-row">'
-                table_rows += f'<td></td>'  # AsIs_SurveyHissa
-                table_rows += f'<td></td>'  # AsIs_TotalExtent
-                table_rows += f'<td></td>'  # AsIs_Kharab
-                table_rows += f'<td></td>'  # AsIs_Cultivable
-                table_rows += f'<td></td>'  # AsIs_Rate
-                table_rows += f'<td></td>'  # AsIs_Assessment
-                table_rows += f'<td>{record.get("Amended_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td colspan="3">ಬಿನ್ ಶೇತ್ಕಿ ಕಡೆಗೆ ಹೋಗಿದೆ</td>'
-                table_rows += '</tr>'
-            elif record.get("type") == "ex_kjp":
-                # Ex KJP row with merged cells
-                table_rows += '<tr class="kjp-row">'
-                table_rows += f'<td>{record.get("AsIs_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Kharab", "")}</td>'
-                table_rows += f'<td colspan="3"></td>'
-                table_rows += f'<td>{record.get("Amended_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td colspan="3">{record.get("Amended_Cultivable", "")}</td>'
-                table_rows += '</tr>'
-            else:
-                # Normal data row
-                table_rows += '<tr class="data-row">'
-                table_rows += f'<td>{record.get("AsIs_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Rate", "")}</td>'
-                table_rows += f'<td>{record.get("AsIs_Assessment", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_SurveyHissa", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_TotalExtent", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Kharab", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Cultivable", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Rate", "")}</td>'
-                table_rows += f'<td>{record.get("Amended_Assessment", "")}</td>'
-                table_rows += '</tr>'
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="kn">
-        <head>
-            <meta charset="UTF-8">
-            <title>ಕಜಪ ಪತ್ರಿಕೆ - Print</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; text-align: center; background: #fff; }}
-                .header {{ font-size: 20px; font-weight: bold; margin-bottom: 10px; color: #333; }}
-                .location-info {{ display: flex; justify-content: space-between; margin: 15px 0; font-size: 13px; color: #555; background: #f0f0f0; padding: 8px; border-radius: 4px; }}
-                .location-info div {{ margin: 0 8px; }}
-                table {{ width: 100%; border-collapse: collapse; margin-top: 15px; font-size: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }}
-                th, td {{ border: 1px solid #999; padding: 6px; text-align: center; }}
-                th.section-header {{ background-color: #d0d0d0; font-size: 12px; font-weight: bold; }}
-                th.column-header {{ background-color: #e0e0e0; font-weight: bold; font-size: 13px; }}
-                .data-row:nth-child(even) {{ background-color: #f5f5f5; }}
-                .data-row:nth-child(odd) {{ background-color: #ffffff; }}
-                .total-row {{ background-color: #e0e0e0; font-weight: bold; }}
-                .kjp-row {{ background-color: #FFE0B2; font-weight: bold; }}
-                .separator-row td {{ border: none; height: 8px; background-color: #d3d3d3; }}
-                .signature-row {{ display: flex; justify-content: space-between; gap: 20px; margin: 20px auto 10px; width: 95%; flex-wrap: nowrap; }}
-                .signature-row p {{ margin: 0; font-size: 14px; border-top: 1px solid #000; padding-top: 10px; width: 180px; text-align: center; }}
-                @media print {{
-                    body {{ margin: 10px; }}
-                    table {{ page-break-inside: auto; }}
-                    tr {{ page-break-inside: avoid; page-break-after: auto; }}
-                    thead {{ display: table-header-group; }}
-                    @page {{
-                        size: A4 landscape;
-                        margin: 10mm;
-                    }}
-                }}
-                .print-controls {{ margin: 15px 0; text-align: center; }}
-                .print-btn, .close-btn {{ 
-                    padding: 8px 16px; margin: 0 10px; font-size: 14px; cursor: pointer; 
-                    border: none; border-radius: 4px; color: white; 
-                }}
-                .print-btn {{ background-color: #4CAF50; }}
-                .close-btn {{ background-color: #f44336; }}
-            </style>
-        </head>
-        <body>
-            <div class="print-controls">
-                <button class="print-btn" onclick="window.print()">Print</button>
-                <button class="close-btn" onclick="window.close()">Close</button>
-            </div>
-            <div class="header">ಕರ್ನಾಟಕ ಸರ್ಕಾರ</div>
-            <div class="header">ಕಜಪ ಪತ್ರಿಕೆ</div>
-            
-            <div class="location-info">
-                <div>ಗ್ರಾಮ: {location_data['village']}</div>
-                <div>ಹೋಬಳಿ: {location_data['hobli']}</div>
-                <div>ತಾಲೂಕು: {location_data['taluka']}</div>
-                <div>ಜಿಲ್ಲೆ: {location_data['district']}</div>
-                <div>ಕ.ಜ.ಪ ಶೇ.ನಂ.: {location_data['kjp_share']}</div>
-            </div>
-            
-            <table>
-                <thead>
-                    <tr class="section-header">
-                        <th colspan="6">ಈಗಿನ ಪ್ರಕಾರ</th>
-                        <th colspan="6">ದುರಸ್ತಿ ಪ್ರಕಾರ</th>
-                    </tr>
-                    <tr class="column-header">
-                        <th>ಸ.ನಂ/ಹಿ.ನಂ.</th>
-                        <th>ಒಟ್ಟು ಕ್ಷೇತ್ರ</th>
-                        <th>ಖರಾಬ</th>
-                        <th>ಸಾಗು ಕ್ಷೇತ್ರ</th>
-                        <th>ದರ</th>
-                        <th>ಆಕಾರ (₹)</th>
-                        <th>ಸ.ನಂ/ಹಿ.ನಂ.</th>
-                        <th>ಒಟ್ಟು ಕ್ಷೇತ್ರ</th>
-                        <th>ಖರಾಬ</th>
-                        <th>ಸಾಗು ಕ್ಷೇತ್ರ</th>
-                        <th>ದರ</th>
-                        <th>ಆಕಾರ (₹)</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {table_rows}
-                </tbody>
-            </table>
-            
-            <div class="signature-row">
-                <p>ದುರಸ್ತಿ ಭೂಮಾಪಕರ ಸಹಿ</p>
-                <p>ತಪಾಸಕರ ಸಹಿ</p>
-                <p>ಭೂ.ದಾ.ಸ.ನಿ {location_data['taluka']} ಸಹಿ</p>
-                <p>ಭೂ.ದಾ.ಉ.ನಿ {location_data['district']} ಸಹಿ</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_content
-    
-    def render(self):
-        # Check expiry before rendering anything
-        check_expiry()
-        
-        # Stylish modern heading with smaller font
-        st.markdown(
-            """
-            <div style='
-                text-align: center; 
-                margin-top: 0; 
-                padding-top: 0;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-                margin-bottom: 20px;
-            '>
-                <h1 style='
-                    color: white; 
-                    font-size: 24px; 
-                    font-weight: 700;
-                    margin: 0;
-                    text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-                    font-family: "Arial", sans-serif;
-                '>M. J. Sikandar's KJP App</h1>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
-        
-        # Location inputs like original app - in main content area
-        st.subheader("Location Information")
-        loc_col1, loc_col2, loc_col3, loc_col4, loc_col5 = st.columns(5)
-        
-        with loc_col1:
-            district = st.text_input("ಜಿಲ್ಲೆ", placeholder="Enter District", 
-                                   value=st.session_state.kjp_location_data['district'],
-                                   key="kjp_district")
-            st.session_state.kjp_location_data['district'] = district
-        
-        with loc_col2:
-            taluka = st.text_input("ತಾಲೂಕು", placeholder="Enter Taluka",
-                                 value=st.session_state.kjp_location_data['taluka'],
-                                 key="kjp_taluka")
-            st.session_state.kjp_location_data['taluka'] = taluka
-        
-        with loc_col3:
-            hobli = st.text_input("ಹೋಬಳಿ", placeholder="Enter Hobli",
-                                value=st.session_state.kjp_location_data['hobli'],
-                                key="kjp_hobli")
-            st.session_state.kjp_location_data['hobli'] = hobli
-        
-        with loc_col4:
-            village = st.text_input("ಗ್ರಾಮ", placeholder="Enter Village",
-                                  value=st.session_state.kjp_location_data['village'],
-                                  key="kjp_village")
-            st.session_state.kjp_location_data['village'] = village
-        
-        with loc_col5:
-            kjp_share = st.text_input("ಕ.ಜ.ಪ ಶೇ.ನಂ.", placeholder="Enter KJP Share",
-                                    value=st.session_state.kjp_location_data['kjp_share'],
-                                    key="kjp_kjp_share")
-            st.session_state.kjp_location_data['kjp_share'] = kjp_share
-        
-        # Ex KJP mode toggle
-        st.subheader("Record Details")
-        col_ex1, col_ex2 = st.columns([1, 4])
-        with col_ex1:
-            ex_kjp_mode = st.checkbox("Ex KJP", value=st.session_state.ex_kjp_mode)
-            st.session_state.ex_kjp_mode = ex_kjp_mode
-        
-        with col_ex2:
-            if ex_kjp_mode:
-                ex_kjp_input = st.text_input("Ex KJP Input", placeholder="Enter Ex KJP details")
-        
-        # Input form with survey number handling
-        if not ex_kjp_mode:
-            col1, col2, col3, col4, col5 = st.columns(5)
-            
-            with col1:
-                st.markdown("**ಸ.ನಂ/ಹಿ.ನಂ.**")
-                survey_input = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", placeholder="Enter Survey No", label_visibility="collapsed", 
-                                           key="survey_input")
-                
-                # Auto-generate survey/hissa number with auto-increment
-                if survey_input and "/" not in survey_input:
-                    # New survey number entered
-                    st.session_state.current_survey_no = survey_input
-                    st.session_state.current_hissa_no = 1
-                    survey_hissa = f"{survey_input}/1"
-                elif st.session_state.current_survey_no:
-                    # Auto-increment hissa number for each new record
-                    if st.session_state.kjp_data:
-                        # Find the highest hissa number for current survey
-                        data_records = [r for r in st.session_state.kjp_data if r.get("type") == "data"]
-                        if data_records:
-                            last_record = data_records[-1]
-                            if last_record.get("AsIs_SurveyHissa", "").startswith(st.session_state.current_survey_no):
-                                try:
-                                    last_hissa = int(last_record.get("AsIs_SurveyHissa", "").split("/")[-1])
-                                    st.session_state.current_hissa_no = last_hissa + 1
-                                except:
-                                    st.session_state.current_hissa_no += 1
-                            else:
-                                st.session_state.current_hissa_no += 1
-                        else:
-                            st.session_state.current_hissa_no += 1
-                    else:
-                        st.session_state.current_hissa_no += 1
-                    
-                    survey_hissa = f"{st.session_state.current_survey_no}/{st.session_state.current_hissa_no}"
-                else:
-                    survey_hissa = survey_input
-                
-                if survey_input:
-                    st.info(f"Current: {survey_hissa}")
-                
-            with col2:
-                st.markdown("**ಒಟ್ಟು ಕ್ಷೇತ್ರ**")
-                total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="total_extent")
-            
-            with col3:
-                st.markdown("**ಖರಾಬ**")
-                kharab_extent = st.text_input("ಖರಾಬ", placeholder="A-G-A", label_visibility="collapsed", key="kharab_extent")
-            
-            with col4:
-                st.markdown("**ದರ**")
-                rate = st.text_input("ದರ", placeholder="Enter Rate", label_visibility="collapsed", key="rate")
-            
-            with col5:
-                st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
-                kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="kjp_extent")
-        else:
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown("**ಸ.ನಂ/ಹಿ.ನಂ.**")
-                survey_hissa = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", placeholder="Enter Survey/Hissa", label_visibility="collapsed", key="ex_survey")
-            with col2:
-                st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
-                kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="ex_kjp_extent")
-        
-        # Action buttons
-        st.markdown("---")
-        col_btn1, col_btn2, col_btn3, col_btn4, col_btn5 = st.columns(5)
-        
-        with col_btn1:
-            add_clicked = st.button("Add", use_container_width=True)
-        
-        with col_btn2:
-            edit_clicked = st.button("Edit", use_container_width=True)
-        
-        with col_btn3:
-            delete_clicked = st.button("Delete", use_container_width=True)
-        
-        with col_btn4:
-            total_clicked = st.button("Total", use_container_width=True)
-        
-        with col_btn5:
-            print_clicked = st.button("Print", use_container_width=True)
-        
-        # Handle Add button
-        if add_clicked:
-            try:
-                # Check if location data is available
-                location_data = st.session_state.kjp_location_data
-                if not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']]):
-                    st.error("Please enter location details before adding records.")
-                elif not survey_hissa:
-                    st.error("Survey/Hissa number is required.")
-                else:
-                    if ex_kjp_mode:
-                        if not ex_kjp_input:
-                            st.error("Ex KJP input is required in Ex KJP mode.")
-                        else:
-                            kjp_extent_val = self.parse_extent(kjp_extent, "KJP Extent")
-                            
-                            record = {
-                                "AsIs_SurveyHissa": survey_hissa,
-                                "AsIs_TotalExtent": self.format_extent(kjp_extent_val),
-                                "AsIs_Kharab": self.format_extent(kjp_extent_val),
-                                "AsIs_Cultivable": "",
-                                "AsIs_Rate": "",
-                                "AsIs_Assessment": "",
-                                "Amended_SurveyHissa": survey_hissa,
-                                "Amended_TotalExtent": self.format_extent(kjp_extent_val),
-                                "Amended_Kharab": self.format_extent(kjp_extent_val),
-                                "Amended_Cultivable": ex_kjp_input,
-                                "Amended_Rate": "",
-                                "Amended_Assessment": "",
-                                "type": "ex_kjp"
-                            }
-                            
-                            st.session_state.kjp_data.append(record)
-                            st.success("Ex KJP record added successfully!")
-                            st.rerun()
-                    else:
-                        total_extent_val = self.parse_extent(total_extent, "Total Extent")
-                        kharab_extent_val = self.parse_extent(kharab_extent, "Kharab")
-                        rate_val = self.parse_rate(rate)
-                        kjp_extent_val = self.parse_extent(kjp_extent, "KJP Extent")
-                        
-                        cultivable_extent = total_extent_val - kharab_extent_val
-                        if cultivable_extent < 0:
-                            raise ValueError("Cultivable area cannot be negative.")
-                        
-                        # A row calculations
-                        a_row_amended_total_extent = total_extent_val - kjp_extent_val
-                        a_row_amended_kharab_extent = kharab_extent_val
-                        a_row_amended_cultivable_extent = a_row_amended_total_extent - a_row_amended_kharab_extent
-                        
-                        cultivable_acres = cultivable_extent / 40
-                        assessment = rate_val * cultivable_acres
-                        a_row_amended_cultivable_acres = a_row_amended_cultivable_extent / 40
-                        a_row_amended_assessment = rate_val * a_row_amended_cultivable_acres
-                        
-                        # For amended survey/hissa, add * if KJP extent exists
-                        amended_survey_hissa = survey_hissa + "*" if kjp_extent_val > 0 else survey_hissa
-                        
-                        # A row (main record)
-                        a_row_record = {
-                            "AsIs_SurveyHissa": survey_hissa,
-                            "AsIs_TotalExtent": self.format_extent(total_extent_val),
-                            "AsIs_Kharab": self.format_extent(kharab_extent_val),
-                            "AsIs_Cultivable": self.format_extent(cultivable_extent),
-                            "AsIs_Rate": f"{rate_val:.2f}" if rate_val > 0 else "",
-                            "AsIs_Assessment": f"{assessment:.2f}" if assessment > 0 else "",
-                            "Amended_SurveyHissa": amended_survey_hissa,
-                            "Amended_TotalExtent": self.format_extent(a_row_amended_total_extent),
-                            "Amended_Kharab": self.format_extent(a_row_amended_kharab_extent),
-                            "Amended_Cultivable": self.format_extent(a_row_amended_cultivable_extent),
-                            "Amended_Rate": f"{rate_val:.2f}" if rate_val > 0 else "",
-                            "Amended_Assessment": f"{a_row_amended_assessment:.2f}" if a_row_amended_assessment > 0 else "",
-                            "type": "data"
-                        }
-                        
-                        st.session_state.kjp_data.append(a_row_record)
-                        
-                        # Add KJP row (B row) if KJP extent exists and is less than total extent
-                        if kjp_extent_val > 0 and kjp_extent_val < total_extent_val:
-                            b_row_record = {
-                                "AsIs_SurveyHissa": "",
-                                "AsIs_TotalExtent": "",
-                                "AsIs_Kharab": "",
-                                "AsIs_Cultivable": "",
-                                "AsIs_Rate": "",
-                                "AsIs_Assessment": "",
-                                "Amended_SurveyHissa": amended_survey_hissa,
-                                "Amended_TotalExtent": self.format_extent(kjp_extent_val),
-                                "Amended_Kharab": self.format_extent(kjp_extent_val),
-                                "Amended_Cultivable": "ಬಿನ್ ಶೇತ್ಕಿ ಕಡೆಗೆ ಹೋಗಿದೆ",
-                                "Amended_Rate": "",
-                                "Amended_Assessment": "",
-                                "type": "kjp_row"
-                            }
-                            st.session_state.kjp_data.append(b_row_record)
-                        
-                        # Auto-increment hissa number for next record
-                        if st.session_state.current_survey_no:
-                            st.session_state.current_hissa_no += 1
-                        
-                        st.success("Record added successfully!")
-                        st.rerun()
-                        
-            except ValueError as e:
-                st.error(f"Invalid input: {str(e)}")
-        
-        # Handle other buttons
-        if edit_clicked:
-            self.edit_record()
-        
-        if delete_clicked:
-            self.delete_record()
-        
-        if total_clicked:
-            self.update_totals()
-        
-        if print_clicked:
-            self.print_data()
-        
-        # Display data table - Show all record types including Ex KJP
-        st.markdown("---")
-        if st.session_state.kjp_data:
-            # Prepare display data - Include all record types
-            display_data = []
-            for record in st.session_state.kjp_data:
-                if record.get("type") in ["data", "total", "ex_kjp", "kjp_row"]:
-                    if record.get("type") == "ex_kjp":
-                        # Special display for Ex KJP records
-                        display_record = {
-                            "ಸ.ನಂ/ಹಿ.ನಂ.": record["AsIs_SurveyHissa"],
-                            "ಒಟ್ಟು ಕ್ಷೇತ್ರ": record["AsIs_TotalExtent"],
-                            "ಖರಾಬ": record["AsIs_Kharab"],
-                            "ಸಾಗು ಕ್ಷೇತ್ರ": "EX KJP",
-                            "ದರ": "EX KJP", 
-                            "ಆಕಾರ (₹)": "EX KJP",
-                            "ದುರಸ್ತಿ_ಸ.ನಂ": record["Amended_SurveyHissa"],
-                            "ದುರಸ್ತಿ_ಒಟ್ಟು": record["Amended_TotalExtent"],
-                            "ದುರಸ್ತಿ_ಖರಾಬ": record["Amended_Kharab"],
-                            "ದುರಸ್ತಿ_ಸಾಗು": record["Amended_Cultivable"],
-                            "ದುರಸ್ತಿ_ದರ": "EX KJP",
-                            "ದುರಸ್ತಿ_ಆಕಾರ": "EX KJP"
-                        }
-                    elif record.get("type") == "kjp_row":
-                        # Special display for KJP rows
-                        display_record = {
-                            "ಸ.ನಂ/ಹಿ.ನಂ.": "",
-                            "ಒಟ್ಟು ಕ್ಷೇತ್ರ": "",
-                            "ಖರಾಬ": "",
-                            "ಸಾಗು ಕ್ಷೇತ್ರ": "",
-                            "ದರ": "",
-                            "ಆಕಾರ (₹)": "",
-                            "ದುರಸ್ತಿ_ಸ.ನಂ": record["Amended_SurveyHissa"],
-                            "ದುರಸ್ತಿ_ಒಟ್ಟು": record["Amended_TotalExtent"],
-                            "ದುರಸ್ತಿ_ಖರಾಬ": record["Amended_Kharab"],
-                            "ದುರಸ್ತಿ_ಸಾಗು": "ಬಿನ್ ಶೇತ್ಕಿ ಕಡೆಗೆ ಹೋಗಿದೆ",
-                            "ದುರಸ್ತಿ_ದರ": "",
-                            "ದುರಸ್ತಿ_ಆಕಾರ": ""
-                        }
-                    else:
-                        # Normal data and total rows
-                        display_record = {
-                            "ಸ.ನಂ/ಹಿ.ನಂ.": record["AsIs_SurveyHissa"],
-                            "ಒಟ್ಟು ಕ್ಷೇತ್ರ": record["AsIs_TotalExtent"],
-                            "ಖರಾಬ": record["AsIs_Kharab"],
-                            "ಸಾಗು ಕ್ಷೇತ್ರ": record["AsIs_Cultivable"],
-                            "ದರ": record["AsIs_Rate"],
-                            "ಆಕಾರ (₹)": record["AsIs_Assessment"],
-                            "ದುರಸ್ತಿ_ಸ.ನಂ": record["Amended_SurveyHissa"],
-                            "ದುರಸ್ತಿ_ಒಟ್ಟು": record["Amended_TotalExtent"],
-                            "ದುರಸ್ತಿ_ಖರಾಬ": record["Amended_Kharab"],
-                            "ದುರಸ್ತಿ_ಸಾಗು": record["Amended_Cultivable"],
-                            "ದುರಸ್ತಿ_ದರ": record["Amended_Rate"],
-                            "ದುರಸ್ತಿ_ಆಕಾರ": record["Amended_Assessment"]
-                        }
-                    display_data.append(display_record)
-            
-            if display_data:
-                df = pd.DataFrame(display_data)
-                st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No records added yet.")
-    
-    def edit_record(self):
-        st.info("Edit functionality would be implemented here")
-        # Similar to KamalBerijuApp edit functionality
-    
-    def delete_record(self):
-        st.info("Delete functionality would be implemented here")
-        # Similar to KamalBerijuApp delete functionality
-    
-    def update_totals(self):
-        if not st.session_state.kjp_data:
-            st.warning("No records to calculate totals.")
-            return
-        
-        # Remove existing totals and separators
-        st.session_state.kjp_data = [record for record in st.session_state.kjp_data if record.get("type") not in ["separator", "total"]]
-        
-        # Add separator
-        separator_record = {f"AsIs_{col}": "-" for col in ["SurveyHissa", "TotalExtent", "Kharab", "Cultivable", "Rate", "Assessment"]}
-        separator_record.update({f"Amended_{col}": "-" for col in ["SurveyHissa", "TotalExtent", "Kharab", "Cultivable", "Rate", "Assessment"]})
-        separator_record["type"] = "separator"
-        st.session_state.kjp_data.append(separator_record)
-        
-        # Calculate totals (only from data records, not KJP rows or Ex KJP)
-        total_columns = {
-            "AsIs_TotalExtent": 0,
-            "AsIs_Kharab": 0,
-            "AsIs_Cultivable": 0,
-            "AsIs_Assessment": 0,
-            "Amended_TotalExtent": 0,
-            "Amended_Kharab": 0,
-            "Amended_Cultivable": 0,
-            "Amended_Assessment": 0
-        }
-        
-        data_records = [record for record in st.session_state.kjp_data if record.get("type") == "data"]
-        
-        for record in data_records:
-            for col in total_columns:
-                if col in ["AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable", "Amended_TotalExtent", "Amended_Kharab", "Amended_Cultivable"]:
-                    if record[col] and record[col] != "0-0-0":
-                        total_columns[col] += self.get_extent_float(record[col])
-                else:
-                    if record[col]:
-                        total_columns[col] += float(record[col])
-        
-        # Add total row
-        total_record = {
-            "AsIs_SurveyHissa": "Total",
-            "AsIs_TotalExtent": self.format_extent(total_columns["AsIs_TotalExtent"]) if total_columns["AsIs_TotalExtent"] > 0 else "0-0-0",
-            "AsIs_Kharab": self.format_extent(total_columns["AsIs_Kharab"]) if total_columns["AsIs_Kharab"] > 0 else "0-0-0",
-            "AsIs_Cultivable": self.format_extent(total_columns["AsIs_Cultivable"]) if total_columns["AsIs_Cultivable"] > 0 else "0-0-0",
-            "AsIs_Rate": "-",
-            "AsIs_Assessment": f"{total_columns['AsIs_Assessment']:.2f}" if total_columns['AsIs_Assessment'] > 0 else "",
-            "Amended_SurveyHissa": "-",
-            "Amended_TotalExtent": self.format_extent(total_columns["Amended_TotalExtent"]) if total_columns["Amended_TotalExtent"] > 0 else "0-0-0",
-            "Amended_Kharab": self.format_extent(total_columns["Amended_Kharab"]) if total_columns["Amended_Kharab"] > 0 else "0-0-0",
-            "Amended_Cultivable": self.format_extent(total_columns["Amended_Cultivable"]) if total_columns["Amended_Cultivable"] > 0 else "0-0-0",
-            "Amended_Rate": "-",
-            "Amended_Assessment": f"{total_columns['Amended_Assessment']:.2f}" if total_columns['Amended_Assessment'] > 0 else "",
-            "type": "total"
-        }
-        
-        st.session_state.kjp_data.append(total_record)
-        st.success("Totals updated successfully!")
-        st.rerun()
-    
-    def print_data(self):
-        if not st.session_state.kjp_data:
-            st.warning("No data available to print.")
-            return
-        
-        # Check location data
-        location_data = st.session_state.kjp_location_data
-        if not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']]):
-            st.warning("Please enter location details before printing.")
-            return
-        
-        html_content = self.generate_print_html()
-        
-        # Improved JS: Open popup, load content, no auto-print
-        js = f"""
-        <script>
-            function openPreview() {{
-                var htmlContent = `{html_content}`;
-                var previewWindow = window.open('', '_blank', 'width=1000,height=600,resizable=yes,scrollbars=yes');
-                if (previewWindow) {{
-                    previewWindow.document.write(htmlContent);
-                    previewWindow.document.close();
-                    previewWindow.focus();  // Bring to front
-                }} else {{
-                    alert('Popup blocked! Please allow popups for this site.');
-                }}
-            }}
-            openPreview();
-        </script>
-        """
-        st.components.v1.html(js, height=0)
-        st.success("Print preview opened in a popup window!")
-
-
-def main():
-    # Check if app has expired before rendering anything
-    check_expiry()
-    
-    st.set_page_config(
-        page_title="M. J. Sikandar's KJP App",
-        page_icon="📊",
-        layout="wide",
-        initial_sidebar_state="expanded"
-    )
-    
-    # Initialize session state for location data
-    if 'kjp_location_data' not in st.session_state:
-        st.session_state.kjp_location_data = {
-            'district': '', 'taluka': '', 'hobli': '', 
-            'village': '', 'kjp_share': ''
-        }
-    
-    st.sidebar.title("KJP Applications")
-    app_choice = st.sidebar.radio(
-        "Select Application:",
-        ["ಕ.ಜ.ಪ ಪತ್ರಿಕೆ", "ಕಮಾಲ ಬೇರಿಜು"]
-    )
-    
-    if app_choice == "ಕ.ಜ.ಪ ಪತ್ರಿಕೆ":
-        kjp_app = KJPLandSurveyApp()
-        kjp_app.render()
-    else:
-        kamal_app = KamalBerijuApp()
-        kamal_app.render()
-
-if __name__ == "__main__":
+import numpy as np
+import streamlit as st
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from extent import Extent, ZERO
+from records import LAND_TYPES, KamalStore, KJPStore, RowType, assessment_paise, format_paise, to_paise
+from printing import ROWS_PER_PAGE, KAMAL_SHEET, KJP_SHEET, render_store
+from storage import VillageDB, location_complete, village_path
+from rates import RateMaster, rate_master, save_rates
+from profiling import Profiler
+from history import History
+from jobs import FAILED, JobQueue, content_hash
+from concurrent.futures import wait
+
+TABLE_PAGE_SIZES = [25, 50, 100, 500]
+
+# Matches offered by the Edit/Delete record selectors
+SELECTOR_RESULTS = 50
+
+# Seconds a rerun waits for a new background job before showing its progress
+# instead, and how often the progress bar is refreshed after that
+JOB_QUICK_WAIT = 0.5
+JOB_POLL_SECONDS = 1.0
+
+# Empty rows the KJP entry grid opens with, so a batch is typed without adding rows
+GRID_BLANK_ROWS = 20
+
+# pandas (and bulk_import, which needs it) is imported only where a table is
+# drawn or a sheet imported, keeping it off the first page load
+
+# Page heading markup, shared by both apps
+HEADER_HTML = """
+            <div style='
+                text-align: center; 
+                margin-top: 0; 
+                padding-top: 0;
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                padding: 15px;
+                border-radius: 8px;
+                box-shadow: 0 3px 10px rgba(0,0,0,0.1);
+                margin-bottom: 20px;
+            '>
+                <h1 style='
+                    color: white; 
+                    font-size: 24px; 
+                    font-weight: 700;
+                    margin: 0;
+                    text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
+                    font-family: "Arial", sans-serif;
+                '>M. J. Sikandar's KJP App</h1>
+            </div>
+            """
+
+def check_expiry():
+    """Check if the app has expired"""
+    expiry_date = datetime(2025, 12, 10)
+    current_date = datetime.now()
+    
+    if current_date > expiry_date:
+        st.error("🚫 This application has expired as of December 10th, 2025.")
+        st.error("📞 Pls contact App Developer")
+        st.stop()
+
+def profiled(name):
+    """Time a phase of this rerun while rerun profiling is switched on"""
+    profiler = st.session_state.get("profiler")
+    return profiler.phase(name) if profiler else nullcontext()
+
+def fragment_phase(name):
+    """Time a fragment: a phase of the full rerun drawing it, or a profiled rerun
+    of its own when the fragment reruns without the rest of the page"""
+    profiler = st.session_state.get("profiler")
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name) if profiler.current is not None else profiler.rerun(name)
+
+def render_profiler_panel(profiler):
+    """Sidebar debug panel: per-phase timings of recent reruns, exportable as JSON lines"""
+    with st.sidebar.expander("Debug"):
+        st.checkbox("Profile reruns", key="profile_reruns")
+        if not profiler.history:
+            st.caption("Switch on profiling and interact with the app to record reruns.")
+            return
+        
+        last = profiler.history[-1]
+        st.caption(f"Last rerun: {last['seconds'] * 1000:.1f} ms, {last['blocks']:+d} blocks")
+        import pandas as pd
+        phases = pd.DataFrame(last["phases"])
+        phases["ms"] = phases.pop("seconds") * 1000
+        st.dataframe(phases, use_container_width=True, hide_index=True)
+        st.caption(f"Mean over the last {len(profiler.history)} reruns")
+        st.dataframe(pd.DataFrame(profiler.phase_summary()), use_container_width=True, hide_index=True)
+        st.download_button("Export JSON lines", profiler.jsonl(), file_name="reruns.jsonl",
+                           mime="application/jsonl", on_click="ignore")
+
+def render_running_totals(store, display_columns):
+    """Show the live data-record totals per land type, read straight from the store"""
+    if not store:
+        return
+    
+    def build_totals():
+        import pandas as pd
+        by_land_type = store.totals_by_land_type(RowType.DATA)
+        if len(by_land_type) > 1:
+            by_land_type["Total"] = store.totals(RowType.DATA)
+        
+        rows = []
+        for land_type, totals in by_land_type.items():
+            row = {"ಜಮೀನ ತರಹೆ": land_type or "-"}
+            for col, value in totals.items():
+                row[display_columns[col]] = store.format_value(col, value)
+            rows.append(row)
+        return pd.DataFrame(rows)
+    
+    totals = store.view("running_totals", build_totals)
+    if totals.empty:
+        return
+    
+    with st.expander("Running Totals"):
+        st.dataframe(totals, use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def job_queue():
+    """The background job queue, shared by every session of this server"""
+    return JobQueue()
+
+def poll_job(job_id):
+    """Progress of a running job; reruns the page once the job has finished"""
+    job = job_queue().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=f"{job.label}: {job.message or job.state}")
+
+def render_job(job_key, show_result):
+    """Show the session's job stored under job_key: its progress while it runs, then
+    show_result(result) or its error once, after which the job is forgotten"""
+    job_id = st.session_state.get(job_key)
+    if job_id is None:
+        return
+    job = job_queue().get(job_id)
+    if job is None:
+        del st.session_state[job_key]
+        return
+    if not job.done:
+        # Small jobs finish within the wait and show their result in this same rerun
+        wait([job.future], timeout=JOB_QUICK_WAIT)
+    if not job.done:
+        st.fragment(poll_job, run_every=JOB_POLL_SECONDS)(job_id)
+        return
+    
+    del st.session_state[job_key]
+    if job.state == FAILED:
+        st.error(job.error)
+    else:
+        show_result(job.result)
+
+def submit_print(sheet, store, location, rows_per_page):
+    """Queue rendering a store's print sheet; an unchanged sheet comes straight from the artifact cache"""
+    key = content_hash(sheet.title, store.fingerprint(), sorted(location.items()), rows_per_page)
+    queue = job_queue()
+    # The job renders a copy, so the session can keep editing while it runs
+    job = queue.cached("Print sheet", key) or queue.submit(
+        "Print sheet", render_store, sheet, store.copy(), dict(location), rows_per_page, key=key)
+    return job.id
+
+def editor_frame(base, changes):
+    """The table a data_editor shows: its starting frame with the edits, deletions
+    and added rows from its widget state applied"""
+    import pandas as pd
+    rows = base.to_dict("records")
+    for index, edits in changes.get("edited_rows", {}).items():
+        rows[int(index)].update(edits)
+    deleted = set(changes.get("deleted_rows", []))
+    rows = [row for index, row in enumerate(rows) if index not in deleted] + list(changes.get("added_rows", []))
+    return pd.DataFrame(rows, columns=base.columns).fillna("").astype(str)
+
+def render_bulk_import(data_key, importer_name, key, refuse_message=None, options=None):
+    """Import a whole CSV/XLSX sheet into the data_key sheet, validated column-wise in the background and
+    appended as one undo step saved together; options are passed on to the importer"""
+    with st.expander("Bulk Import"):
+        uploaded = st.file_uploader("CSV or Excel sheet", type=["csv", "xlsx"], key=f"{key}_upload")
+        if uploaded is not None and st.button("Import", key=f"{key}_import"):
+            if refuse_message:
+                st.error(refuse_message)
+                return
+            
+            import bulk_import
+            data = uploaded.getvalue()
+            options = options or {}
+            st.session_state[f"{key}_import_job"] = job_queue().submit(
+                f"Import {uploaded.name}", bulk_import.import_upload, getattr(bulk_import, importer_name),
+                data, uploaded.name, key=content_hash(importer_name, uploaded.name, data, sorted(options.items())),
+                **options).id
+        
+        def apply_import(outcome):
+            rows, result = outcome
+            if len(result.row_types):
+                with sheet_action(data_key, "Bulk import"):
+                    st.session_state[data_key].extend(result.row_types, **result.columns)
+            st.success(f"Imported {rows - len(result.errors)} of {rows} rows ({len(result.row_types)} records).")
+            if not result.errors.empty:
+                st.warning("Rows not imported:")
+                st.dataframe(result.errors, use_container_width=True, hide_index=True)
+        
+        render_job(f"{key}_import_job", apply_import)
+
+def bind_village_storage(data_key, table, store_class, location):
+    """Back the session's sheet with the village's SQLite file once the location is complete.
+    
+    Saved records are loaded in one read; records entered before the location was
+    complete are kept and saved after them. From then on every change is written through,
+    and each rerun pulls just the records other users of the village changed since the last."""
+    if not location_complete(location):
+        return
+    path = village_path(location)
+    if st.session_state.get(f"{table}_db_path") == path:
+        changed, conflicts = st.session_state.workspaces[data_key].pull()
+        if changed:
+            # Undo steps over these records would now write over someone else's values
+            store_history(data_key).forget(changed)
+        if conflicts:
+            st.warning(f"{len(conflicts)} record(s) were changed by another user before your change was saved. "
+                       "They now show the saved values; please check them and redo your change if needed.")
+        elif changed:
+            st.toast(f"{len(changed)} record(s) updated by other users.")
+        return
+    
+    dbs = st.session_state.setdefault("village_dbs", {})
+    if path not in dbs:
+        dbs[path] = VillageDB(path)
+    db = dbs[path]
+    
+    unsaved = st.session_state[data_key] if f"{table}_db_path" not in st.session_state else None
+    store = store_class()
+    st.session_state.setdefault("workspaces", {})[data_key] = db.load(table, store)
+    saved = len(store)
+    if unsaved:
+        store.extend(unsaved.row_types(), **{name: unsaved.column(name) for name, _, _ in unsaved.COLUMNS})
+    db.save_location(location)
+    
+    st.session_state[data_key] = store
+    st.session_state[f"{table}_db_path"] = path
+    if saved:
+        st.info(f"Loaded {saved} saved records for {location['village']}.")
+
+def read_rate_table(report=False):
+    """The rate table, or an empty one while its file has a bad row; report shows why"""
+    try:
+        return rate_master()
+    except ValueError as e:
+        if report:
+            st.error(f"Could not read the rate table, so no rates are taken from it: {e}")
+        return RateMaster()
+
+def store_history(data_key):
+    """The undo history of the session's sheet, started afresh whenever the sheet's store is replaced"""
+    histories = st.session_state.setdefault("histories", {})
+    history = histories.get(data_key)
+    if history is None or history.store is not st.session_state[data_key]:
+        history = histories[data_key] = History(st.session_state[data_key])
+    return history
+
+def saved_together(data_key):
+    """Save the sheet's changes made in the block to the village file at once, or none on a conflict"""
+    workspace = st.session_state.get("workspaces", {}).get(data_key)
+    return workspace.batch() if workspace else nullcontext()
+
+@contextmanager
+def sheet_action(data_key, label):
+    """One undo step of the sheet, saved together"""
+    with store_history(data_key).action(label), saved_together(data_key):
+        yield
+
+def render_undo_redo(data_key):
+    undo_col, redo_col, _ = st.columns([1, 1, 3])
+    history = store_history(data_key)
+    with undo_col:
+        undo_label = history.undo_label
+        if st.button("Undo", key=f"{data_key}_undo", disabled=undo_label is None, use_container_width=True,
+                     help=f"Undo {undo_label}" if undo_label else None):
+            with saved_together(data_key):
+                history.undo()
+            st.rerun()
+    with redo_col:
+        redo_label = history.redo_label
+        if st.button("Redo", key=f"{data_key}_redo", disabled=redo_label is None, use_container_width=True,
+                     help=f"Redo {redo_label}" if redo_label else None):
+            with saved_together(data_key):
+                history.redo()
+            st.rerun()
+
+def select_record(store, row_types, label_column, label, key, placeholder):
+    """A search box and a selectbox of its first SELECTOR_RESULTS matches; returns the chosen record id.
+    
+    Only the matches are sent to the browser, so the options stay small however
+    many records the sheet has. None when nothing matches."""
+    query = st.text_input("Search records", placeholder=placeholder, key=f"{key}_query")
+    ids, matches = store.search(query, row_types, SELECTOR_RESULTS)
+    if not matches:
+        st.info("No records match the search.")
+        return None
+    if matches > len(ids):
+        st.caption(f"Showing the first {len(ids)} of {matches} matches; narrow the search to find the rest.")
+    
+    positions = store.positions_of(ids)
+    # Row numbers as in the records table, which leaves out separators
+    rows = positions - np.searchsorted(store.positions(RowType.SEPARATOR), positions)
+    labels = {int(record_id): f"Row {row}: {store.format_value(label_column, value)}"
+              for record_id, row, value in zip(ids, rows, store.column(label_column)[positions])}
+    return st.selectbox(label, list(labels), format_func=labels.get, key=key)
+
+def render_records_table(store, shown_types, to_display, key):
+    """Show one page of the records table.
+    
+    Only the page's rows are mapped to display columns, and the page is a
+    store view, kept until the data or the page changes, so reruns from
+    typing in the form reuse it."""
+    positions = store.positions(*shown_types)
+    if not len(positions):
+        return
+    
+    page_col, size_col, _ = st.columns([1, 1, 3])
+    with size_col:
+        page_size = st.selectbox("Rows per page", TABLE_PAGE_SIZES, key=f"{key}_page_size")
+    pages = -(-len(positions) // page_size)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with page_col:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    
+    start = (page - 1) * page_size
+    
+    def build_page():
+        df = to_display(store.formatted().iloc[positions[start:start + page_size]])
+        df.index = range(start, start + len(df))
+        return df
+    
+    with profiled("display table"):
+        page_df = store.view(("table", page, page_size), build_page)
+    with profiled("st.dataframe"):
+        st.dataframe(page_df, use_container_width=True)
+    render_cache_metrics(store.views)
+
+def render_cache_metrics(views):
+    """Hit rate and rebuild cost of the store's memoised display views"""
+    with st.expander("Display cache"):
+        hit_col, rebuild_col, time_col = st.columns(3)
+        hit_col.metric("Hit rate", f"{views.hit_rate:.0%}", help=f"{views.hits} hits")
+        rebuild_col.metric("Rebuilds", views.rebuilds)
+        time_col.metric("Last rebuild", f"{views.last_rebuild_seconds * 1000:.1f} ms",
+                        help=f"{views.rebuild_seconds * 1000:.1f} ms in all")
+
+class KamalBerijuApp:
+    DISPLAY_COLUMNS = {
+        "LandType": "ಜಮೀನ ತರಹೆ",
+        "AsIs_TotalExtent": "ಒಟ್ಟು ಕ್ಷೇತ್ರ",
+        "AsIs_Kharab": "ಖರಾಬ",
+        "AsIs_Cultivable": "ಸಾಗು ಕ್ಷೇತ್ರ",
+        "AsIs_Assessment": "ಆಕಾರ (₹)",
+        "Amended_TotalExtent": "ದುರಸ್ತಿ_ಒಟ್ಟು",
+        "Amended_Kharab": "ದುರಸ್ತಿ_ಖರಾಬ",
+        "Amended_Cultivable": "ದುರಸ್ತಿ_ಸಾಗು",
+        "Amended_Assessment": "ದುರಸ್ತಿ_ಆಕಾರ",
+        "Remark": "ಷರಾ"
+    }
+    
+    def __init__(self):
+        self.initialize_session_state()
+    
+    def initialize_session_state(self):
+        if 'kamal_data' not in st.session_state:
+            st.session_state.kamal_data = KamalStore()
+        # Open Edit/Delete panel ("edit", "delete" or None) and the record id loaded for editing
+        if 'kamal_action' not in st.session_state:
+            st.session_state.kamal_action = None
+        if 'kamal_editing_id' not in st.session_state:
+            st.session_state.kamal_editing_id = None
+    
+    def parse_assessment(self, assessment_text):
+        try:
+            assessment = 0 if assessment_text in ["", "0"] else float(assessment_text.strip())
+            if assessment < 0:
+                raise ValueError("Assessment cannot be negative.")
+            return assessment
+        except ValueError:
+            raise ValueError("Invalid assessment input.")
+    
+    def get_kjp_location_data(self):
+        """Get location data from KJP app session state"""
+        if 'kjp_location_data' in st.session_state:
+            return st.session_state.kjp_location_data
+        return {
+            'district': '', 'taluka': '', 'hobli': '', 
+            'village': '', 'kjp_share': ''
+        }
+    
+    def display_rows(self, rows):
+        """Formatted store rows as the Kannada-headed table"""
+        return rows[list(self.DISPLAY_COLUMNS)].rename(columns=self.DISPLAY_COLUMNS)
+    
+    def generate_print_html(self, rows_per_page=ROWS_PER_PAGE):
+        location_data = self.get_kjp_location_data()
+        return KAMAL_SHEET.render(st.session_state.kamal_data.formatted(), location_data, rows_per_page)
+    
+    def render(self):
+        # Check expiry before rendering anything
+        check_expiry()
+        
+        # Stylish modern heading with smaller font
+        st.markdown(HEADER_HTML, unsafe_allow_html=True)
+        
+        # Location inputs like original app - in main content area
+        with profiled("location inputs"):
+            st.subheader("Location Information")
+            loc_col1, loc_col2, loc_col3, loc_col4, loc_col5 = st.columns(5)
+        
+            with loc_col1:
+                district = st.text_input("ಜಿಲ್ಲೆ", placeholder="Enter District", 
+                                       value=st.session_state.kjp_location_data['district'],
+                                       key="kamal_district")
+                st.session_state.kjp_location_data['district'] = district
+        
+            with loc_col2:
+                taluka = st.text_input("ತಾಲೂಕು", placeholder="Enter Taluka",
+                                     value=st.session_state.kjp_location_data['taluka'],
+                                     key="kamal_taluka")
+                st.session_state.kjp_location_data['taluka'] = taluka
+        
+            with loc_col3:
+                hobli = st.text_input("ಹೋಬಳಿ", placeholder="Enter Hobli",
+                                    value=st.session_state.kjp_location_data['hobli'],
+                                    key="kamal_hobli")
+                st.session_state.kjp_location_data['hobli'] = hobli
+        
+            with loc_col4:
+                village = st.text_input("ಗ್ರಾಮ", placeholder="Enter Village",
+                                      value=st.session_state.kjp_location_data['village'],
+                                      key="kamal_village")
+                st.session_state.kjp_location_data['village'] = village
+        
+            with loc_col5:
+                kjp_share = st.text_input("ಕ.ಜ.ಪ ಶೇ.ನಂ.", placeholder="Enter KJP Share",
+                                        value=st.session_state.kjp_location_data['kjp_share'],
+                                        key="kamal_kjp_share")
+                st.session_state.kjp_location_data['kjp_share'] = kjp_share
+        
+            bind_village_storage("kamal_data", "kamal", KamalStore, st.session_state.kjp_location_data)
+        
+        # Typing in the form reruns only this fragment; a handler that changes the
+        # sheet reruns the whole page so the table shows the change
+        self.render_entry_form()
+        
+        render_bulk_import("kamal_data", "import_kamal", "kamal")
+        self.render_derive_from_kjp()
+        
+        self.render_table()
+    
+    @st.fragment
+    def render_entry_form(self):
+        """The record inputs, action buttons and their handlers, rerun on their own while typing"""
+        with fragment_phase("entry form"):
+            # Input form - Matching original layout
+            st.subheader("Enter Record Details")
+            
+            # First row of inputs
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.markdown("**ಜಮೀನ ತರಹೆ**")
+                land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], label_visibility="collapsed", key="land_type")
+            
+            with col2:
+                st.markdown("**ಒಟ್ಟು ಕ್ಷೇತ್ರ**")
+                total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="total_extent")
+            
+            with col3:
+                st.markdown("**ಖರಾಬ**")
+                kharab_extent = st.text_input("ಖರಾಬ", placeholder="A-G-A", label_visibility="collapsed", key="kharab_extent")
+            
+            with col4:
+                st.markdown("**ಆಕಾರ**")
+                assessment = st.text_input("ಆಕಾರ", placeholder="Enter Assessment", label_visibility="collapsed", key="assessment")
+            
+            # Second row of inputs
+            col5, col6, col7, col8 = st.columns(4)
+            
+            with col5:
+                st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
+                kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="kjp_extent")
+            
+            with col6:
+                st.markdown("**ಆಕಾರ**")
+                kjp_assessment = st.text_input("ಆಕಾರ", placeholder="Enter Assessment", label_visibility="collapsed", key="kjp_assessment")
+            
+            with col7:
+                st.markdown("**ಜಮೀನ ತರಹೆ**")
+                kjp_land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], label_visibility="collapsed", key="kjp_land_type")
+            
+            with col8:
+                st.markdown("&nbsp;")
+                # Empty space since Add button is moved to buttons row
+            
+            # Action buttons - Add button in buttons row like KJP app
+            st.markdown("---")
+            col9, col10, col11, col12, col13 = st.columns(5)
+            
+            with col9:
+                add_clicked = st.button("Add", use_container_width=True, key="add_btn")
+            
+            with col10:
+                edit_clicked = st.button("Edit", use_container_width=True, key="edit_btn")
+            
+            with col11:
+                delete_clicked = st.button("Delete", use_container_width=True, key="delete_btn")
+            
+            with col12:
+                total_clicked = st.button("Total", use_container_width=True, key="total_btn")
+            
+            with col13:
+                print_clicked = st.button("Print", use_container_width=True, key="print_btn")
+            
+            render_undo_redo("kamal_data")
+            
+            # Handle Add button
+            if add_clicked:
+                try:
+                    with profiled("form parsing"):
+                        total_extent_val = Extent.parse(total_extent, "Total Extent")
+                        kharab_extent_val = Extent.parse(kharab_extent, "Kharab")
+                        assessment_val = self.parse_assessment(assessment)
+                        kjp_extent_val = Extent.parse(kjp_extent, "KJP Extent")
+                        kjp_assessment_val = self.parse_assessment(kjp_assessment)
+                    
+                        if not land_type:
+                            st.error("Land type is mandatory.")
+                            return
+                    
+                        if kharab_extent_val > total_extent_val:
+                            st.error("Kharab extent cannot exceed total extent.")
+                            return
+                    
+                        if kjp_extent_val > ZERO and not kjp_land_type:
+                            st.error("KJP land type is mandatory when KJP extent is provided.")
+                            return
+                    
+                        cultivable_extent = total_extent_val - kharab_extent_val
+                        amended_total_extent = total_extent_val
+                        amended_kharab_extent = kharab_extent_val
+                        amended_cultivable_extent = cultivable_extent
+                        amended_assessment = to_paise(assessment_val)
+                        remark = ZERO
+
+                        if kjp_extent_val > ZERO:
+                            if land_type == kjp_land_type:
+                                amended_kharab_extent = kharab_extent_val + kjp_extent_val
+                                amended_cultivable_extent = total_extent_val - amended_kharab_extent
+                                amended_assessment = to_paise(assessment_val) - to_paise(kjp_assessment_val)
+                                remark = kjp_extent_val
+                    
+                    with profiled("record append"), sheet_action("kamal_data", "Add"):
+                        st.session_state.kamal_data.append(
+                            RowType.DATA,
+                            LandType=land_type,
+                            AsIs_TotalExtent=total_extent_val,
+                            AsIs_Kharab=kharab_extent_val,
+                            AsIs_Cultivable=cultivable_extent,
+                            AsIs_Assessment=to_paise(assessment_val),
+                            Amended_TotalExtent=amended_total_extent,
+                            Amended_Kharab=amended_kharab_extent,
+                            Amended_Cultivable=amended_cultivable_extent,
+                            Amended_Assessment=amended_assessment,
+                            Remark=remark
+                        )
+                    st.success("Record added successfully!")
+                    st.rerun()
+                    
+                except ValueError as e:
+                    st.error(str(e))
+            
+            # Handle other buttons; Edit and Delete open a panel that stays open across reruns
+            if edit_clicked:
+                st.session_state.kamal_action = "edit"
+            
+            if delete_clicked:
+                st.session_state.kamal_action = "delete"
+            
+            if st.session_state.kamal_action == "edit":
+                self.edit_record()
+            elif st.session_state.kamal_action == "delete":
+                self.delete_record()
+            
+            if total_clicked:
+                self.update_totals()
+            
+            if print_clicked:
+                self.print_data()
+            render_job("kamal_print_job", self.show_print)
+    
+    @st.fragment
+    def render_table(self):
+        """The records table and running totals, rerun on their own while paging"""
+        with fragment_phase("records table"):
+            # Display data table
+            st.markdown("---")
+            if st.session_state.kamal_data:
+                # Separators are print-only
+                render_records_table(st.session_state.kamal_data, [RowType.DATA, RowType.TOTAL],
+                                     self.display_rows, "kamal")
+                
+                render_running_totals(st.session_state.kamal_data, self.DISPLAY_COLUMNS)
+            else:
+                st.info("No records added yet.")
+    
+    def derived_from_kjp(self, kjp):
+        """The Kamal Berij sheet implied by the KJP sheet, with its separator and total rows"""
+        derived = KamalStore()
+        columns = kjp.kamal_berij()
+        derived.extend(np.full(len(columns["LandType"]), RowType.DATA, dtype=np.int8), **columns)
+        derived.append(RowType.SEPARATOR)
+        derived.append(RowType.TOTAL, **derived.totals(RowType.DATA))
+        return derived
+    
+    def render_derive_from_kjp(self):
+        """Offer the Kamal Berij derived from the KJP sheet in place of entering it by hand"""
+        with st.expander("Derive from the KJP sheet"):
+            kjp = st.session_state.get("kjp_data")
+            if kjp is None or not len(kjp.positions(RowType.DATA)):
+                st.info("The KJP sheet has no records yet.")
+                return
+            
+            # Read from the KJP store's running totals, so this is current after every KJP change
+            derived = kjp.view("kamal_berij", lambda: self.derived_from_kjp(kjp))
+            st.dataframe(self.display_rows(derived.formatted().iloc[derived.positions(RowType.DATA, RowType.TOTAL)]),
+                         use_container_width=True, hide_index=True)
+            missing = kjp.without_land_type()
+            if missing:
+                st.warning(f"{missing} KJP rows have no land type and are left out.")
+            
+            if st.button("Replace Kamal Berij records with these", key="kamal_from_kjp"):
+                store = st.session_state.kamal_data
+                with sheet_action("kamal_data", "Derive from KJP"):
+                    store.remove_types(RowType.DATA, RowType.SEPARATOR, RowType.TOTAL)
+                    store.extend(derived.row_types(), **{name: derived.column(name) for name, _, _ in derived.COLUMNS})
+                st.rerun()
+    
+    def close_action(self):
+        st.session_state.kamal_action = None
+        st.session_state.kamal_editing_id = None
+    
+    def select_record(self, label, key):
+        # Records are picked by id, so a selection stays on the same record while others are added or deleted
+        return select_record(st.session_state.kamal_data, [RowType.DATA], "LandType", label, key,
+                             "Land type, e.g. ತರಿ")
+    
+    def edit_record(self):
+        if not len(st.session_state.kamal_data.positions(RowType.DATA)):
+            st.warning("No data records to edit.")
+            self.close_action()
+            return
+        
+        selected_id = self.select_record("Select record to edit:", "edit_select")
+        
+        col_load, col_close = st.columns(2)
+        with col_load:
+            if st.button("Load for Editing", key="load_edit", disabled=selected_id is None):
+                st.session_state.kamal_editing_id = selected_id
+        with col_close:
+            if st.button("Close", key="close_edit"):
+                self.close_action()
+                st.rerun()
+        
+        self.show_edit_form()
+    
+    def show_edit_form(self):
+        record_id = st.session_state.kamal_editing_id
+        if record_id is None:
+            return
+        
+        try:
+            record = st.session_state.kamal_data.get(record_id)
+        except KeyError:
+            st.session_state.kamal_editing_id = None
+            st.warning("The record being edited has been deleted.")
+            return
+        
+        st.subheader("Edit Record")
+        
+        with st.form("edit_kamal_form"):
+            col1, col2, col3, col4 = st.columns(4)
+            
+            # Keyed by record, so loading another record shows its values
+            with col1:
+                land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], 
+                                       index=["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"].index(record["LandType"]),
+                                       key=f"edit_land_type_{record_id}")
+                total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", value=str(record["AsIs_TotalExtent"]), key=f"edit_total_extent_{record_id}")
+            
+            with col2:
+                kharab_extent = st.text_input("ಖರಾಬ", value=str(record["AsIs_Kharab"]), key=f"edit_kharab_extent_{record_id}")
+                assessment_text = format_paise(record["AsIs_Assessment"]) if record["AsIs_Assessment"] > 0 else ""
+                assessment = st.text_input("ಆಕಾರ", value=assessment_text, key=f"edit_assessment_{record_id}")
+            
+            with col3:
+                # The remark holds the KJP extent
+                kjp_extent_input = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", value=str(record["Remark"]), key=f"edit_kjp_extent_{record_id}")
+                
+                # Calculate KJP assessment
+                kjp_assessment_val = record["AsIs_Assessment"] - record["Amended_Assessment"]
+                kjp_assessment = st.text_input("ಆಕಾರ", value=format_paise(kjp_assessment_val), key=f"edit_kjp_assessment_{record_id}")
+            
+            with col4:
+                # A KJP extent is only recorded when it is of the record's own land type
+                kjp_land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], 
+                                           index=["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"].index(record["LandType"]),
+                                           key=f"edit_kjp_land_type_select_{record_id}")
+            
+            col_save, col_cancel = st.columns(2)
+            with col_save:
+                save_clicked = st.form_submit_button("Save", use_container_width=True)
+            
+            with col_cancel:
+                cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+            
+            if save_clicked:
+                try:
+                    total_extent_val = Extent.parse(total_extent, "Total Extent")
+                    kharab_extent_val = Extent.parse(kharab_extent, "Kharab")
+                    assessment_val = self.parse_assessment(assessment)
+                    kjp_extent_val = Extent.parse(kjp_extent_input, "KJP Extent")
+                    kjp_assessment_val = self.parse_assessment(kjp_assessment)
+                    
+                    if not land_type:
+                        st.error("Land type is mandatory.")
+                        return
+                    
+                    if kharab_extent_val > total_extent_val:
+                        st.error("Kharab extent cannot exceed total extent.")
+                        return
+                    
+                    if kjp_extent_val > ZERO and not kjp_land_type:
+                        st.error("KJP land type is mandatory when KJP extent is provided.")
+                        return
+                    
+                    cultivable_extent = total_extent_val - kharab_extent_val
+                    amended_total_extent = total_extent_val
+                    amended_kharab_extent = kharab_extent_val
+                    amended_cultivable_extent = cultivable_extent
+                    amended_assessment = to_paise(assessment_val)
+                    remark = ZERO
+                    
+                    if kjp_extent_val > ZERO:
+                        if land_type == kjp_land_type:
+                            amended_kharab_extent = kharab_extent_val + kjp_extent_val
+                            amended_cultivable_extent = total_extent_val - amended_kharab_extent
+                            amended_assessment = to_paise(assessment_val) - to_paise(kjp_assessment_val)
+                            remark = kjp_extent_val
+                    
+                    with sheet_action("kamal_data", "Edit"):
+                        st.session_state.kamal_data.update(
+                            record_id,
+                            LandType=land_type,
+                            AsIs_TotalExtent=total_extent_val,
+                            AsIs_Kharab=kharab_extent_val,
+                            AsIs_Cultivable=cultivable_extent,
+                            AsIs_Assessment=to_paise(assessment_val),
+                            Amended_TotalExtent=amended_total_extent,
+                            Amended_Kharab=amended_kharab_extent,
+                            Amended_Cultivable=amended_cultivable_extent,
+                            Amended_Assessment=amended_assessment,
+                            Remark=remark
+                        )
+                    self.close_action()
+                    st.success("Record updated successfully!")
+                    st.rerun()
+                    
+                except ValueError as e:
+                    st.error(str(e))
+            
+            if cancel_clicked:
+                st.session_state.kamal_editing_id = None
+                st.rerun()
+    
+    def delete_record(self):
+        if not len(st.session_state.kamal_data.positions(RowType.DATA)):
+            st.warning("No data records to delete.")
+            self.close_action()
+            return
+        
+        selected_id = self.select_record("Select record to delete:", "delete_select")
+        
+        col_delete, col_cancel = st.columns(2)
+        with col_delete:
+            if st.button("Delete Selected Record", key="confirm_delete", disabled=selected_id is None):
+                with sheet_action("kamal_data", "Delete"):
+                    st.session_state.kamal_data.delete(selected_id)
+                self.close_action()
+                st.success("Record deleted successfully!")
+                st.rerun()
+        with col_cancel:
+            if st.button("Cancel", key="cancel_delete"):
+                self.close_action()
+                st.rerun()
+    
+    def update_totals(self):
+        if not st.session_state.kamal_data:
+            st.warning("No records to calculate totals.")
+            return
+        
+        store = st.session_state.kamal_data
+        
+        with sheet_action("kamal_data", "Total"):
+            # Remove existing totals and separators
+            store.remove_types(RowType.SEPARATOR, RowType.TOTAL)
+        
+            # Add separator and total row; the store keeps the data totals current on every change
+            store.append(RowType.SEPARATOR)
+            store.append(RowType.TOTAL, **store.totals(RowType.DATA))
+        st.success("Totals updated successfully!")
+        st.rerun()
+    
+    def print_data(self):
+        if not st.session_state.kamal_data:
+            st.warning("No data available to print.")
+            return
+        
+        location_data = self.get_kjp_location_data()
+        if not all([location_data['village'], location_data['taluka'], location_data['district'], location_data['kjp_share']]):
+            st.warning("Please enter location details before printing.")
+            return
+        
+        with profiled("print generation"):
+            st.session_state.kamal_print_job = submit_print(
+                KAMAL_SHEET, st.session_state.kamal_data, location_data,
+                st.session_state.get("print_rows_per_page", ROWS_PER_PAGE))
+    
+    def show_print(self, html_content):
+        location_data = self.get_kjp_location_data()
+        # Served as a file rather than inlined into a popup script, so large sheets stay out of the page
+        st.download_button("Download Print Sheet", html_content,
+                           file_name=f"kamal_berij_{location_data['village']}.html", mime="text/html",
+                           on_click="ignore", use_container_width=True)
+        st.success("Print sheet ready. Open the downloaded file and press Print (A4 landscape).")
+
+
+class KJPLandSurveyApp:
+    DISPLAY_COLUMNS = {
+        "AsIs_SurveyHissa": "ಸ.ನಂ/ಹಿ.ನಂ.",
+        "AsIs_TotalExtent": "ಒಟ್ಟು ಕ್ಷೇತ್ರ",
+        "AsIs_Kharab": "ಖರಾಬ",
+        "AsIs_Cultivable": "ಸಾಗು ಕ್ಷೇತ್ರ",
+        "AsIs_Rate": "ದರ",
+        "AsIs_Assessment": "ಆಕಾರ (₹)",
+        "Amended_SurveyHissa": "ದುರಸ್ತಿ_ಸ.ನಂ",
+        "Amended_TotalExtent": "ದುರಸ್ತಿ_ಒಟ್ಟು",
+        "Amended_Kharab": "ದುರಸ್ತಿ_ಖರಾಬ",
+        "Amended_Cultivable": "ದುರಸ್ತಿ_ಸಾಗು",
+        "Amended_Rate": "ದುರಸ್ತಿ_ದರ",
+        "Amended_Assessment": "ದುರಸ್ತಿ_ಆಕಾರ"
+    }
+    
+    # Entry grid columns, as bulk_import fields
+    GRID_FIELDS = ["survey_hissa", "total_extent", "kharab_extent", "rate", "kjp_extent", "land_type", "ex_kjp"]
+    
+    def __init__(self):
+        self.initialize_session_state()
+    
+    def initialize_session_state(self):
+        if 'kjp_data' not in st.session_state:
+            st.session_state.kjp_data = KJPStore()
+        if 'kjp_action' not in st.session_state:
+            st.session_state.kjp_action = None
+        if 'kjp_editing_id' not in st.session_state:
+            st.session_state.kjp_editing_id = None
+        if 'ex_kjp_mode' not in st.session_state:
+            st.session_state.ex_kjp_mode = False
+        if 'kjp_location_data' not in st.session_state:
+            st.session_state.kjp_location_data = {
+                'district': '', 'taluka': '', 'hobli': '', 
+                'village': '', 'kjp_share': ''
+            }
+        if 'current_survey_no' not in st.session_state:
+            st.session_state.current_survey_no = ""
+        if 'current_hissa_no' not in st.session_state:
+            st.session_state.current_hissa_no = 1
+        if 'kjp_grid_version' not in st.session_state:
+            # Bumped to give the entry grid fresh starting rows
+            st.session_state.kjp_grid_version = 0
+    
+    def parse_rate(self, rate_text):
+        try:
+            rate = 0 if rate_text in ["", "0"] else float(rate_text.strip())
+            if rate < 0:
+                raise ValueError("Rate cannot be negative.")
+            return rate
+        except ValueError:
+            raise ValueError("Invalid rate input.")
+    
+    def grid_rows(self, rejected=None):
+        """Starting rows of the entry grid: rows the last commit rejected, then blank ones"""
+        import pandas as pd
+        from bulk_import import KJP_FIELDS
+        # Headed as on the entry form, which the importer accepts as well
+        columns = [KJP_FIELDS[field][1] for field in self.GRID_FIELDS] + ["Error"]
+        blank = pd.DataFrame("", index=range(GRID_BLANK_ROWS), columns=columns)
+        return blank if rejected is None else pd.concat([rejected[columns], blank], ignore_index=True)
+    
+    def commit_grid(self):
+        """Validate, amend and append every filled-in row of the entry grid in one pass (the Commit callback)"""
+        import bulk_import
+        frame = editor_frame(st.session_state.kjp_grid_base, st.session_state[f"kjp_grid_{st.session_state.kjp_grid_version}"])
+        frame = frame[(frame.drop(columns="Error").apply(lambda column: column.str.strip()) != "").any(axis=1)]
+        frame = frame.reset_index(drop=True)
+        if frame.empty:
+            st.session_state.kjp_grid_message = ("warning", "The grid has no rows to commit.")
+            return
+        location_data = st.session_state.kjp_location_data
+        if not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']]):
+            st.session_state.kjp_grid_message = ("error", "Please enter location details before adding records.")
+            return
+        
+        result = bulk_import.import_kjp(frame, rates=read_rate_table().village_rates(location_data))
+        if len(result.row_types):
+            with sheet_action("kjp_data", "Grid entry"):
+                st.session_state.kjp_data.extend(result.row_types, **result.columns)
+        
+        # Rejected rows go back into the grid with their errors, to be fixed and committed again
+        rejected = frame.iloc[result.errors["Row"].to_numpy() - 2].copy()
+        rejected["Error"] = result.errors["Error"].to_numpy()
+        st.session_state.kjp_grid_base = self.grid_rows(rejected)
+        st.session_state.kjp_grid_version += 1
+        message = f"Committed {len(frame) - len(rejected)} of {len(frame)} rows ({len(result.row_types)} records)."
+        if len(rejected):
+            st.session_state.kjp_grid_message = ("warning", message + " The rows left in the grid need fixing.")
+        else:
+            st.session_state.kjp_grid_message = ("success", message)
+    
+    def render_entry_grid(self):
+        """Many hissas typed into one grid and committed together, costing a single rerun"""
+        with st.expander("Grid Entry"):
+            # An expander's body runs even while it is closed, so the grid (and pandas) waits for this
+            if not st.toggle("Open the entry grid", key="kjp_grid_open"):
+                return
+            st.caption("Type one hissa per row; the grid is sent only on Commit. Fill Ex KJP with its note "
+                       "for an Ex KJP record. A blank rate takes the rate table's.")
+            if "kjp_grid_base" not in st.session_state:
+                st.session_state.kjp_grid_base = self.grid_rows()
+            from bulk_import import KJP_FIELDS
+            headers = {field: KJP_FIELDS[field][1] for field in self.GRID_FIELDS}
+            with st.form("kjp_grid_form", border=False):
+                st.data_editor(
+                    st.session_state.kjp_grid_base, key=f"kjp_grid_{st.session_state.kjp_grid_version}",
+                    num_rows="dynamic", hide_index=True, use_container_width=True,
+                    column_config={
+                        headers["land_type"]: st.column_config.SelectboxColumn(options=LAND_TYPES),
+                        "Error": st.column_config.TextColumn(disabled=True),
+                    })
+                st.form_submit_button("Commit", on_click=self.commit_grid, use_container_width=True)
+            kind, text = st.session_state.pop("kjp_grid_message", (None, None))
+            if kind:
+                getattr(st, kind)(text)
+    
+    def table_rate(self, land_type):
+        """The rate table's rate in paise for this village's land type, None if it has none"""
+        return read_rate_table().rate(st.session_state.kjp_location_data, land_type)
+    
+    def apply_rate_table(self):
+        """Re-rate the sheet's records when the rate table has changed since this session last read it"""
+        master = read_rate_table()
+        seen = st.session_state.get("kjp_rates_version", master.version)
+        st.session_state.kjp_rates_version = master.version
+        rates = master.village_rates(st.session_state.kjp_location_data)
+        if seen == master.version or rates is None:
+            return
+        with sheet_action("kjp_data", "Re-rate"):
+            changed = st.session_state.kjp_data.rerate(rates)
+        if changed:
+            st.info(f"The rate table changed: re-rated {changed} records.")
+    
+    def render_rate_table(self):
+        """The village's rates from the rate table, re-rating on demand, and replacing the table"""
+        with st.expander("Rate Table"):
+            rates = read_rate_table().village_rates(st.session_state.kjp_location_data)
+            if rates is None:
+                st.caption("The rate table has no rates for this village; type each record's rate.")
+            else:
+                st.caption(", ".join(f"{name}: ₹{format_paise(int(rate))} per acre"
+                                     for name, rate in zip(LAND_TYPES, rates) if rate >= 0)
+                           + ". A blank rate takes the table's rate for the record's land type.")
+                if st.button("Re-rate all records from the table", key="kjp_rerate"):
+                    with sheet_action("kjp_data", "Re-rate"):
+                        changed = st.session_state.kjp_data.rerate(rates)
+                    st.success(f"Re-rated {changed} records.")
+            
+            uploaded = st.file_uploader("New rate table (CSV: district, taluka, hobli, village, land_type, rate)",
+                                        type=["csv"], key="rates_upload")
+            if uploaded is not None and st.button("Save rate table", key="rates_save"):
+                try:
+                    save_rates(uploaded.getvalue())
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(f"Could not use the rate table: {e}")
+                    return
+                # The next rerun sees the new table and re-rates the sheet
+                st.rerun()
+    
+    def hissa_rows(self, survey_hissa, land_type, total_extent, kharab_extent, rate, kjp_extent):
+        """Values of a hissa's A row and of its KJP (B) row, None when no B row is due.
+        
+        A blank rate takes the village's rate for the land type from the rate table."""
+        total_extent_val = Extent.parse(total_extent, "Total Extent")
+        kharab_extent_val = Extent.parse(kharab_extent, "Kharab")
+        table_rate = self.table_rate(land_type) if not rate.strip() else None
+        rate_paise = table_rate if table_rate is not None else to_paise(self.parse_rate(rate))
+        kjp_extent_val = Extent.parse(kjp_extent, "KJP Extent")
+        
+        cultivable_extent = total_extent_val - kharab_extent_val
+        if cultivable_extent < ZERO:
+            raise ValueError("Cultivable area cannot be negative.")
+        
+        # A row calculations
+        a_row_amended_total_extent = total_extent_val - kjp_extent_val
+        a_row_amended_kharab_extent = kharab_extent_val
+        a_row_amended_cultivable_extent = a_row_amended_total_extent - a_row_amended_kharab_extent
+        
+        assessment = assessment_paise(rate_paise, cultivable_extent.aana)
+        a_row_amended_assessment = assessment_paise(rate_paise, a_row_amended_cultivable_extent.aana)
+        
+        # For amended survey/hissa, add * if KJP extent exists
+        amended_survey_hissa = survey_hissa + "*" if kjp_extent_val > ZERO else survey_hissa
+        
+        a_row = dict(
+            LandType=land_type,
+            AsIs_SurveyHissa=survey_hissa,
+            AsIs_TotalExtent=total_extent_val,
+            AsIs_Kharab=kharab_extent_val,
+            AsIs_Cultivable=cultivable_extent,
+            AsIs_Rate=rate_paise,
+            AsIs_Assessment=assessment,
+            Amended_SurveyHissa=amended_survey_hissa,
+            Amended_TotalExtent=a_row_amended_total_extent,
+            Amended_Kharab=a_row_amended_kharab_extent,
+            Amended_Cultivable=a_row_amended_cultivable_extent,
+            Amended_Rate=rate_paise,
+            Amended_Assessment=a_row_amended_assessment
+        )
+        
+        # KJP row (B row) if KJP extent exists and is less than total extent
+        b_row = None
+        if kjp_extent_val > ZERO and kjp_extent_val < total_extent_val:
+            b_row = dict(
+                LandType=land_type,
+                Amended_SurveyHissa=amended_survey_hissa,
+                Amended_TotalExtent=kjp_extent_val,
+                Amended_Kharab=kjp_extent_val
+            )
+        return a_row, b_row
+    
+    def display_rows(self, rows):
+        """Formatted store rows as the Kannada-headed table"""
+        df = rows[list(self.DISPLAY_COLUMNS)].rename(columns=self.DISPLAY_COLUMNS)
+        # Special display for Ex KJP records
+        ex_kjp = (rows["type"] == "ex_kjp").to_numpy()
+        df.loc[ex_kjp, ["ಸಾಗು ಕ್ಷೇತ್ರ", "ದರ", "ಆಕಾರ (₹)", "ದುರಸ್ತಿ_ದರ", "ದುರಸ್ತಿ_ಆಕಾರ"]] = "EX KJP"
+        return df
+    
+    def generate_print_html(self, rows_per_page=ROWS_PER_PAGE):
+        location_data = st.session_state.kjp_location_data
+        return KJP_SHEET.render(st.session_state.kjp_data.formatted(), location_data, rows_per_page)
+    
+    def render(self):
+        # Check expiry before rendering anything
+        check_expiry()
+        
+        # Stylish modern heading with smaller font
+        st.markdown(HEADER_HTML, unsafe_allow_html=True)
+        
+        # Location inputs like original app - in main content area
+        with profiled("location inputs"):
+            st.subheader("Location Information")
+            loc_col1, loc_col2, loc_col3, loc_col4, loc_col5 = st.columns(5)
+        
+            with loc_col1:
+                district = st.text_input("ಜಿಲ್ಲೆ", placeholder="Enter District", 
+                                       value=st.session_state.kjp_location_data['district'],
+                                       key="kjp_district")
+                st.session_state.kjp_location_data['district'] = district
+        
+            with loc_col2:
+                taluka = st.text_input("ತಾಲೂಕು", placeholder="Enter Taluka",
+                                     value=st.session_state.kjp_location_data['taluka'],
+                                     key="kjp_taluka")
+                st.session_state.kjp_location_data['taluka'] = taluka
+        
+            with loc_col3:
+                hobli = st.text_input("ಹೋಬಳಿ", placeholder="Enter Hobli",
+                                    value=st.session_state.kjp_location_data['hobli'],
+                                    key="kjp_hobli")
+                st.session_state.kjp_location_data['hobli'] = hobli
+        
+            with loc_col4:
+                village = st.text_input("ಗ್ರಾಮ", placeholder="Enter Village",
+                                      value=st.session_state.kjp_location_data['village'],
+                                      key="kjp_village")
+                st.session_state.kjp_location_data['village'] = village
+        
+            with loc_col5:
+                kjp_share = st.text_input("ಕ.ಜ.ಪ ಶೇ.ನಂ.", placeholder="Enter KJP Share",
+                                        value=st.session_state.kjp_location_data['kjp_share'],
+                                        key="kjp_kjp_share")
+                st.session_state.kjp_location_data['kjp_share'] = kjp_share
+        
+            bind_village_storage("kjp_data", "kjp", KJPStore, st.session_state.kjp_location_data)
+            self.apply_rate_table()
+        
+        # Typing in the form reruns only this fragment; a handler that changes the
+        # sheet reruns the whole page so the table shows the change
+        self.render_entry_form()
+        
+        location_data = st.session_state.kjp_location_data
+        location_missing = not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']])
+        table_rates = read_rate_table(report=True).village_rates(location_data)
+        render_bulk_import("kjp_data", "import_kjp", "kjp",
+                           "Please enter location details before adding records." if location_missing else None,
+                           {"rates": table_rates} if table_rates is not None else None)
+        self.render_rate_table()
+        self.render_entry_grid()
+        
+        self.render_table()
+    
+    @st.fragment
+    def render_entry_form(self):
+        """The record inputs, action buttons and their handlers, rerun on their own while typing"""
+        with fragment_phase("entry form"):
+            # Ex KJP mode toggle
+            st.subheader("Record Details")
+            col_ex1, col_ex2 = st.columns([1, 4])
+            with col_ex1:
+                ex_kjp_mode = st.checkbox("Ex KJP", value=st.session_state.ex_kjp_mode)
+                st.session_state.ex_kjp_mode = ex_kjp_mode
+            
+            with col_ex2:
+                if ex_kjp_mode:
+                    ex_kjp_input = st.text_input("Ex KJP Input", placeholder="Enter Ex KJP details")
+            
+            # Input form with survey number handling
+            if not ex_kjp_mode:
+                col1, col2, col3, col4, col5, col6 = st.columns(6)
+                
+                with col1:
+                    st.markdown("**ಸ.ನಂ/ಹಿ.ನಂ.**")
+                    survey_input = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", placeholder="Enter Survey No", label_visibility="collapsed", 
+                                               key="survey_input")
+                    
+                    with profiled("hissa auto-increment"):
+                        # Auto-generate survey/hissa number: the next hissa after the highest
+                        # already recorded under that survey, looked up in the store's index
+                        if survey_input and "/" not in survey_input:
+                            # New survey number entered
+                            st.session_state.current_survey_no = survey_input
+                            st.session_state.current_hissa_no = st.session_state.kjp_data.next_hissa(survey_input)
+                            survey_hissa = f"{survey_input}/{st.session_state.current_hissa_no}"
+                        elif not survey_input and st.session_state.current_survey_no:
+                            # Continue with the next hissa of the current survey
+                            st.session_state.current_hissa_no = st.session_state.kjp_data.next_hissa(st.session_state.current_survey_no)
+                            survey_hissa = f"{st.session_state.current_survey_no}/{st.session_state.current_hissa_no}"
+                        else:
+                            survey_hissa = survey_input
+                    
+                    if survey_input:
+                        st.info(f"Current: {survey_hissa}")
+                    
+                with col2:
+                    st.markdown("**ಒಟ್ಟು ಕ್ಷೇತ್ರ**")
+                    total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="total_extent")
+                
+                with col3:
+                    st.markdown("**ಖರಾಬ**")
+                    kharab_extent = st.text_input("ಖರಾಬ", placeholder="A-G-A", label_visibility="collapsed", key="kharab_extent")
+                
+                with col4:
+                    st.markdown("**ದರ**")
+                    # The land type chosen on the last rerun picks the rate table's suggestion
+                    table_rate = self.table_rate(st.session_state.get("kjp_record_land_type", LAND_TYPES[0]))
+                    rate = st.text_input("ದರ", label_visibility="collapsed", key="rate",
+                                         placeholder=f"{format_paise(table_rate)} (rate table)" if table_rate is not None else "Enter Rate")
+                
+                with col5:
+                    st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
+                    kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="kjp_extent")
+                
+                with col6:
+                    # Groups the hissa into the Kamal Berij derived from this sheet
+                    st.markdown("**ಜಮೀನ ತರಹೆ**")
+                    land_type = st.selectbox("ಜಮೀನ ತರಹೆ", ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"], label_visibility="collapsed", key="kjp_record_land_type")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.markdown("**ಸ.ನಂ/ಹಿ.ನಂ.**")
+                    survey_hissa = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", placeholder="Enter Survey/Hissa", label_visibility="collapsed", key="ex_survey")
+                with col2:
+                    st.markdown("**ಕಜಪ ಕ್ಷೇತ್ರ**")
+                    kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", placeholder="A-G-A", label_visibility="collapsed", key="ex_kjp_extent")
+            
+            # Action buttons
+            st.markdown("---")
+            col_btn1, col_btn2, col_btn3, col_btn4, col_btn5 = st.columns(5)
+            
+            with col_btn1:
+                add_clicked = st.button("Add", use_container_width=True)
+            
+            with col_btn2:
+                edit_clicked = st.button("Edit", use_container_width=True)
+            
+            with col_btn3:
+                delete_clicked = st.button("Delete", use_container_width=True)
+            
+            with col_btn4:
+                total_clicked = st.button("Total", use_container_width=True)
+            
+            with col_btn5:
+                print_clicked = st.button("Print", use_container_width=True)
+            
+            render_undo_redo("kjp_data")
+            
+            # Handle Add button
+            if add_clicked:
+                try:
+                    # Check if location data is available
+                    location_data = st.session_state.kjp_location_data
+                    if not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']]):
+                        st.error("Please enter location details before adding records.")
+                    elif not survey_hissa:
+                        st.error("Survey/Hissa number is required.")
+                    else:
+                        if ex_kjp_mode:
+                            if not ex_kjp_input:
+                                st.error("Ex KJP input is required in Ex KJP mode.")
+                            else:
+                                with profiled("form parsing"):
+                                    kjp_extent_val = Extent.parse(kjp_extent, "KJP Extent")
+                                
+                                with profiled("record append"), sheet_action("kjp_data", "Add"):
+                                    st.session_state.kjp_data.append(
+                                        RowType.EX_KJP,
+                                        AsIs_SurveyHissa=survey_hissa,
+                                        AsIs_TotalExtent=kjp_extent_val,
+                                        AsIs_Kharab=kjp_extent_val,
+                                        Amended_SurveyHissa=survey_hissa,
+                                        Amended_TotalExtent=kjp_extent_val,
+                                        Amended_Kharab=kjp_extent_val,
+                                        Note=ex_kjp_input
+                                    )
+                                st.success("Ex KJP record added successfully!")
+                                st.rerun()
+                        else:
+                            with profiled("form parsing"):
+                                a_row, b_row = self.hissa_rows(survey_hissa, land_type, total_extent, kharab_extent, rate, kjp_extent)
+                            
+                            # A row (main record), then its KJP row (B row) if any, inserted right under
+                            # the A row so no other user's appended record can come between them
+                            with profiled("record append"), sheet_action("kjp_data", "Add"):
+                                store = st.session_state.kjp_data
+                                a_row_id = store.append(RowType.DATA, **a_row)
+                                if b_row:
+                                    store.insert(store.position(a_row_id) + 1, RowType.KJP_ROW, **b_row)
+                        
+                            # Auto-increment hissa number for next record
+                            if st.session_state.current_survey_no:
+                                st.session_state.current_hissa_no += 1
+                        
+                            st.success("Record added successfully!")
+                            st.rerun()
+                        
+                except ValueError as e:
+                    st.error(f"Invalid input: {str(e)}")
+            
+            # Handle other buttons; Edit and Delete open a panel that stays open across reruns
+            if edit_clicked:
+                st.session_state.kjp_action = "edit"
+            
+            if delete_clicked:
+                st.session_state.kjp_action = "delete"
+            
+            if st.session_state.kjp_action == "edit":
+                self.edit_record()
+            elif st.session_state.kjp_action == "delete":
+                self.delete_record()
+            
+            if total_clicked:
+                self.update_totals()
+            
+            if print_clicked:
+                self.print_data()
+            render_job("kjp_print_job", self.show_print)
+    
+    @st.fragment
+    def render_table(self):
+        """The records table and running totals, rerun on their own while paging"""
+        with fragment_phase("records table"):
+            # Display data table - Show all record types including Ex KJP
+            st.markdown("---")
+            if st.session_state.kjp_data:
+                # Separators are print-only
+                render_records_table(st.session_state.kjp_data,
+                                     [RowType.DATA, RowType.TOTAL, RowType.EX_KJP, RowType.KJP_ROW],
+                                     self.display_rows, "kjp")
+                
+                render_running_totals(st.session_state.kjp_data, self.DISPLAY_COLUMNS)
+            else:
+                st.info("No records added yet.")
+    
+    def close_action(self):
+        st.session_state.kjp_action = None
+        st.session_state.kjp_editing_id = None
+    
+    def select_record(self, label, key):
+        # KJP rows (B rows) follow their A row and are edited and deleted with it
+        return select_record(st.session_state.kjp_data, [RowType.DATA, RowType.EX_KJP], "AsIs_SurveyHissa", label, key,
+                             "Survey/hissa: 112, 112/3 or 112/3-112/9")
+    
+    def edit_record(self):
+        if not len(st.session_state.kjp_data.positions(RowType.DATA, RowType.EX_KJP)):
+            st.warning("No data records to edit.")
+            self.close_action()
+            return
+        
+        selected_id = self.select_record("Select record to edit:", "kjp_edit_select")
+        
+        col_load, col_close = st.columns(2)
+        with col_load:
+            if st.button("Load for Editing", key="kjp_load_edit", disabled=selected_id is None):
+                st.session_state.kjp_editing_id = selected_id
+        with col_close:
+            if st.button("Close", key="kjp_close_edit"):
+                self.close_action()
+                st.rerun()
+        
+        self.show_edit_form()
+    
+    def show_edit_form(self):
+        record_id = st.session_state.kjp_editing_id
+        if record_id is None:
+            return
+        
+        store = st.session_state.kjp_data
+        try:
+            record = store.get(record_id)
+        except KeyError:
+            st.session_state.kjp_editing_id = None
+            st.warning("The record being edited has been deleted.")
+            return
+        ex_kjp = record["type"] == RowType.EX_KJP
+        
+        st.subheader("Edit Record")
+        
+        with st.form("edit_kjp_form"):
+            # Keyed by record, so loading another record shows its values
+            if ex_kjp:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    survey_hissa = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", value=record["AsIs_SurveyHissa"], key=f"kjp_edit_survey_{record_id}")
+                with col2:
+                    kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", value=str(record["AsIs_TotalExtent"]), key=f"kjp_edit_kjp_extent_{record_id}")
+                with col3:
+                    ex_kjp_input = st.text_input("Ex KJP Input", value=record["Note"], key=f"kjp_edit_note_{record_id}")
+            else:
+                col1, col2, col3, col4, col5, col6 = st.columns(6)
+                with col1:
+                    survey_hissa = st.text_input("ಸ.ನಂ/ಹಿ.ನಂ.", value=record["AsIs_SurveyHissa"], key=f"kjp_edit_survey_{record_id}")
+                with col2:
+                    total_extent = st.text_input("ಒಟ್ಟು ಕ್ಷೇತ್ರ", value=str(record["AsIs_TotalExtent"]), key=f"kjp_edit_total_extent_{record_id}")
+                with col3:
+                    kharab_extent = st.text_input("ಖರಾಬ", value=str(record["AsIs_Kharab"]), key=f"kjp_edit_kharab_{record_id}")
+                with col4:
+                    rate_text = format_paise(record["AsIs_Rate"]) if record["AsIs_Rate"] > 0 else ""
+                    rate = st.text_input("ದರ", value=rate_text, key=f"kjp_edit_rate_{record_id}")
+                with col5:
+                    # The KJP extent is what the A row's amended total lost
+                    kjp_extent_val = record["AsIs_TotalExtent"] - record["Amended_TotalExtent"]
+                    kjp_extent = st.text_input("ಕಜಪ ಕ್ಷೇತ್ರ", value=str(kjp_extent_val), key=f"kjp_edit_kjp_extent_{record_id}")
+                with col6:
+                    land_types = ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"]
+                    land_type = st.selectbox("ಜಮೀನ ತರಹೆ", land_types,
+                                             index=land_types.index(record["LandType"]) if record["LandType"] else 0,
+                                             key=f"kjp_edit_land_type_{record_id}")
+            
+            col_save, col_cancel = st.columns(2)
+            with col_save:
+                save_clicked = st.form_submit_button("Save", use_container_width=True)
+            
+            with col_cancel:
+                cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+            
+            if save_clicked:
+                try:
+                    if not survey_hissa:
+                        st.error("Survey/Hissa number is required.")
+                        return
+                    
+                    if ex_kjp:
+                        if not ex_kjp_input:
+                            st.error("Ex KJP input is required in Ex KJP mode.")
+                            return
+                        kjp_extent_val = Extent.parse(kjp_extent, "KJP Extent")
+                        with sheet_action("kjp_data", "Edit"):
+                            store.update(
+                                record_id,
+                                AsIs_SurveyHissa=survey_hissa,
+                                AsIs_TotalExtent=kjp_extent_val,
+                                AsIs_Kharab=kjp_extent_val,
+                                Amended_SurveyHissa=survey_hissa,
+                                Amended_TotalExtent=kjp_extent_val,
+                                Amended_Kharab=kjp_extent_val,
+                                Note=ex_kjp_input
+                            )
+                    else:
+                        a_row, b_row = self.hissa_rows(survey_hissa, land_type, total_extent, kharab_extent, rate, kjp_extent)
+                        with sheet_action("kjp_data", "Edit"):
+                            b_row_id = store.pair(record_id)
+                            store.update(record_id, **a_row)
+                            # The B row follows the A row: update it, add it under the A row or drop it
+                            if b_row and b_row_id is not None:
+                                store.update(b_row_id, **b_row)
+                            elif b_row:
+                                store.insert(store.position(record_id) + 1, RowType.KJP_ROW, **b_row)
+                            elif b_row_id is not None:
+                                store.delete(b_row_id)
+                    
+                    self.close_action()
+                    st.success("Record updated successfully!")
+                    st.rerun()
+                    
+                except ValueError as e:
+                    st.error(f"Invalid input: {str(e)}")
+            
+            if cancel_clicked:
+                st.session_state.kjp_editing_id = None
+                st.rerun()
+    
+    def delete_record(self):
+        if not len(st.session_state.kjp_data.positions(RowType.DATA, RowType.EX_KJP)):
+            st.warning("No data records to delete.")
+            self.close_action()
+            return
+        
+        selected_id = self.select_record("Select record to delete:", "kjp_delete_select")
+        
+        col_delete, col_cancel = st.columns(2)
+        with col_delete:
+            if st.button("Delete Selected Record", key="kjp_confirm_delete", disabled=selected_id is None):
+                store = st.session_state.kjp_data
+                # An A row takes its KJP row with it
+                with sheet_action("kjp_data", "Delete"):
+                    b_row_id = store.pair(selected_id)
+                    store.delete(selected_id)
+                    if b_row_id is not None:
+                        store.delete(b_row_id)
+                self.close_action()
+                st.success("Record deleted successfully!")
+                st.rerun()
+        with col_cancel:
+            if st.button("Cancel", key="kjp_cancel_delete"):
+                self.close_action()
+                st.rerun()
+    
+    def update_totals(self):
+        if not st.session_state.kjp_data:
+            st.warning("No records to calculate totals.")
+            return
+        
+        store = st.session_state.kjp_data
+        
+        with sheet_action("kjp_data", "Total"):
+            # Remove existing totals and separators
+            store.remove_types(RowType.SEPARATOR, RowType.TOTAL)
+        
+            # Add separator and total row (only data records count, not KJP rows or Ex KJP);
+            # the store keeps those totals current on every change
+            store.append(RowType.SEPARATOR)
+            store.append(RowType.TOTAL, **store.totals(RowType.DATA))
+        st.success("Totals updated successfully!")
+        st.rerun()
+    
+    def print_data(self):
+        if not st.session_state.kjp_data:
+            st.warning("No data available to print.")
+            return
+        
+        # Check location data
+        location_data = st.session_state.kjp_location_data
+        if not all([location_data['village'], location_data['hobli'], location_data['taluka'], location_data['district']]):
+            st.warning("Please enter location details before printing.")
+            return
+        
+        with profiled("print generation"):
+            st.session_state.kjp_print_job = submit_print(
+                KJP_SHEET, st.session_state.kjp_data, location_data,
+                st.session_state.get("print_rows_per_page", ROWS_PER_PAGE))
+    
+    def show_print(self, html_content):
+        location_data = st.session_state.kjp_location_data
+        # Served as a file rather than inlined into a popup script, so large sheets stay out of the page
+        st.download_button("Download Print Sheet", html_content,
+                           file_name=f"kjp_patrike_{location_data['village']}.html", mime="text/html",
+                           on_click="ignore", use_container_width=True)
+        st.success("Print sheet ready. Open the downloaded file and press Print (A4 landscape).")
+
+
+def main():
+    # Check if app has expired before rendering anything
+    check_expiry()
+    
+    st.set_page_config(
+        page_title="M. J. Sikandar's KJP App",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # Initialize session state for location data
+    if 'kjp_location_data' not in st.session_state:
+        st.session_state.kjp_location_data = {
+            'district': '', 'taluka': '', 'hobli': '', 
+            'village': '', 'kjp_share': ''
+        }
+    
+    st.sidebar.title("KJP Applications")
+    app_choice = st.sidebar.radio(
+        "Select Application:",
+        ["ಕ.ಜ.ಪ ಪತ್ರಿಕೆ", "ಕಮಾಲ ಬೇರಿಜು"]
+    )
+    st.sidebar.number_input("Rows per printed page", min_value=5, max_value=100,
+                            value=ROWS_PER_PAGE, key="print_rows_per_page")
+    
+    if 'profiler' not in st.session_state:
+        st.session_state.profiler = Profiler()
+    profiler = st.session_state.profiler
+    profiler.enabled = st.session_state.get("profile_reruns", False)
+    profiler.start(app_choice)
+    
+    # App objects are built once per session and reused by every rerun
+    apps = st.session_state.setdefault("apps", {})
+    try:
+        if app_choice == "ಕ.ಜ.ಪ ಪತ್ರಿಕೆ":
+            if "kjp" not in apps:
+                apps["kjp"] = KJPLandSurveyApp()
+            apps["kjp"].render()
+        else:
+            if "kamal" not in apps:
+                apps["kamal"] = KamalBerijuApp()
+            apps["kamal"].render()
+    finally:
+        # Also reached when a button handler reruns the script
+        profiler.finish()
+    
+    render_profiler_panel(profiler)
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
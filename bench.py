@@ -0,0 +1,362 @@
+"""Benchmarks for extent math, totals, table building and print rendering.
+
+    python bench.py [--sizes 100 1000 10000 100000] [--repeat 3] [--startup] [--reruns 10]
+                    [--save baseline.json] [--compare baseline.json] [--threshold 1.25]
+
+Each stage runs outside Streamlit on synthetic villages of the given numbers
+of hissas and reports the best time of --repeat runs, rows per second and
+peak traced memory. --save writes the results as a baseline; --compare
+reports every stage that got slower than the baseline by more than
+--threshold and exits non-zero if any did. --startup also times loading the
+app script in fresh interpreters, lists its slowest imports and draws a
+first page, exiting non-zero if that imports pandas. --reruns
+drives the app page under streamlit.testing and compares what an edit in
+the record form cost when it reran the whole page with what it costs now
+that only the entry form fragment reruns.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from bulk_import import import_kamal, import_kjp, parse_extents
+from extent import AANA_PER_ACRE, AANA_PER_GUNTA, Extent, _decode_extent, _format_aana, parse_extent_array
+from printing import KAMAL_SHEET, KJP_SHEET, render_store
+from records import LAND_TYPES, KamalStore, KJPStore, RowType, format_extents
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "3.py")
+
+# Loads the app script as a module (so main() does not run) in a fresh interpreter
+STARTUP_PROBE = """
+import importlib.util, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("kjp_app", {script!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - started, "pandas" in sys.modules)
+"""
+
+# The app page run as a page script under streamlit.testing, over a synthetic village of
+# {hissas} hissas (none for 0); it imports what it needs itself, and bench only for a village
+PAGE_SCRIPT = """
+import importlib.util, os, sys
+import streamlit as st
+app = sys.modules.get("kjp_app")
+if app is None:
+    sys.path.insert(0, os.path.dirname({script!r}))
+    spec = importlib.util.spec_from_file_location("kjp_app", {script!r})
+    app = sys.modules["kjp_app"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    # Time the page, not the licence check
+    app.check_expiry = lambda: None
+if {hissas} and "kjp_data" not in st.session_state:
+    import bench
+    st.session_state.kjp_data = bench.village({hissas})["kjp"]
+    st.session_state.profile_reruns = True
+app.main()
+"""
+
+# Draws a new session's first page in a fresh interpreter
+FIRST_PAGE_PROBE = """
+import sys
+from streamlit.testing.v1 import AppTest
+page = AppTest.from_string({page!r}, default_timeout=60).run()
+print(len(page.exception), "pandas" in sys.modules)
+"""
+
+# Edits typed into the record form, one per timed rerun
+RERUN_EDITS = [f"{acres}-{gunta}-0" for acres in range(1, 4) for gunta in range(0, 40, 5)]
+
+LOCATION = {"district": "D", "taluka": "T", "hobli": "H", "village": "V", "kjp_share": "1"}
+
+
+def extent_texts(aana):
+    acres, rem = np.divmod(aana, AANA_PER_ACRE)
+    gunta, aana = np.divmod(rem, AANA_PER_GUNTA)
+    return pd.Series(acres).astype(str) + "-" + pd.Series(gunta).astype(str) + "-" + pd.Series(aana).astype(str)
+
+
+def kjp_sheet(hissas, seed=0):
+    """A synthetic KJP sheet: about 10% of hissas lose land to KJP, 3% are Ex KJP"""
+    rng = np.random.default_rng(seed)
+    total = rng.integers(AANA_PER_GUNTA, 8 * AANA_PER_ACRE, hissas)
+    kharab = (total * rng.uniform(0, 0.2, hissas)).astype(np.int64)
+    kjp = np.where(rng.random(hissas) < 0.13, (total * rng.uniform(0.1, 0.6, hissas)).astype(np.int64), 0)
+    ex_kjp = rng.random(hissas) < 0.03
+    surveys = np.sort(rng.integers(1, max(hissas // 4, 2), hissas))
+    hissa_numbers = pd.Series(surveys).groupby(surveys).cumcount() + 1
+    return pd.DataFrame({
+        "survey_hissa": pd.Series(surveys).astype(str) + "/" + hissa_numbers.astype(str),
+        "total_extent": extent_texts(total),
+        "kharab_extent": extent_texts(kharab),
+        "rate": pd.Series(rng.integers(50, 500, hissas)).astype(str),
+        "kjp_extent": extent_texts(kjp).where(kjp > 0, ""),
+        "ex_kjp": pd.Series(np.where(ex_kjp, "ex kjp", "")),
+        "land_type": pd.Series(np.array(LAND_TYPES, dtype=object)[rng.integers(0, len(LAND_TYPES), hissas)]),
+    })
+
+
+def kamal_sheet(hissas, seed=0):
+    rng = np.random.default_rng(seed)
+    total = rng.integers(AANA_PER_GUNTA, 20 * AANA_PER_ACRE, hissas)
+    kharab = (total * rng.uniform(0, 0.2, hissas)).astype(np.int64)
+    land_type = pd.Series(np.array(LAND_TYPES, dtype=object)[rng.integers(0, len(LAND_TYPES), hissas)])
+    kjp = np.where(rng.random(hissas) < 0.2, (total * rng.uniform(0, 0.5, hissas)).astype(np.int64), 0)
+    return pd.DataFrame({
+        "land_type": land_type,
+        "total_extent": extent_texts(total),
+        "kharab_extent": extent_texts(kharab),
+        "assessment": pd.Series(rng.integers(1, 5000, hissas)).astype(str),
+        "kjp_extent": extent_texts(kjp).where(kjp > 0, ""),
+        "kjp_assessment": pd.Series(np.where(kjp > 0, "2.5", "")),
+        "kjp_land_type": land_type.where(kjp > 0, ""),
+    })
+
+
+def village(hissas):
+    """Imported KJP and Kamal Berij stores with their separator and total rows"""
+    stores = {}
+    for name, sheet, importer, store_class in [("kjp", kjp_sheet, import_kjp, KJPStore),
+                                               ("kamal", kamal_sheet, import_kamal, KamalStore)]:
+        result = importer(sheet(hissas))
+        store = store_class()
+        store.extend(result.row_types, **result.columns)
+        add_totals(store)
+        stores[name] = store
+    return stores
+
+
+def add_totals(store):
+    # What the Total button does
+    store.remove_types(RowType.SEPARATOR, RowType.TOTAL)
+    store.append(RowType.SEPARATOR)
+    store.append(RowType.TOTAL, **store.totals(RowType.DATA))
+
+
+def parse_scalar(ctx):
+    # Time the parsing itself, not lookups in the memo warmed by the previous run
+    _decode_extent.cache_clear()
+    for text in ctx["texts"]:
+        Extent.parse(text, "Total Extent")
+
+
+def format_scalar(ctx):
+    _format_aana.cache_clear()
+    for aana in ctx["aana"]:
+        str(Extent(aana))
+
+
+def stage_inputs(hissas):
+    sheet = kjp_sheet(hissas)
+    stores = village(hissas)
+    return {
+        "sheet": sheet,
+        "kamal_sheet": kamal_sheet(hissas),
+        "texts": sheet["total_extent"].tolist(),
+        "aana": stores["kjp"].column("AsIs_TotalExtent").tolist(),
+        "kjp": stores["kjp"],
+        "kamal": stores["kamal"],
+    }
+
+
+def fresh_formatted(store):
+    store.views = type(store.views)()
+    return store.formatted()
+
+
+def print_sheet(ctx):
+    # What Print costs when the sheet has changed: formatting the records, then the HTML
+    store = ctx["kjp"]
+    store.views = type(store.views)()
+    return render_store(KJP_SHEET, store, LOCATION)
+
+
+def search_records(ctx):
+    # Index build (once per change) plus a prefix and a range query
+    store = ctx["kjp"]
+    store.views = type(store.views)()
+    store.search("1", limit=50)
+    store.search("10-20", limit=50)
+
+
+# (name, function of the stage inputs); each is timed on every size
+STAGES = [
+    ("parse_extent (scalar)", parse_scalar),
+    ("parse_extent (batch codec)", lambda ctx: parse_extent_array(ctx["sheet"]["total_extent"])),
+    ("parse_extent (vectorised)", lambda ctx: parse_extents(ctx["sheet"]["total_extent"], "Total Extent")),
+    ("format_extent (scalar)", format_scalar),
+    ("format_extent (vectorised)", lambda ctx: format_extents(ctx["kjp"].column("AsIs_TotalExtent"))),
+    ("import KJP sheet", lambda ctx: import_kjp(ctx["sheet"])),
+    ("import Kamal sheet", lambda ctx: import_kamal(ctx["kamal_sheet"])),
+    ("update_totals", lambda ctx: add_totals(ctx["kjp"])),
+    ("formatted table", lambda ctx: fresh_formatted(ctx["kjp"])),
+    ("record search", search_records),
+    ("derive Kamal from KJP", lambda ctx: ctx["kjp"].kamal_berij()),
+    ("reassess KJP sheet", lambda ctx: ctx["kjp"].reassess()),
+    ("generate_print_html KJP", lambda ctx: KJP_SHEET.render(ctx["kjp"].formatted(), LOCATION)),
+    ("generate_print_html Kamal", lambda ctx: KAMAL_SHEET.render(ctx["kamal"].formatted(), LOCATION)),
+    ("print KJP sheet (format + HTML)", print_sheet),
+]
+
+
+def measure(function, ctx, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(ctx)
+        best = min(best, time.perf_counter() - started)
+    # A separate traced run, so tracing does not skew the timings
+    tracemalloc.start()
+    function(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes, repeat, stages=STAGES):
+    results = []
+    for hissas in sizes:
+        ctx = stage_inputs(hissas)
+        for name, function in stages:
+            seconds, peak = measure(function, ctx, repeat)
+            results.append({"stage": name, "hissas": hissas, "seconds": seconds,
+                            "rows_per_second": hissas / seconds if seconds else float("inf"),
+                            "peak_bytes": peak})
+            print_result(results[-1])
+    return results
+
+
+def print_result(result):
+    print(f"{result['stage']:<32} {result['hissas']:>7} hissas  {result['seconds'] * 1000:>10.2f} ms"
+          f"  {result['rows_per_second']:>12,.0f} rows/s  {result['peak_bytes'] / 2 ** 20:>8.2f} MiB peak")
+
+
+def startup_report(runs=5, top=10):
+    """Cold start of the app script: median load time over fresh interpreters, slowest imports
+    and whether drawing the first page loads pandas"""
+    probe = STARTUP_PROBE.format(script=APP_SCRIPT)
+    cwd = os.path.dirname(APP_SCRIPT)
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True, cwd=cwd)
+        seconds, pandas_loaded = out.stdout.split()
+        timings.append(float(seconds))
+    result = {"stage": "cold start", "hissas": 0, "seconds": statistics.median(timings),
+              "rows_per_second": 0.0, "peak_bytes": 0}
+    print(f"Cold start: {result['seconds'] * 1000:.1f} ms median over {runs} fresh interpreters"
+          f" (min {min(timings) * 1000:.1f} ms); pandas loaded at startup: {pandas_loaded}")
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                         capture_output=True, text=True, check=True, cwd=cwd)
+    imports = []
+    for line in out.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and not fields[2].startswith("  ") and fields[1].strip().isdigit():
+            imports.append((int(fields[1]), fields[2].strip()))
+    print("Slowest top-level imports:")
+    for cumulative, name in sorted(imports, reverse=True)[:top]:
+        print(f"  {name:<30} {cumulative / 1000:>8.1f} ms")
+
+    probe = FIRST_PAGE_PROBE.format(page=PAGE_SCRIPT.format(script=APP_SCRIPT, hissas=0))
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True, cwd=cwd)
+    errors, first_page_pandas = out.stdout.split()
+    if int(errors):
+        raise RuntimeError(f"The first page raised {errors} exception(s):\n{out.stderr}")
+    result["first_page_pandas"] = first_page_pandas == "True"
+    print(f"pandas loaded by the first page: {first_page_pandas}")
+    return result
+
+
+def rerun_report(sizes, runs):
+    """Median profiled time of a rerun after a form edit: the whole KJP page, as every
+    edit cost before the page was split into fragments, and the entry form and records
+    table fragments, of which an edit now reruns only the form"""
+    from streamlit.testing.v1 import AppTest
+    results = []
+    for hissas in sizes:
+        page = AppTest.from_string(PAGE_SCRIPT.format(script=APP_SCRIPT, hissas=hissas), default_timeout=300)
+        page.run()
+        for edit in (RERUN_EDITS * runs)[:runs]:
+            page.text_input(key="total_extent").set_value(edit).run()
+        reruns = list(page.session_state["profiler"].history)[-runs:]
+
+        def median_ms(phase):
+            return 1000 * statistics.median(sum(p["seconds"] for p in rerun["phases"] if p["phase"] == phase)
+                                            for rerun in reruns)
+
+        whole, form, table = (statistics.median(rerun["seconds"] for rerun in reruns) * 1000,
+                              median_ms("entry form"), median_ms("records table"))
+        print(f"Rerun after a form edit, {hissas:>7} hissas: whole page {whole:>8.2f} ms before,"
+              f" entry form fragment {form:>7.2f} ms after ({whole / form:.1f}x);"
+              f" records table fragment {table:.2f} ms, now skipped")
+        for stage, ms in [("rerun: whole page", whole), ("rerun: entry form fragment", form),
+                          ("rerun: records table fragment", table)]:
+            results.append({"stage": stage, "hissas": hissas, "seconds": ms / 1000,
+                            "rows_per_second": 0.0, "peak_bytes": 0})
+    return results
+
+
+def save(results, path):
+    with open(path, "w", encoding="utf-8") as out:
+        json.dump({"python": sys.version.split()[0], "machine": platform.machine(),
+                   "pandas": pd.__version__, "numpy": np.__version__, "results": results}, out, indent=2)
+
+
+def compare(results, path, threshold):
+    """Print the stages slower than the baseline at path by more than threshold; return them"""
+    with open(path, encoding="utf-8") as f:
+        baseline = {(r["stage"], r["hissas"]): r for r in json.load(f)["results"]}
+    slower = []
+    for result in results:
+        before = baseline.get((result["stage"], result["hissas"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        if ratio > threshold:
+            slower.append(result)
+            print(f"SLOWER {result['stage']} at {result['hissas']} hissas: {ratio:.2f}x the baseline")
+    if not slower:
+        print(f"No stage is more than {threshold:.2f}x slower than {path}.")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extent math, totals and print rendering.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="hissas per synthetic village")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--startup", action="store_true", help="also report the app's cold-start time")
+    parser.add_argument("--reruns", type=int, default=0, metavar="N",
+                        help="also time N app page reruns per size, whole page against fragments")
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat)
+    failed = False
+    if args.startup:
+        results.append(startup_report())
+        if results[-1]["first_page_pandas"]:
+            print("REGRESSION: drawing the first page imports pandas.")
+            failed = True
+    if args.reruns:
+        results.extend(rerun_report(args.sizes, args.reruns))
+    if args.save:
+        save(results, args.save)
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
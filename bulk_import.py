@@ -0,0 +1,236 @@
+import io
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from extent import EXTENT_MESSAGES, extent_error, parse_extent_array
+from records import LAND_TYPES, RowType, assessment_paise, to_paise
+
+# Spreadsheet headers accepted for each field, English or as on the entry form
+KJP_FIELDS = {
+    "survey_hissa": ["survey_hissa", "ಸ.ನಂ/ಹಿ.ನಂ."],
+    "total_extent": ["total_extent", "ಒಟ್ಟು ಕ್ಷೇತ್ರ"],
+    "kharab_extent": ["kharab_extent", "ಖರಾಬ"],
+    "rate": ["rate", "ದರ"],
+    "kjp_extent": ["kjp_extent", "ಕಜಪ ಕ್ಷೇತ್ರ"],
+    "ex_kjp": ["ex_kjp", "Ex KJP"],
+    "land_type": ["land_type", "ಜಮೀನ ತರಹೆ"],
+}
+
+KAMAL_FIELDS = {
+    "land_type": ["land_type", "ಜಮೀನ ತರಹೆ"],
+    "total_extent": ["total_extent", "ಒಟ್ಟು ಕ್ಷೇತ್ರ"],
+    "kharab_extent": ["kharab_extent", "ಖರಾಬ"],
+    "assessment": ["assessment", "ಆಕಾರ"],
+    "kjp_extent": ["kjp_extent", "ಕಜಪ ಕ್ಷೇತ್ರ"],
+    "kjp_assessment": ["kjp_assessment", "ಕಜಪ ಆಕಾರ"],
+    "kjp_land_type": ["kjp_land_type", "ಕಜಪ ಜಮೀನ ತರಹೆ"],
+}
+
+# row_types and columns go straight to RecordStore.extend; errors has one
+# row per rejected spreadsheet row
+ImportResult = namedtuple("ImportResult", "row_types columns errors")
+
+
+def read_sheet(source, name=""):
+    """Load a CSV or XLSX upload as text columns (.xlsx needs openpyxl)"""
+    name = name or getattr(source, "name", "")
+    if name.lower().endswith((".xlsx", ".xls")):
+        frame = pd.read_excel(source, dtype=str)
+    else:
+        frame = pd.read_csv(source, dtype=str, keep_default_na=False)
+    return frame.fillna("")
+
+
+def import_upload(importer, data, name, progress=None, **options):
+    """Read an uploaded sheet's bytes and import them with importer(frame, **options);
+    returns (rows read, ImportResult)"""
+    progress = progress or (lambda fraction, message: None)
+    progress(0.0, "Reading the sheet")
+    try:
+        frame = read_sheet(io.BytesIO(data), name)
+    except ImportError:
+        raise ValueError("Reading .xlsx files needs the openpyxl package.")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Could not read the sheet: {e}")
+    progress(0.3, "Checking and amending rows")
+    return len(frame), importer(frame, **options)
+
+
+def _fields(frame, fields):
+    """Pick each field's column by any of its accepted headers; missing fields read as blank"""
+    headers = {str(col).strip(): col for col in frame.columns}
+    picked = {}
+    for field, aliases in fields.items():
+        column = next((headers[alias] for alias in aliases if alias in headers), None)
+        picked[field] = frame[column].astype(str) if column is not None else pd.Series("", index=frame.index)
+    return picked
+
+
+def _first_error(errors, mask, message):
+    """Record message for rows in mask that have no earlier error"""
+    return errors.mask(mask & (errors == ""), message)
+
+
+def parse_extents(text, field_name):
+    """Vectorised Extent.parse: (aana array, error message per row, "" when valid)"""
+    aana, codes = parse_extent_array(text)
+    messages = np.array([""] + [extent_error(code, field_name) for code in EXTENT_MESSAGES], dtype=object)
+    return aana, pd.Series(messages[codes], index=text.index)
+
+
+def parse_amounts(text, label):
+    """Vectorised parse_rate/parse_assessment: (rupee floats, error per row)"""
+    text = text.astype(str)
+    values = pd.to_numeric(text.str.strip().where(~text.isin(["", "0"]), "0"), errors="coerce")
+    errors = pd.Series("", index=text.index)
+    errors = _first_error(errors, values.isna() | (values < 0), f"Invalid {label} input.")
+    return values.where(errors == "", 0).to_numpy(dtype=float), errors
+
+
+def _error_report(errors):
+    bad = errors != ""
+    # Spreadsheet row numbers: the header is row 1
+    return pd.DataFrame({"Row": np.flatnonzero(bad.to_numpy()) + 2, "Error": errors[bad].to_numpy()})
+
+
+def _interleave(parts):
+    """Concatenate (keys, row_types, columns) parts ordered by key, keeping part order on ties"""
+    keys = np.concatenate([p[0] for p in parts])
+    order = np.argsort(keys, kind="stable")
+    row_types = np.concatenate([p[1] for p in parts])[order]
+    columns = {}
+    for name in set().union(*(p[2] for p in parts)):
+        sample = next(np.asarray(p[2][name]) for p in parts if name in p[2])
+        fill = "" if sample.dtype == object else 0
+        pieces = [np.asarray(part_columns[name]) if name in part_columns
+                  else np.full(len(part_keys), fill, dtype=sample.dtype)
+                  for part_keys, _, part_columns in parts]
+        columns[name] = np.concatenate(pieces)[order]
+    return row_types, columns
+
+
+def import_kjp(frame, rates=None):
+    """Validate and amend a whole KJP sheet column-wise, as the Add button does per record.
+
+    rates, the village's rates by land type code (see rates.RateMaster), fills in blank rates."""
+    fields = _fields(frame, KJP_FIELDS)
+    survey_hissa = fields["survey_hissa"].str.strip()
+    ex_text = fields["ex_kjp"].str.strip()
+    ex_kjp = ex_text != ""
+    land_type = fields["land_type"].str.strip()
+
+    total, total_errors = parse_extents(fields["total_extent"], "Total Extent")
+    kharab, kharab_errors = parse_extents(fields["kharab_extent"], "Kharab")
+    rate, rate_errors = parse_amounts(fields["rate"], "rate")
+    kjp, kjp_errors = parse_extents(fields["kjp_extent"], "KJP Extent")
+
+    errors = pd.Series("", index=frame.index)
+    errors = _first_error(errors, survey_hissa == "", "Survey/Hissa number is required.")
+    for field_errors in (total_errors, kharab_errors, rate_errors):
+        errors = _first_error(errors, ~ex_kjp & (field_errors != ""), field_errors)
+    errors = _first_error(errors, kjp_errors != "", kjp_errors)
+    # Optional; a blank land type leaves the hissa out of the derived Kamal Berij
+    errors = _first_error(errors, (land_type != "") & ~land_type.isin(LAND_TYPES), "Unknown land type.")
+    cultivable = total - kharab
+    errors = _first_error(errors, ~ex_kjp & (cultivable < 0), "Cultivable area cannot be negative.")
+
+    ok = (errors == "").to_numpy()
+    ex_rows = np.flatnonzero(ok & ex_kjp.to_numpy())
+    a_rows = np.flatnonzero(ok & ~ex_kjp.to_numpy())
+    b_rows = a_rows[(kjp[a_rows] > 0) & (kjp[a_rows] < total[a_rows])]
+
+    # A row calculations
+    amended_total = total - kjp
+    amended_cultivable = amended_total - kharab
+    rate = to_paise(rate)
+    if rates is not None:
+        codes = land_type.map({name: code for code, name in enumerate(LAND_TYPES)}).fillna(-1).to_numpy(dtype=np.int64)
+        table_rate = np.where(codes >= 0, np.asarray(rates)[np.maximum(codes, 0)], -1)
+        blank = (fields["rate"].str.strip() == "").to_numpy()
+        rate = np.where(blank & (table_rate >= 0), table_rate, rate)
+    assessment = assessment_paise(rate, cultivable)
+    amended_assessment = assessment_paise(rate, amended_cultivable)
+    hissa = survey_hissa.to_numpy(dtype=object)
+    land_type = land_type.to_numpy(dtype=object)
+    amended_hissa = np.where(kjp > 0, hissa + "*", hissa)
+
+    parts = [
+        (a_rows * 2, np.full(len(a_rows), RowType.DATA, dtype=np.int8), {
+            "LandType": land_type[a_rows],
+            "AsIs_SurveyHissa": hissa[a_rows],
+            "AsIs_TotalExtent": total[a_rows],
+            "AsIs_Kharab": kharab[a_rows],
+            "AsIs_Cultivable": cultivable[a_rows],
+            "AsIs_Rate": rate[a_rows],
+            "AsIs_Assessment": assessment[a_rows],
+            "Amended_SurveyHissa": amended_hissa[a_rows],
+            "Amended_TotalExtent": amended_total[a_rows],
+            "Amended_Kharab": kharab[a_rows],
+            "Amended_Cultivable": amended_cultivable[a_rows],
+            "Amended_Rate": rate[a_rows],
+            "Amended_Assessment": amended_assessment[a_rows],
+        }),
+        # B rows follow their A row
+        (b_rows * 2 + 1, np.full(len(b_rows), RowType.KJP_ROW, dtype=np.int8), {
+            "LandType": land_type[b_rows],
+            "Amended_SurveyHissa": amended_hissa[b_rows],
+            "Amended_TotalExtent": kjp[b_rows],
+            "Amended_Kharab": kjp[b_rows],
+        }),
+        (ex_rows * 2, np.full(len(ex_rows), RowType.EX_KJP, dtype=np.int8), {
+            "AsIs_SurveyHissa": hissa[ex_rows],
+            "AsIs_TotalExtent": kjp[ex_rows],
+            "AsIs_Kharab": kjp[ex_rows],
+            "Amended_SurveyHissa": hissa[ex_rows],
+            "Amended_TotalExtent": kjp[ex_rows],
+            "Amended_Kharab": kjp[ex_rows],
+            "Note": ex_text.to_numpy(dtype=object)[ex_rows],
+        }),
+    ]
+    row_types, columns = _interleave(parts)
+    return ImportResult(row_types, columns, _error_report(errors))
+
+
+def import_kamal(frame):
+    """Validate and amend a whole Kamal Berij sheet column-wise, as the Add button does per record"""
+    fields = _fields(frame, KAMAL_FIELDS)
+    land_type = fields["land_type"].str.strip()
+    kjp_land_type = fields["kjp_land_type"].str.strip()
+
+    total, total_errors = parse_extents(fields["total_extent"], "Total Extent")
+    kharab, kharab_errors = parse_extents(fields["kharab_extent"], "Kharab")
+    assessment, assessment_errors = parse_amounts(fields["assessment"], "assessment")
+    kjp, kjp_errors = parse_extents(fields["kjp_extent"], "KJP Extent")
+    kjp_assessment, kjp_assessment_errors = parse_amounts(fields["kjp_assessment"], "assessment")
+
+    errors = pd.Series("", index=frame.index)
+    for field_errors in (total_errors, kharab_errors, assessment_errors, kjp_errors, kjp_assessment_errors):
+        errors = _first_error(errors, field_errors != "", field_errors)
+    errors = _first_error(errors, land_type == "", "Land type is mandatory.")
+    errors = _first_error(errors, (land_type != "") & ~land_type.isin(LAND_TYPES), "Unknown land type.")
+    errors = _first_error(errors, kharab > total, "Kharab extent cannot exceed total extent.")
+    errors = _first_error(errors, (kjp > 0) & (kjp_land_type == ""), "KJP land type is mandatory when KJP extent is provided.")
+
+    # The KJP extent moves to kharab only when it is of the same land type
+    moved = (kjp > 0) & (land_type == kjp_land_type).to_numpy()
+    amended_kharab = np.where(moved, kharab + kjp, kharab)
+    assessment = to_paise(assessment)
+    amended_assessment = np.where(moved, assessment - to_paise(kjp_assessment), assessment)
+
+    rows = np.flatnonzero((errors == "").to_numpy())
+    columns = {
+        "LandType": land_type.to_numpy(dtype=object)[rows],
+        "AsIs_TotalExtent": total[rows],
+        "AsIs_Kharab": kharab[rows],
+        "AsIs_Cultivable": (total - kharab)[rows],
+        "AsIs_Assessment": assessment[rows],
+        "Amended_TotalExtent": total[rows],
+        "Amended_Kharab": amended_kharab[rows],
+        "Amended_Cultivable": (total - amended_kharab)[rows],
+        "Amended_Assessment": amended_assessment[rows],
+        "Remark": np.where(moved, kjp, 0)[rows],
+    }
+    row_types = np.full(len(rows), RowType.DATA, dtype=np.int8)
+    return ImportResult(row_types, columns, _error_report(errors))
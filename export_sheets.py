@@ -0,0 +1,145 @@
+"""Render ಕಮಾಲ ಬೇರಿಜು / ಕಜಪ ಪತ್ರಿಕೆ print sheets for a directory of villages without the UI.
+
+    python export_sheets.py INPUT_DIR OUTPUT_DIR [--jobs N] [--pdf] [--rows-per-page N]
+
+INPUT_DIR holds one CSV/XLSX sheet per village in the Bulk Import layout; the
+sheet kind is told from its headers. An optional locations.csv alongside them
+gives each sheet's location (columns: file, village, hobli, taluka, district,
+kjp_share; file is the sheet's file name or stem). PDF output needs weasyprint.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bulk_import import KAMAL_FIELDS, KJP_FIELDS, import_kamal, import_kjp, read_sheet
+from printing import ROWS_PER_PAGE, kamal_document, kjp_document, write_document
+from records import KamalStore, KJPStore, RowType
+
+LOCATIONS_FILE = "locations.csv"
+LOCATION_KEYS = ["village", "hobli", "taluka", "district", "kjp_share"]
+SHEET_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+SHEET_KINDS = {
+    "kjp": (KJP_FIELDS["survey_hissa"], KJPStore, import_kjp, kjp_document),
+    "kamal": (KAMAL_FIELDS["land_type"], KamalStore, import_kamal, kamal_document),
+}
+
+
+def sheet_kind(frame):
+    headers = {str(col).strip() for col in frame.columns}
+    for kind, (key_headers, _, _, _) in SHEET_KINDS.items():
+        if headers.intersection(key_headers):
+            return kind
+    return None
+
+
+def read_locations(input_dir):
+    """Map sheet file name and stem to its location dict from locations.csv, if present"""
+    path = os.path.join(input_dir, LOCATIONS_FILE)
+    if not os.path.exists(path):
+        return {}
+    locations = {}
+    for row in read_sheet(path).to_dict("records"):
+        name = str(row.get("file", "")).strip()
+        if name:
+            location = {key: str(row.get(key, "")).strip() for key in LOCATION_KEYS}
+            locations[name] = locations[os.path.splitext(name)[0]] = location
+    return locations
+
+
+def find_sheets(input_dir):
+    return sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if name.lower().endswith(SHEET_EXTENSIONS) and name != LOCATIONS_FILE
+    )
+
+
+def export_sheet(path, location, output_dir, rows_per_page=ROWS_PER_PAGE, pdf=False):
+    """Import one village sheet, add its totals and write the print HTML (and PDF).
+
+    Runs in a worker process; returns (path, outputs, record count, error rows, message)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    frame = read_sheet(path)
+    kind = sheet_kind(frame)
+    if kind is None:
+        return path, [], 0, 0, "not a KJP or Kamal Berij sheet"
+
+    _, store_class, importer, document = SHEET_KINDS[kind]
+    result = importer(frame)
+    store = store_class(capacity=max(len(result.row_types) + 2, 64))
+    store.extend(result.row_types, **result.columns)
+    records = len(store)
+    if records:
+        store.append(RowType.SEPARATOR)
+        store.append(RowType.TOTAL, **store.totals(RowType.DATA))
+
+    outputs = []
+    if len(result.errors):
+        errors_path = os.path.join(output_dir, f"{stem}.errors.csv")
+        result.errors.to_csv(errors_path, index=False)
+        outputs.append(errors_path)
+
+    html_path = os.path.join(output_dir, f"{stem}.html")
+    with open(html_path, "w", encoding="utf-8") as out:
+        write_document(document(store.formatted(), location, rows_per_page), out)
+    outputs.append(html_path)
+
+    if pdf:
+        from weasyprint import HTML
+        pdf_path = os.path.join(output_dir, f"{stem}.pdf")
+        HTML(filename=html_path).write_pdf(pdf_path)
+        outputs.append(pdf_path)
+
+    return path, outputs, records, len(result.errors), kind
+
+
+def export_all(input_dir, output_dir, jobs=None, rows_per_page=ROWS_PER_PAGE, pdf=False):
+    """Export every sheet in input_dir over a process pool, yielding each result as it finishes"""
+    os.makedirs(output_dir, exist_ok=True)
+    locations = read_locations(input_dir)
+    sheets = find_sheets(input_dir)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for path in sheets:
+            name = os.path.basename(path)
+            stem = os.path.splitext(name)[0]
+            location = locations.get(name) or locations.get(stem) or dict.fromkeys(LOCATION_KEYS, "")
+            location = dict(location, village=location["village"] or stem)
+            futures[pool.submit(export_sheet, path, location, output_dir, rows_per_page, pdf)] = path
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield futures[future], [], 0, 0, f"failed: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export KJP / Kamal Berij print sheets for many villages.")
+    parser.add_argument("input_dir", help="directory of per-village CSV/XLSX sheets")
+    parser.add_argument("output_dir", help="directory to write the HTML/PDF sheets to")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--rows-per-page", type=int, default=ROWS_PER_PAGE, help="sheet rows per printed page")
+    parser.add_argument("--pdf", action="store_true", help="also write PDF files (needs weasyprint)")
+    args = parser.parse_args(argv)
+
+    # Only checks weasyprint is installed, so a missing one fails before any
+    # sheet is read; the workers import it themselves when they write PDFs
+    if args.pdf and importlib.util.find_spec("weasyprint") is None:
+        parser.error("--pdf needs weasyprint (pip install weasyprint)")
+
+    failed = 0
+    for path, outputs, records, errors, message in export_all(
+            args.input_dir, args.output_dir, args.jobs, args.rows_per_page, args.pdf):
+        name = os.path.basename(path)
+        if not outputs:
+            failed += 1
+            print(f"{name}: {message}", file=sys.stderr)
+            continue
+        print(f"{name}: {message}, {records} records, {errors} rejected rows -> {', '.join(outputs)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
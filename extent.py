@@ -0,0 +1,185 @@
+import math
+from functools import lru_cache, total_ordering
+
+import numpy as np
+
+AANA_PER_GUNTA = 16
+GUNTA_PER_ACRE = 40
+AANA_PER_ACRE = AANA_PER_GUNTA * GUNTA_PER_ACRE
+
+EMPTY_EXTENTS = ("A-G-A", "", "0")
+
+# Outcome codes of parsing an extent, and the message each gives for a field
+EXTENT_OK = 0
+EXTENT_INVALID = 1
+EXTENT_GUNTA = 2
+EXTENT_AANA = 3
+EXTENT_MESSAGES = {
+    EXTENT_INVALID: "Invalid input for {field} extent.",
+    EXTENT_GUNTA: "{field} gunta must be less than 40.",
+    EXTENT_AANA: "{field} aana must be less than 16.",
+}
+
+# Longest string parse_extent_array parses as a character matrix; 15 digits
+# keep every part and the aana total well inside int64
+FAST_WIDTH = 15
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+def extent_error(code, field_name):
+    return EXTENT_MESSAGES[code].format(field=field_name)
+
+
+@lru_cache(maxsize=8192)
+def _decode_extent(extent_text):
+    """(aana, EXTENT_* code) of one A-G-A string; parts may be blank or decimal"""
+    if not extent_text or extent_text in EMPTY_EXTENTS:
+        return 0, EXTENT_OK
+
+    parts = extent_text.split('-')
+    if len(parts) > 3:
+        return 0, EXTENT_INVALID
+    try:
+        values = [float(part.strip()) if part.strip() else 0.0 for part in parts]
+    except ValueError:
+        return 0, EXTENT_INVALID
+    values += [0.0] * (3 - len(values))
+    acres, gunta, aana = values
+    if len(parts) > 1 and gunta >= GUNTA_PER_ACRE:
+        return 0, EXTENT_GUNTA
+    if len(parts) > 2 and aana >= AANA_PER_GUNTA:
+        return 0, EXTENT_AANA
+    total = acres * AANA_PER_ACRE + gunta * AANA_PER_GUNTA + aana
+    if not math.isfinite(total):
+        return 0, EXTENT_INVALID
+    return round(total), EXTENT_OK
+
+
+def parse_extent_array(texts):
+    """Batch Extent.parse over a sequence or Series of A-G-A strings, flagging bad ones instead of raising.
+
+    Returns (aana, codes): an int64 array, 0 where invalid, and an int8
+    array of EXTENT_* codes. Strings of just ASCII digits and dashes are
+    parsed together as a character matrix; the rest (spaces, decimals,
+    placeholders) go through the scalar codec once per distinct string.
+    """
+    texts = np.asarray(texts, dtype=object).astype(str)
+    aana = np.zeros(len(texts), dtype=np.int64)
+    codes = np.zeros(len(texts), dtype=np.int8)
+    width = min(texts.dtype.itemsize // 4, FAST_WIDTH)
+    short = np.flatnonzero(np.char.str_len(texts) <= width)
+
+    # One pass over the character columns, building each part's number digit by digit
+    chars = texts[short].astype(f"<U{width}").view(np.uint32).reshape(len(short), width)
+    numbers = np.zeros((3, len(short)), dtype=np.int64)
+    current = np.zeros(len(short), dtype=np.int64)
+    part = np.zeros(len(short), dtype=np.int64)
+    simple = np.ones(len(short), dtype=bool)
+    for column in chars.T:
+        # Characters below "0" wrap around, so they are not digits either
+        digit = column - ord("0")
+        is_digit = digit < 10
+        is_dash = column == ord("-")
+        simple &= is_digit | is_dash | (column == 0)
+        current = np.where(is_digit, current * 10 + digit, current)
+        ended = np.flatnonzero(is_dash & (part < 3))
+        numbers[part[ended], ended] = current[ended]
+        current[ended] = 0
+        part += is_dash
+    simple &= part < 3
+    ended = np.flatnonzero(simple)
+    numbers[part[ended], ended] = current[ended]
+
+    acres, gunta, aana_part = numbers
+    fast_codes = np.select([(part > 0) & (gunta >= GUNTA_PER_ACRE), (part > 1) & (aana_part >= AANA_PER_GUNTA)],
+                           [EXTENT_GUNTA, EXTENT_AANA], EXTENT_OK).astype(np.int8)
+    total = np.where(fast_codes == EXTENT_OK, acres * AANA_PER_ACRE + gunta * AANA_PER_GUNTA + aana_part, 0)
+    aana[short[simple]] = total[simple]
+    codes[short[simple]] = fast_codes[simple]
+
+    rest = np.ones(len(texts), dtype=bool)
+    rest[short[simple]] = False
+    if rest.any():
+        distinct, inverse = np.unique(texts[rest], return_inverse=True)
+        # Totals beyond int64 are no real extent either
+        decoded = np.array([(value, code) if value <= _INT64_MAX else (0, EXTENT_INVALID)
+                            for value, code in map(_decode_extent, distinct.tolist())], dtype=np.int64).reshape(-1, 2)
+        aana[rest] = decoded[inverse, 0]
+        codes[rest] = decoded[inverse, 1]
+    return aana, codes
+
+
+@lru_cache(maxsize=8192)
+def _format_aana(aana):
+    if aana <= 0:
+        return "0-0-0"
+    acres, rem = divmod(aana, AANA_PER_ACRE)
+    gunta, aana = divmod(rem, AANA_PER_GUNTA)
+    return f"{acres}-{gunta}-{aana}"
+
+
+@total_ordering
+class Extent:
+    """Immutable land extent stored as a whole number of aanas (1 A = 40 G = 640 aana)"""
+
+    __slots__ = ("aana",)
+
+    def __init__(self, aana=0):
+        object.__setattr__(self, "aana", int(aana))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Extent is immutable")
+
+    def __reduce__(self):
+        return (Extent, (self.aana,))
+
+    @classmethod
+    def parse(cls, extent_text, field_name=""):
+        """Parse an A-G-A string, raising ValueError with the field name on bad input"""
+        aana, code = _decode_extent(extent_text)
+        if code:
+            raise ValueError(extent_error(code, field_name))
+        return cls(aana)
+
+    def __str__(self):
+        # Non-positive extents display as "0-0-0", as the sheets always have
+        return _format_aana(self.aana)
+
+    def __repr__(self):
+        return f"Extent({str(self)!r})"
+
+    def __add__(self, other):
+        if isinstance(other, Extent):
+            return Extent(self.aana + other.aana)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Extent):
+            return Extent(self.aana - other.aana)
+        return NotImplemented
+
+    def __neg__(self):
+        return Extent(-self.aana)
+
+    def __eq__(self, other):
+        if isinstance(other, Extent):
+            return self.aana == other.aana
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Extent):
+            return self.aana < other.aana
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.aana)
+
+    def __bool__(self):
+        return self.aana != 0
+
+
+ZERO = Extent(0)
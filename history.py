@@ -0,0 +1,102 @@
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Undo steps kept per sheet
+HISTORY_STEPS = 100
+
+
+class History:
+    """Undo/redo for one store, kept as diffs rather than copies of the sheet.
+
+    Each step holds, for every change it made, the ids of the records
+    touched and snapshots of just those records before and after, so a
+    step costs memory in proportion to the rows it touched. Changes made
+    inside ``action`` form one step; any other change is a step of its own.
+    """
+
+    def __init__(self, store, steps=HISTORY_STEPS):
+        self.store = store
+        self._undo = deque(maxlen=steps)
+        self._redo = []
+        self._step = None
+        self._replaying = False
+        store.subscribe(self._record)
+
+    def _record(self, store, event, record_ids, before):
+        if self._replaying:
+            return
+        after = None if event == "delete" else store.snapshot(record_ids)
+        change = (event, record_ids.copy(), before, after)
+        if self._step is not None:
+            self._step[1].append(change)
+        else:
+            self._push((event, [change]))
+
+    def _push(self, step):
+        self._undo.append(step)
+        self._redo.clear()
+
+    @contextmanager
+    def action(self, label):
+        """Record the changes made in the block as one step named label"""
+        self._step = (label, [])
+        try:
+            yield
+        finally:
+            step, self._step = self._step, None
+            if step[1]:
+                self._push(step)
+
+    def forget(self, record_ids):
+        """Drop the steps touching records changed from outside, such as by another user.
+
+        Replaying them would put back values over the changed records, or miss
+        them, and so would replaying any step older (to undo) or newer (to redo)
+        than one of them; those go too."""
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+        for steps in (self._undo, self._redo):
+            # Both stacks end with the step next replayed
+            for index in range(len(steps) - 1, -1, -1):
+                if any(np.isin(ids, record_ids).any() for _, ids, _, _ in steps[index][1]):
+                    kept = list(steps)[index + 1:]
+                    steps.clear()
+                    steps.extend(kept)
+                    break
+
+    @property
+    def undo_label(self):
+        return self._undo[-1][0] if self._undo else None
+
+    @property
+    def redo_label(self):
+        return self._redo[-1][0] if self._redo else None
+
+    def undo(self):
+        """Revert the last step; returns its label"""
+        label, changes = self._undo.pop()
+        self._replay(changes[::-1], undo=True)
+        self._redo.append((label, changes))
+        return label
+
+    def redo(self):
+        """Make the last undone step again; returns its label"""
+        label, changes = self._redo.pop()
+        self._replay(changes, undo=False)
+        self._undo.append((label, changes))
+        return label
+
+    def _replay(self, changes, undo):
+        self._replaying = True
+        try:
+            for event, record_ids, before, after in changes:
+                if event == "update":
+                    self.store.overwrite(before if undo else after)
+                elif (event == "insert") == undo:
+                    # Undoing an insert or redoing a delete
+                    self.store.remove(record_ids)
+                else:
+                    self.store.restore(before if undo else after)
+        finally:
+            self._replaying = False
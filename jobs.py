@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+# Threads rather than processes: jobs read snapshots of session stores and
+# pandas/NumPy release the GIL for most of their work
+WORKERS = 2
+# Finished artifacts kept by content hash, and finished jobs kept for status lookups
+ARTIFACTS = 16
+JOB_HISTORY = 50
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def content_hash(*parts):
+    """Hex digest identifying parts: strings, bytes, numbers, NumPy arrays or sequences of them"""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, np.ndarray) and part.dtype != object:
+            digest.update(part.dtype.str.encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, bytes):
+            digest.update(part)
+        elif isinstance(part, (list, tuple, np.ndarray)):
+            digest.update(content_hash(*part).encode())
+        else:
+            digest.update(repr(part).encode())
+        # Separates parts, so ("ab", "c") and ("a", "bc") differ
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class Job:
+    """One piece of background work and its progress, result or error"""
+
+    def __init__(self, job_id, label, key=None):
+        self.id = job_id
+        self.label = label
+        self.key = key
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.error = None
+        self.cached = False
+        self.submitted = time.time()
+        self.seconds = None
+        self.future = Future()
+
+    def report(self, fraction, message=""):
+        """Progress callback handed to the job's function"""
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        self.message = message
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+    @property
+    def result(self):
+        return self.future.result() if self.state == DONE else None
+
+    def status(self):
+        return {"id": self.id, "label": self.label, "state": self.state, "progress": self.progress,
+                "message": self.message, "error": self.error, "cached": self.cached, "seconds": self.seconds}
+
+    async def wait(self):
+        """Await the job's result from asyncio code"""
+        return await asyncio.wrap_future(self.future)
+
+
+class JobQueue:
+    """Runs jobs on a thread pool and keeps their artifacts by content hash.
+
+    A job submitted with a key whose artifact is cached finishes at once
+    with that artifact, so repeating work on unchanged data costs nothing.
+    """
+
+    def __init__(self, workers=WORKERS, artifacts=ARTIFACTS, history=JOB_HISTORY):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kjp-job")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._artifacts = OrderedDict()
+        self._max_artifacts = artifacts
+        self._max_jobs = history
+
+    def _add(self, label, key):
+        job = Job(next(self._ids), label, key)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def cached(self, label, key):
+        """A finished job holding key's artifact, or None if it is not cached; lets callers skip
+        preparing a job's inputs when its result is already known"""
+        with self._lock:
+            if key not in self._artifacts:
+                return None
+            self._artifacts.move_to_end(key)
+            job = self._add(label, key)
+        job.cached = True
+        job.seconds = 0.0
+        job.report(1.0, "Unchanged since the last run")
+        job.future.set_result(self._artifacts[key])
+        job.state = DONE
+        return job
+
+    def submit(self, label, function, *args, key=None, **kwargs):
+        """Run function(*args, progress=job.report, **kwargs) in the background; returns its Job.
+
+        With a key (a content hash of the inputs) a cached artifact is returned at once instead."""
+        job = self.cached(label, key) if key is not None else None
+        if job is not None:
+            return job
+        with self._lock:
+            job = self._add(label, key)
+        self._pool.submit(self._run, job, function, args, kwargs)
+        return job
+
+    def _run(self, job, function, args, kwargs):
+        job.state = RUNNING
+        started = time.perf_counter()
+        try:
+            result = function(*args, progress=job.report, **kwargs)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.seconds = time.perf_counter() - started
+            job.future.set_exception(e)
+            job.state = FAILED
+            return
+        if job.key is not None:
+            with self._lock:
+                self._artifacts[job.key] = result
+                while len(self._artifacts) > self._max_artifacts:
+                    self._artifacts.popitem(last=False)
+        job.seconds = time.perf_counter() - started
+        job.report(1.0, "Done")
+        job.future.set_result(result)
+        job.state = DONE
+
+    def get(self, job_id):
+        """The job with this id, None once it has dropped out of the kept history"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
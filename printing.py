@@ -0,0 +1,246 @@
+import html
+import re
+from string import Template
+
+import numpy as np
+
+# A4 landscape fits about this many sheet rows under the heading
+ROWS_PER_PAGE = 25
+
+# One stylesheet for both sheets, built into the document head once at import
+SHEET_CSS = """
+        body { font-family: Arial, sans-serif; margin: 20px; text-align: center; background: #fff; }
+        .header { font-size: 20px; font-weight: bold; margin-bottom: 10px; color: #333; }
+        .location-info { display: flex; justify-content: space-between; margin: 15px 0; font-size: 13px; color: #555; background: #f0f0f0; padding: 8px; border-radius: 4px; }
+        .location-info div { margin: 0 8px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 15px; font-size: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+        th, td { border: 1px solid #999; padding: 6px; text-align: center; }
+        th.section-header { background-color: #d0d0d0; font-size: 12px; font-weight: bold; }
+        th.column-header { background-color: #e0e0e0; font-weight: bold; font-size: 13px; }
+        .data-row:nth-child(even) { background-color: #f5f5f5; }
+        .data-row:nth-child(odd) { background-color: #ffffff; }
+        .total-row { background-color: #e0e0e0; font-weight: bold; }
+        .kjp-row { background-color: #FFE0B2; font-weight: bold; }
+        .separator-row td { border: none; height: 8px; background-color: #d3d3d3; }
+        .signature-row { display: flex; justify-content: space-between; gap: 20px; margin: 20px auto 10px; width: 95%; flex-wrap: nowrap; }
+        .signature-row p { margin: 0; font-size: 14px; border-top: 1px solid #000; padding-top: 10px; width: 180px; text-align: center; }
+        @media print {
+            body { margin: 10px; }
+            table { page-break-inside: auto; }
+            tr { page-break-inside: avoid; page-break-after: auto; }
+            thead { display: table-header-group; }
+            .sheet-page + .sheet-page { page-break-before: always; }
+            @page {
+                size: A4 landscape;
+                margin: 10mm;
+            }
+        }
+        .print-controls { margin: 15px 0; text-align: center; }
+        .print-btn, .close-btn { 
+            padding: 8px 16px; margin: 0 10px; font-size: 14px; cursor: pointer; 
+            border: none; border-radius: 4px; color: white; 
+        }
+        .print-btn { background-color: #4CAF50; }
+        .close-btn { background-color: #f44336; }
+"""
+
+DOCUMENT_HEAD = Template("""<!DOCTYPE html>
+<html lang="kn">
+<head>
+    <meta charset="UTF-8">
+    <title>$title - Print</title>
+    <style>$css    </style>
+</head>
+<body>
+    <div class="print-controls">
+        <button class="print-btn" onclick="window.print()">Print</button>
+        <button class="close-btn" onclick="window.close()">Close</button>
+    </div>
+    <div class="header">ಕರ್ನಾಟಕ ಸರ್ಕಾರ</div>
+    <div class="header">$title</div>
+
+    <div class="location-info">
+        <div>ಗ್ರಾಮ: $village</div>
+        <div>ಹೋಬಳಿ: $hobli</div>
+        <div>ತಾಲೂಕು: $taluka</div>
+        <div>ಜಿಲ್ಲೆ: $district</div>
+        <div>ಕ.ಜ.ಪ ಶೇ.ನಂ.: $kjp_share</div>
+    </div>
+""")
+DOCUMENT_HEAD = Template(DOCUMENT_HEAD.safe_substitute(css=SHEET_CSS))
+
+TABLE_FOOT = """        </tbody>
+    </table>
+    </div>
+"""
+
+DOCUMENT_FOOT = Template("""    <div class="signature-row">
+        <p>ದುರಸ್ತಿ ಭೂಮಾಪಕರ ಸಹಿ</p>
+        <p>ತಪಾಸಕರ ಸಹಿ</p>
+        <p>ಭೂ.ದಾ.ಸ.ನಿ $taluka ಸಹಿ</p>
+        <p>ಭೂ.ದಾ.ಉ.ನಿ $district ಸಹಿ</p>
+    </div>
+</body>
+</html>
+""")
+
+LOCATION_KEYS = ("village", "hobli", "taluka", "district", "kjp_share")
+
+HTML_SPECIAL = re.compile(r"[&<>\"']")
+
+ROW_CLASSES = {"data": "data-row", "total": "total-row", "kjp_row": "kjp-row", "ex_kjp": "kjp-row"}
+
+
+def escape_column(values):
+    """HTML-escape a column of display strings; a column with nothing to escape is returned as is"""
+    values = np.asarray(values, dtype=object)
+    joined = "".join(values)
+    # A plain search for each character is much quicker than the pattern over a whole column
+    if not any(char in joined for char in "&<>\"'"):
+        return values
+    return np.array([html.escape(value) if HTML_SPECIAL.search(value) else value for value in values],
+                    dtype=object)
+
+
+class SheetTemplate:
+    """A print sheet compiled from its column spec.
+
+    columns is [(store column, header)] in sheet order and sections is
+    [(heading, column count)]. Row types print one cell per column unless
+    layouts gives them another list of cells, each a store column (or None
+    for an empty cell) and its colspan. Every layout is compiled to a single
+    %-format string when the template is built.
+    """
+
+    def __init__(self, title, sections, columns, layouts=None):
+        self.title = title
+        self.columns = [name for name, _ in columns]
+        width = len(columns)
+        self.table_head = "".join(
+            ['    <div class="sheet-page">\n    <table>\n        <thead>\n            <tr class="section-header">\n']
+            + [f'                <th colspan="{span}">{heading}</th>\n' for heading, span in sections]
+            + ['            </tr>\n            <tr class="column-header">\n']
+            + [f'                <th>{header}</th>\n' for _, header in columns]
+            + ['            </tr>\n        </thead>\n        <tbody>\n'])
+        default = [(name, 1) for name in self.columns]
+        self.rows = {}
+        for row_type, row_class in ROW_CLASSES.items():
+            self.rows[row_type] = self._compile(row_class, (layouts or {}).get(row_type, default))
+        self.rows["separator"] = (f'<tr class="separator-row"><td colspan="{width}"></td></tr>\n', [])
+
+    @staticmethod
+    def _compile(row_class, cells):
+        parts, names = [f'<tr class="{row_class}">'], []
+        for name, span in cells:
+            colspan = f' colspan="{span}"' if span > 1 else ""
+            parts.append(f"<td{colspan}>%s</td>" if name else f"<td{colspan}></td>")
+            if name:
+                names.append(name)
+        parts.append("</tr>\n")
+        return "".join(parts), names
+
+    def render_rows(self, formatted):
+        """One <tr> string per row of a RecordStore.formatted() frame"""
+        types = formatted["type"].to_numpy(dtype=object)
+        escaped = {}
+        rows = np.empty(len(formatted), dtype=object)
+        for row_type, (row_format, names) in self.rows.items():
+            positions = np.flatnonzero(types == row_type)
+            if not len(positions):
+                continue
+            if not names:
+                rows[positions] = row_format
+                continue
+            for name in names:
+                if name not in escaped:
+                    escaped[name] = escape_column(formatted[name].to_numpy())
+            # %-formatting a tuple is the quickest way Python has to fill in a row
+            rows[positions] = [row_format % values
+                               for values in zip(*(escaped[name][positions] for name in names))]
+        return rows
+
+    def document(self, formatted, location, rows_per_page=ROWS_PER_PAGE):
+        """The document as a list of strings, a new page-sized table every rows_per_page rows"""
+        location = {key: html.escape(str(location.get(key, ""))) for key in LOCATION_KEYS}
+        rows = self.render_rows(formatted).tolist()
+        parts = [DOCUMENT_HEAD.substitute(title=self.title, **location)]
+        for start in range(0, len(rows), rows_per_page):
+            parts.append(self.table_head)
+            parts.extend(rows[start:start + rows_per_page])
+            parts.append(TABLE_FOOT)
+        parts.append(DOCUMENT_FOOT.substitute(**location))
+        return parts
+
+    def render(self, formatted, location, rows_per_page=ROWS_PER_PAGE):
+        return "".join(self.document(formatted, location, rows_per_page))
+
+
+KAMAL_SHEET = SheetTemplate(
+    "ಕಮಾಲ ಬೇರಿಜು",
+    [("ಈಗಿನ ಪ್ರಕಾರ", 5), ("ದುರಸ್ತಿ ಪ್ರಕಾರ", 5)],
+    [
+        ("LandType", "ಜಮೀನ ತರಹೆ"),
+        ("AsIs_TotalExtent", "ಒಟ್ಟು ಕ್ಷೇತ್ರ"),
+        ("AsIs_Kharab", "ಖರಾಬ"),
+        ("AsIs_Cultivable", "ಸಾಗು ಕ್ಷೇತ್ರ"),
+        ("AsIs_Assessment", "ಆಕಾರ (₹)"),
+        ("Amended_TotalExtent", "ಒಟ್ಟು"),
+        ("Amended_Kharab", "ಖರಾಬ"),
+        ("Amended_Cultivable", "ಸಾಗು ಕ್ಷೇತ್ರ"),
+        ("Amended_Assessment", "ಆಕಾರ (₹)"),
+        ("Remark", "ಷರಾ"),
+    ],
+)
+
+KJP_SHEET = SheetTemplate(
+    "ಕಜಪ ಪತ್ರಿಕೆ",
+    [("ಈಗಿನ ಪ್ರಕಾರ", 6), ("ದುರಸ್ತಿ ಪ್ರಕಾರ", 6)],
+    [
+        ("AsIs_SurveyHissa", "ಸ.ನಂ/ಹಿ.ನಂ."),
+        ("AsIs_TotalExtent", "ಒಟ್ಟು ಕ್ಷೇತ್ರ"),
+        ("AsIs_Kharab", "ಖರಾಬ"),
+        ("AsIs_Cultivable", "ಸಾಗು ಕ್ಷೇತ್ರ"),
+        ("AsIs_Rate", "ದರ"),
+        ("AsIs_Assessment", "ಆಕಾರ (₹)"),
+        ("Amended_SurveyHissa", "ಸ.ನಂ/ಹಿ.ನಂ."),
+        ("Amended_TotalExtent", "ಒಟ್ಟು ಕ್ಷೇತ್ರ"),
+        ("Amended_Kharab", "ಖರಾಬ"),
+        ("Amended_Cultivable", "ಸಾಗು ಕ್ಷೇತ್ರ"),
+        ("Amended_Rate", "ದರ"),
+        ("Amended_Assessment", "ಆಕಾರ (₹)"),
+    ],
+    layouts={
+        # KJP Row (B row) with merged cells
+        "kjp_row": [(None, 1)] * 6 + [("Amended_SurveyHissa", 1), ("Amended_TotalExtent", 1),
+                                      ("Amended_Kharab", 1), ("Amended_Cultivable", 3)],
+        # Ex KJP row with merged cells
+        "ex_kjp": [("AsIs_SurveyHissa", 1), ("AsIs_TotalExtent", 1), ("AsIs_Kharab", 1), (None, 3),
+                   ("Amended_SurveyHissa", 1), ("Amended_TotalExtent", 1), ("Amended_Kharab", 1),
+                   ("Amended_Cultivable", 3)],
+    },
+)
+
+
+def write_document(chunks, out):
+    """Write a document's strings to a text file"""
+    out.writelines(chunks)
+    return out
+
+
+def kamal_document(formatted, location, rows_per_page=ROWS_PER_PAGE):
+    return KAMAL_SHEET.document(formatted, location, rows_per_page)
+
+
+def kjp_document(formatted, location, rows_per_page=ROWS_PER_PAGE):
+    return KJP_SHEET.document(formatted, location, rows_per_page)
+
+
+def render_store(sheet, store, location, rows_per_page=ROWS_PER_PAGE, progress=None):
+    """The print HTML of a store's sheet, reporting progress(fraction, message) between phases"""
+    progress = progress or (lambda fraction, message: None)
+    progress(0.0, "Formatting records")
+    formatted = store.formatted()
+    progress(0.5, "Rendering rows")
+    html = sheet.render(formatted, location, rows_per_page)
+    progress(1.0, "Done")
+    return html
@@ -0,0 +1,91 @@
+import json
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Reruns kept for the debug panel
+HISTORY = 50
+
+
+class RerunProfile:
+    """Wall time and net allocated blocks of each phase of one script rerun"""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started = time.time()
+        self.phases = []
+        self._start = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+        self.seconds = None
+        self.blocks = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        try:
+            yield
+        finally:
+            self.phases.append({"phase": name,
+                                "seconds": time.perf_counter() - started,
+                                "blocks": sys.getallocatedblocks() - blocks})
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+        self.blocks = sys.getallocatedblocks() - self._blocks
+        return self
+
+    def record(self):
+        return {"started": self.started, "label": self.label, "seconds": self.seconds,
+                "blocks": self.blocks, "phases": self.phases}
+
+
+class Profiler:
+    """Opt-in per-rerun instrumentation; phases cost nothing while it is off"""
+
+    def __init__(self, history=HISTORY):
+        self.enabled = False
+        self.current = None
+        self.history = deque(maxlen=history)
+
+    def start(self, label=""):
+        self.current = RerunProfile(label) if self.enabled else None
+        return self.current
+
+    def phase(self, name):
+        if self.current is None:
+            return nullcontext()
+        return self.current.phase(name)
+
+    def finish(self):
+        if self.current is not None:
+            self.history.append(self.current.finish().record())
+            self.current = None
+
+    @contextmanager
+    def rerun(self, label):
+        """Profile a rerun of just one part of the page, such as a fragment, as a single phase"""
+        self.start(label)
+        try:
+            with self.phase(label):
+                yield
+        finally:
+            self.finish()
+
+    def phase_summary(self):
+        """Mean and worst seconds and mean allocated blocks per phase over the kept reruns"""
+        phases = {}
+        for record in self.history:
+            for phase in record["phases"]:
+                phases.setdefault(phase["phase"], []).append(phase)
+        return [{"phase": name,
+                 "runs": len(runs),
+                 "mean_ms": 1000 * sum(p["seconds"] for p in runs) / len(runs),
+                 "max_ms": 1000 * max(p["seconds"] for p in runs),
+                 "mean_blocks": sum(p["blocks"] for p in runs) / len(runs)}
+                for name, runs in phases.items()]
+
+    def jsonl(self):
+        """The kept reruns as JSON lines, one rerun per line"""
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self.history)
@@ -0,0 +1,128 @@
+import csv
+import io
+import os
+import sqlite3
+from functools import lru_cache
+
+import numpy as np
+
+from records import LAND_TYPES, to_paise
+from storage import DATA_DIR
+
+# A village's rates are keyed by these location fields and the land type
+RATE_KEYS = ["district", "taluka", "hobli", "village"]
+RATE_FIELDS = RATE_KEYS + ["land_type", "rate"]
+
+# The rate table: a CSV file with RATE_FIELDS headers, or an SQLite file with a rates table
+RATES_PATH = os.environ.get("KJP_RATES", os.path.join(DATA_DIR, "rates.csv"))
+SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+
+
+def village_key(location):
+    return tuple(str(location.get(key, "")).strip().casefold() for key in RATE_KEYS)
+
+
+class RateMaster:
+    """Rates per acre, in paise, of each village's land types.
+
+    Each village holds an array indexed by land type code, negative where
+    the table gives no rate, so a lookup is one dict probe and one index
+    and a whole sheet is re-rated with a single fancy-indexing step.
+    """
+
+    def __init__(self, version=None):
+        self._villages = {}
+        # Changes whenever the table file does
+        self.version = version
+
+    def __len__(self):
+        return len(self._villages)
+
+    def add(self, location, land_type, rate_paise):
+        rates = self._villages.setdefault(village_key(location), np.full(len(LAND_TYPES), -1, dtype=np.int64))
+        rates[LAND_TYPES.index(land_type)] = rate_paise
+
+    def village_rates(self, location):
+        """The village's rates by land type code (-1 where unknown), None if the table has no such village"""
+        return self._villages.get(village_key(location))
+
+    def rate(self, location, land_type):
+        """The rate in paise for a village's land type, None if the table has none"""
+        rates = self.village_rates(location)
+        if rates is None or land_type not in LAND_TYPES:
+            return None
+        rate = int(rates[LAND_TYPES.index(land_type)])
+        return rate if rate >= 0 else None
+
+    @classmethod
+    def from_rows(cls, rows, version=None):
+        """Build a master from dicts with RATE_FIELDS, raising ValueError naming the first bad row"""
+        master = cls(version)
+        for number, row in enumerate(rows, start=2):
+            land_type = str(row.get("land_type") or "").strip()
+            if land_type not in LAND_TYPES:
+                raise ValueError(f"Row {number}: unknown land type {land_type!r}.")
+            try:
+                rate = float(str(row.get("rate") or "").strip())
+            except ValueError:
+                rate = -1
+            if rate < 0:
+                raise ValueError(f"Row {number}: invalid rate {row.get('rate')!r}.")
+            master.add(row, land_type, to_paise(rate))
+        return master
+
+
+def read_rates(path):
+    """The rows of a rate table file, as dicts"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(RATE_FIELDS)} FROM rates")
+            return [dict(zip(RATE_FIELDS, row)) for row in cursor]
+        finally:
+            conn.close()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+@lru_cache(maxsize=4)
+def _load(path, modified):
+    return RateMaster.from_rows(read_rates(path), version=modified)
+
+
+def rate_master(path=None):
+    """The rate table, read once per process and again only after the file changes;
+    an empty master while there is no table"""
+    path = path or RATES_PATH
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return RateMaster()
+    return _load(path, modified)
+
+
+def save_rates(data, path=None):
+    """Replace the rate table with uploaded CSV bytes, after checking every row.
+
+    An SQLite table file gets the rows in its rates table; any other path the CSV itself."""
+    path = path or RATES_PATH
+    text = data.decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(text)))
+    RateMaster.from_rows(rows)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        conn = sqlite3.connect(path)
+        try:
+            # One transaction, so no session reads a half-replaced table
+            with conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS rates ({', '.join(RATE_FIELDS)})")
+                conn.execute("DELETE FROM rates")
+                conn.executemany(f"INSERT INTO rates ({', '.join(RATE_FIELDS)}) VALUES ({', '.join('?' * len(RATE_FIELDS))})",
+                                 [[row.get(field) for field in RATE_FIELDS] for row in rows])
+        finally:
+            conn.close()
+        return
+    # Written aside and moved in, so no session reads a half-written table
+    with open(path + ".tmp", "w", newline="", encoding="utf-8") as out:
+        out.write(text)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,912 @@
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+
+import numpy as np
+# pandas is imported only where a table is built or a sheet imported, so a
+# session that has not drawn one yet starts without it
+
+from extent import AANA_PER_ACRE, AANA_PER_GUNTA, Extent
+
+LAND_TYPES = ["ಖುಷ್ಕಿ", "ತರಿ", "ಬಾಗಾಯತ"]
+
+BIN_SHETKI = "ಬಿನ್ ಶೇತ್ಕಿ ಕಡೆಗೆ ಹೋಗಿದೆ"
+
+
+class RowType(IntEnum):
+    DATA = 0
+    KJP_ROW = 1
+    EX_KJP = 2
+    SEPARATOR = 3
+    TOTAL = 4
+
+    @property
+    def label(self):
+        """The record "type" string used before the columnar store"""
+        return self.name.lower()
+
+
+# Record ids are handed out this far apart, leaving room to insert a row
+# between two neighbours (a KJP row under its A row) later
+ID_STEP = 1024
+
+# Survey/hissa numbers are searched as survey * HISSA_SPAN + hissa
+HISSA_SPAN = 1 << 20
+
+# Column kinds: extents are whole aanas, money (rates and assessments) whole paise
+EXTENT = "extent"
+MONEY = "money"
+TEXT = "text"
+LAND_TYPE = "land_type"
+
+DTYPES = {EXTENT: np.int64, MONEY: np.int64, TEXT: object, LAND_TYPE: np.int8}
+FILL = {EXTENT: 0, MONEY: 0, TEXT: "", LAND_TYPE: -1}
+
+# How a zero or negative value shows on the sheet
+BLANK_NONPOSITIVE = "nonpositive"
+BLANK_ZERO = "zero"
+DASH_ZERO = "dash"
+
+
+def round_divide(numerator, denominator):
+    """numerator / denominator rounded to the nearest integer, halves away from zero, exactly in integers.
+
+    Takes scalars or arrays; an int for scalars."""
+    numerator = np.asarray(numerator, dtype=np.int64)
+    quotient = np.sign(numerator) * ((2 * np.abs(numerator) + denominator) // (2 * denominator))
+    return int(quotient) if quotient.ndim == 0 else quotient
+
+
+def to_paise(rupees):
+    """Rupees (a float or an array of them) in whole paise, halves away from zero.
+
+    Taken to a thousandth of a paisa first, so float error such as
+    1.005 * 100 = 100.49999... does not decide which way a half rounds."""
+    return round_divide(np.rint(np.multiply(rupees, 100 * 1000)), 1000)
+
+
+def assessment_paise(rate_paise, cultivable_aana):
+    """Assessment of land at a rate per acre, in whole paise: rate × cultivable aana / 640,
+    computed exactly in integers and rounded to the nearest paisa, halves away from zero.
+
+    Takes scalars or arrays; an int for scalars."""
+    return round_divide(np.multiply(rate_paise, cultivable_aana, dtype=np.int64), AANA_PER_ACRE)
+
+
+def format_paise(paise):
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(paise), 100)
+    return f"{sign}{rupees}.{paise:02d}"
+
+
+def format_extents(aana):
+    """Vectorised Extent formatting; non-positive extents show as 0-0-0"""
+    import pandas as pd
+    # A sheet repeats a few extents over and over, so each distinct one is formatted once
+    values, inverse = np.unique(np.maximum(np.asarray(aana, dtype=np.int64), 0), return_inverse=True)
+    acres, rem = np.divmod(values, AANA_PER_ACRE)
+    gunta, aana = np.divmod(rem, AANA_PER_GUNTA)
+    text = np.array([f"{a}-{g}-{n}" for a, g, n in zip(acres.tolist(), gunta.tolist(), aana.tolist())],
+                    dtype=object)
+    return pd.Series(text[inverse], dtype=object)
+
+
+def format_money(paise):
+    """Vectorised format_paise"""
+    import pandas as pd
+    values, inverse = np.unique(np.asarray(paise, dtype=np.int64), return_inverse=True)
+    rupees, rem = np.divmod(np.abs(values), 100)
+    text = np.array([f"-{r}.{p:02d}" if negative else f"{r}.{p:02d}"
+                     for r, p, negative in zip(rupees.tolist(), rem.tolist(), (values < 0).tolist())],
+                    dtype=object)
+    return pd.Series(text[inverse], dtype=object)
+
+
+def survey_hissa_keys(texts):
+    """survey * HISSA_SPAN + hissa for "survey/hissa" texts (hissa 0 for a bare survey), -1 where not numeric"""
+    import pandas as pd
+    parts = pd.Series(texts, dtype=object).astype(str).str.rstrip("*").str.partition("/")
+    survey = pd.to_numeric(parts[0].str.strip(), errors="coerce")
+    hissa = pd.to_numeric(parts[2].str.strip().where(parts[1] != "", "0"), errors="coerce")
+    valid = (survey.notna() & hissa.notna() & (survey >= 0) & (hissa >= 0) & (hissa < HISSA_SPAN)).to_numpy()
+    keys = np.full(len(parts), -1, dtype=np.int64)
+    keys[valid] = survey[valid].to_numpy(dtype=np.int64) * HISSA_SPAN + hissa[valid].to_numpy(dtype=np.int64)
+    return keys
+
+
+class ViewCache:
+    """Views of one store (DataFrames, table pages) memoised for the current data version.
+
+    A view is rebuilt only when the version it was built for is out of date;
+    hits, rebuilds and rebuild time are counted for the metrics panel."""
+
+    def __init__(self):
+        self._version = None
+        self._views = {}
+        self.hits = 0
+        self.rebuilds = 0
+        self.rebuild_seconds = 0.0
+        self.last_rebuild_seconds = 0.0
+
+    def get(self, key, version, build):
+        if version != self._version:
+            # Every view of the old version is stale
+            self._views.clear()
+            self._version = version
+        if key in self._views:
+            self.hits += 1
+            return self._views[key]
+        started = time.perf_counter()
+        view = self._views[key] = build()
+        self.last_rebuild_seconds = time.perf_counter() - started
+        self.rebuild_seconds += self.last_rebuild_seconds
+        self.rebuilds += 1
+        return view
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.rebuilds
+        return self.hits / lookups if lookups else 0.0
+
+
+class SearchIndex:
+    """Records of a sheet sorted for the record selector's queries.
+
+    Survey/hissa texts are kept sorted as text for prefix queries ("112/",
+    "112" and "112/1" taking in 112/1/A but not 1120/1 or 112/10) and as
+    survey * HISSA_SPAN + hissa numbers for range queries ("112/3-112/9",
+    "110-115"); land types are matched by name. Every query is a binary
+    search, and results come back as record ids."""
+
+    def __init__(self, ids, texts, land_types):
+        self._ids = ids
+        self._land_types = land_types
+        keys = survey_hissa_keys(texts)
+        # Numbered records in number order, the rest after them by text
+        natural = np.lexsort((texts, np.where(keys >= 0, keys, np.iinfo(np.int64).max)))
+        rank = np.empty(len(ids), dtype=np.int64)
+        rank[natural] = np.arange(len(ids))
+        order = np.argsort(texts, kind="stable")
+        self._texts = texts[order]
+        self._text_ids = ids[order]
+        self._text_rank = rank[order]
+        numbered = natural[:np.count_nonzero(keys >= 0)]
+        self._keys = keys[numbered]
+        self._key_ids = ids[numbered]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def prefix(self, text):
+        """Records whose survey/hissa starts with text, 112/2 before 112/10"""
+        start = np.searchsorted(self._texts, text, side="left")
+        stop = np.searchsorted(self._texts, text + "\U0010ffff", side="left")
+        return self._text_ids[start:stop][np.argsort(self._text_rank[start:stop], kind="stable")]
+
+    def hissa(self, text):
+        """Records of the survey or survey/hissa text itself, then those under it after a "/":
+        112 takes in 112/1/A but not 1120/1, and 112/1 takes in 112/1/A but not 112/10"""
+        matches = self.range(text, text) if "/" in text else None
+        if matches is None:
+            start = np.searchsorted(self._texts, text, side="left")
+            stop = np.searchsorted(self._texts, text, side="right")
+            matches = self._text_ids[start:stop]
+        return np.concatenate([matches, self.prefix(text + "/")])
+
+    def range(self, low, high):
+        """Records numbered low..high, both survey/hissa texts; a bare survey takes in all its hissas"""
+        low_key = survey_hissa_keys(np.array([low], dtype=object))[0]
+        high_key = survey_hissa_keys(np.array([high], dtype=object))[0]
+        if low_key < 0 or high_key < 0:
+            return None
+        if "/" not in high:
+            high_key += HISSA_SPAN - 1
+        start = np.searchsorted(self._keys, low_key, side="left")
+        stop = np.searchsorted(self._keys, high_key, side="right")
+        return self._key_ids[start:stop]
+
+    def land_type(self, text):
+        """Records of the land types whose names start with text, None if no name does"""
+        codes = [code for code, name in enumerate(LAND_TYPES) if name.startswith(text)]
+        if not codes:
+            return None
+        return self._ids[np.isin(self._land_types, codes)]
+
+    def query(self, text):
+        """Matching record ids: a range "A-B", a survey number, a land type name, or else a survey/hissa"""
+        text = text.strip()
+        if not text:
+            return self._ids
+        low, dash, high = text.replace("–", "-").partition("-")
+        if dash and low.strip() and high.strip():
+            matches = self.range(low.strip(), high.strip())
+            if matches is not None:
+                return matches
+        matches = self.land_type(text)
+        if matches is not None:
+            return matches
+        if text.isdigit() or ("/" in text and not text.endswith("/")):
+            return self.hissa(text)
+        return self.prefix(text)
+
+
+class RecordStore:
+    """Columnar storage for one sheet's records.
+
+    Each column is a typed NumPy array grown by doubling, so appends are
+    amortised O(1) and each view of the sheet (see ``views``) is built at
+    most once per change.
+
+    Running totals of the TOTALLED columns are kept per row type and land
+    type, and adjusted by every append, update and delete, so reading them
+    never scans the records.
+
+    Every record has an id that stays the same through edits and the
+    deletion of other records. Ids increase along the sheet, so the id
+    array doubles as an ordered id -> position index (``position``).
+
+    Listeners added with ``subscribe`` hear about every change as it
+    happens, which is how the on-disk copy is kept current row by row.
+    """
+
+    # (name, kind, blank rule) for every stored column, in sheet order
+    COLUMNS = ()
+    # Text column the record selector searches by prefix and range
+    SEARCH_COLUMN = None
+    # Columns summed into the Total row, and those whose negative values
+    # show blank on the sheet and so are counted as zero
+    TOTALLED = ()
+    CLIPPED = ()
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._version = 0
+        self._id = np.zeros(capacity, dtype=np.int64)
+        self._row_type = np.zeros(capacity, dtype=np.int8)
+        self._data = {name: np.full(capacity, FILL[kind], dtype=DTYPES[kind])
+                      for name, kind, _ in self.COLUMNS}
+        self._kinds = {name: kind for name, kind, _ in self.COLUMNS}
+        # [row type, land type code + 1, totalled column]
+        self._totals = np.zeros((len(RowType), len(LAND_TYPES) + 1, len(self.TOTALLED)), dtype=np.int64)
+        self._clipped = np.isin(self.TOTALLED, self.CLIPPED)
+        self.views = ViewCache()
+        self._listeners = []
+        self._muted = False
+        # id_source(count, last id) hands out the ids of appended records while the store
+        # is saved to a village file other sessions add records to as well
+        self.id_source = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def version(self):
+        """Bumped on every change; views built for one version stay valid until the next"""
+        return self._version
+
+    def _grow(self, needed):
+        capacity = len(self._row_type)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for attr in ("_id", "_row_type"):
+            array = getattr(self, attr)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, attr, grown)
+        for name, kind, _ in self.COLUMNS:
+            column = np.full(capacity, FILL[kind], dtype=DTYPES[kind])
+            column[:self._size] = self._data[name][:self._size]
+            self._data[name] = column
+
+    def _coerce(self, name, value):
+        kind = self._kinds[name]
+        if kind == EXTENT:
+            return value.aana if isinstance(value, Extent) else int(value)
+        if kind == LAND_TYPE:
+            return LAND_TYPES.index(value) if value else -1
+        if kind == TEXT:
+            return str(value)
+        return int(value)
+
+    def _accumulate(self, rows, sign):
+        if not self.TOTALLED:
+            return
+        rows = np.atleast_1d(rows)
+        values = np.stack([self._data[name][rows] for name in self.TOTALLED], axis=-1)
+        values = np.where(self._clipped & (values < 0), 0, values)
+        np.add.at(self._totals, (self._row_type[rows], self._data["LandType"][rows] + 1), sign * values)
+
+    def _index(self, rows, sign):
+        """Keep sheet-specific lookups current: rows were just added (sign 1) or are about to go (-1)"""
+
+    def _touch(self, event, record_ids, before=None):
+        self._version += 1
+        if self._muted:
+            return
+        record_ids = np.atleast_1d(record_ids)
+        for listener in self._listeners:
+            listener(self, event, record_ids, before)
+
+    def _before(self, positions):
+        """Snapshot of rows about to change, for listeners; skipped when nobody listens"""
+        return self._snapshot(np.atleast_1d(positions)) if self._listeners and not self._muted else None
+
+    def subscribe(self, listener):
+        """Call listener(store, event, record_ids, before) after every change.
+
+        event is "insert" or "update" for records now holding the new
+        values, or "delete" for records no longer in the store; before is
+        the snapshot of the records as they were for updates and deletes,
+        None for inserts."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @contextmanager
+    def muted(self):
+        """Make changes without telling listeners, e.g. changes pulled from a database that already has them"""
+        self._muted = True
+        try:
+            yield self
+        finally:
+            self._muted = False
+
+    def _new_ids(self, count, ids=None):
+        """Ids for count records appended at the end, ID_STEP apart unless given"""
+        last = int(self._id[self._size - 1]) if self._size else 0
+        if ids is None and self.id_source is not None:
+            return self._new_ids(count, self.id_source(count, last))
+        if ids is None:
+            return np.arange(1, count + 1, dtype=np.int64) * ID_STEP + last
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) and (ids[0] <= last or np.any(np.diff(ids) <= 0)):
+            raise ValueError("Record ids must keep increasing along the sheet.")
+        return ids
+
+    def _set_row(self, position, row_type, values):
+        self._row_type[position] = row_type
+        for name, kind, _ in self.COLUMNS:
+            self._data[name][position] = self._coerce(name, values[name]) if name in values else FILL[kind]
+
+    def append(self, row_type, record_id=None, **values):
+        """Add a record at the end of the sheet; returns its id"""
+        position = self._size
+        record_id = int(self._new_ids(1, None if record_id is None else [record_id])[0])
+        self._grow(position + 1)
+        self._id[position] = record_id
+        self._set_row(position, row_type, values)
+        self._size += 1
+        self._accumulate(position, 1)
+        self._index(position, 1)
+        self._touch("insert", record_id)
+        return record_id
+
+    def extend(self, row_type, ids=None, **columns):
+        """Append many rows at once from equal-length arrays (extents in aana, money in paise,
+        land types as names or as the stored integer codes); returns their ids"""
+        count = len(next(iter(columns.values()))) if columns else len(row_type)
+        start, stop = self._size, self._size + count
+        ids = self._new_ids(count, ids)
+        self._grow(stop)
+        self._id[start:stop] = ids
+        self._row_type[start:stop] = row_type
+        for name, kind, _ in self.COLUMNS:
+            if name not in columns:
+                self._data[name][start:stop] = FILL[kind]
+            elif kind == LAND_TYPE and np.asarray(columns[name]).dtype.kind not in "iu":
+                import pandas as pd
+                self._data[name][start:stop] = pd.Categorical(columns[name], categories=LAND_TYPES).codes
+            else:
+                self._data[name][start:stop] = columns[name]
+        self._size = stop
+        positions = np.arange(start, stop)
+        self._accumulate(positions, 1)
+        self._index(positions, 1)
+        self._touch("insert", ids)
+        return ids
+
+    def insert(self, position, row_type, record_id=None, **values):
+        """Add a record at position, between the ids of its neighbours; returns its id"""
+        if not 0 <= position <= self._size:
+            raise IndexError(f"Record position {position} out of range.")
+        before = int(self._id[position - 1]) if position else 0
+        # Appended records take ids at least ID_STEP above every other record's, so an id
+        # closer than that above the last record is never handed to another session
+        after = int(self._id[position]) if position < self._size else before + ID_STEP
+        if record_id is None:
+            record_id = (before + after) // 2
+        if not before < record_id < after:
+            raise ValueError("No free record id at this position.")
+        self._grow(self._size + 1)
+        for array in [self._id, self._row_type, *self._data.values()]:
+            array[position + 1:self._size + 1] = array[position:self._size]
+        self._id[position] = record_id
+        self._set_row(position, row_type, values)
+        self._size += 1
+        self._accumulate(position, 1)
+        self._index(position, 1)
+        self._touch("insert", record_id)
+        return record_id
+
+    def update(self, record_id, **values):
+        position = self.position(record_id)
+        before = self._before(position)
+        self._accumulate(position, -1)
+        self._index(position, -1)
+        for name, value in values.items():
+            self._data[name][position] = self._coerce(name, value)
+        self._accumulate(position, 1)
+        self._index(position, 1)
+        self._touch("update", record_id, before)
+
+    def update_many(self, record_ids, **columns):
+        """Vectorised update(): set columns of many records at once, each an array or one value for all"""
+        positions = self.positions_of(record_ids)
+        if not len(positions):
+            return
+        before = self._before(positions)
+        self._accumulate(positions, -1)
+        self._index(positions, -1)
+        for name, values in columns.items():
+            self._data[name][positions] = self._coerce(name, values) if np.ndim(values) == 0 else values
+        self._accumulate(positions, 1)
+        self._index(positions, 1)
+        self._touch("update", self._id[positions], before)
+
+    def delete(self, record_id):
+        position = self.position(record_id)
+        before = self._before(position)
+        self._accumulate(position, -1)
+        self._index(position, -1)
+        self._id[position:self._size - 1] = self._id[position + 1:self._size]
+        self._row_type[position:self._size - 1] = self._row_type[position + 1:self._size]
+        for name, kind, _ in self.COLUMNS:
+            column = self._data[name]
+            column[position:self._size - 1] = column[position + 1:self._size]
+            column[self._size - 1] = FILL[kind]
+        self._size -= 1
+        self._touch("delete", record_id, before)
+
+    def remove(self, record_ids):
+        """Delete many records at once; KeyError, changing nothing, if any is not in the store"""
+        removed = self.positions_of(record_ids)
+        if not len(removed):
+            return
+        self._accumulate(removed, -1)
+        self._remove(removed)
+
+    def remove_types(self, *row_types):
+        """Drop every row of the given types, keeping the order of the rest"""
+        removed = self.positions(*row_types)
+        if not len(removed):
+            return
+        # Every row of these types goes, so do their totals
+        self._totals[list(row_types)] = 0
+        self._remove(removed)
+
+    def _remove(self, removed):
+        """Drop the rows at positions removed, whose totals are already taken off"""
+        before = self._before(removed)
+        removed_ids = self._id[removed]
+        self._index(removed, -1)
+        keep = np.ones(self._size, dtype=bool)
+        keep[removed] = False
+        count = self._size - len(removed)
+        self._id[:count] = self._id[:self._size][keep]
+        self._row_type[:count] = self._row_type[:self._size][keep]
+        for name, kind, _ in self.COLUMNS:
+            column = self._data[name]
+            column[:count] = column[:self._size][keep]
+            column[count:self._size] = FILL[kind]
+        self._size = count
+        self._touch("delete", removed_ids, before)
+
+    def copy(self):
+        """An independent store with the same records and ids, without listeners"""
+        clone = type(self)(capacity=max(self._size, 1))
+        size = clone._size = self._size
+        clone._id[:size] = self._id[:size]
+        clone._row_type[:size] = self._row_type[:size]
+        for name, column in self._data.items():
+            clone._data[name][:size] = column[:size]
+        clone._totals[:] = self._totals
+        self._copy_index(clone)
+        return clone
+
+    def _copy_index(self, clone):
+        """Give a copy of the store its own sheet-specific lookups"""
+
+    def fingerprint(self):
+        """Content hash of the records, the same for equal sheets whatever their history"""
+        return self.view("fingerprint", self._build_fingerprint)
+
+    def _build_fingerprint(self):
+        import hashlib
+        digest = hashlib.blake2b(type(self).__name__.encode(), digest_size=20)
+        digest.update(self.row_types().tobytes())
+        for name, kind, _ in self.COLUMNS:
+            column = self.column(name)
+            digest.update("\x1f".join(column).encode() if kind == TEXT else column.tobytes())
+            digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    def _snapshot(self, positions):
+        return {"ids": self._id[positions].copy(), "row_types": self._row_type[positions].copy(),
+                "columns": {name: column[positions].copy() for name, column in self._data.items()}}
+
+    def snapshot(self, record_ids):
+        """The stored values of some records, to put them back later with restore() or overwrite()"""
+        return self._snapshot(self.positions_of(record_ids))
+
+    def restore(self, snapshot):
+        """Put back records that were deleted, under their old ids and so in their old places"""
+        ids = snapshot["ids"]
+        if not len(ids):
+            return
+        if np.any(np.diff(ids) <= 0):
+            raise ValueError("Record ids to restore must increase.")
+        at = np.searchsorted(self.ids(), ids)
+        taken = at < self._size
+        if np.any(self.ids()[at[taken]] == ids[taken]):
+            raise ValueError("Record ids to restore are already in use.")
+        count = self._size + len(ids)
+        self._grow(count)
+        self._id[:count] = np.insert(self._id[:self._size], at, ids)
+        self._row_type[:count] = np.insert(self._row_type[:self._size], at, snapshot["row_types"])
+        for name, column in self._data.items():
+            column[:count] = np.insert(column[:self._size], at, snapshot["columns"][name])
+        self._size = count
+        positions = at + np.arange(len(ids))
+        self._accumulate(positions, 1)
+        self._index(positions, 1)
+        self._touch("insert", ids)
+
+    def overwrite(self, snapshot):
+        """Set records back to the values in snapshot; KeyError, changing nothing, if any is gone"""
+        ids = snapshot["ids"]
+        positions = self.positions_of(ids)
+        before = self._before(positions)
+        self._accumulate(positions, -1)
+        self._index(positions, -1)
+        self._row_type[positions] = snapshot["row_types"]
+        for name, column in self._data.items():
+            column[positions] = snapshot["columns"][name]
+        self._accumulate(positions, 1)
+        self._index(positions, 1)
+        self._touch("update", ids, before)
+
+    def ids(self):
+        """Record ids in sheet order; they only ever increase along the sheet"""
+        return self._id[:self._size]
+
+    def position(self, record_id):
+        """Where the record with this id is now, by binary search of the ordered ids"""
+        ids = self.ids()
+        position = int(np.searchsorted(ids, record_id))
+        if position == len(ids) or ids[position] != record_id:
+            raise KeyError(f"No record with id {record_id}.")
+        return position
+
+    def positions_of(self, record_ids):
+        """Vectorised position(), raising KeyError for the first id not in the store"""
+        ids = self.ids()
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+        positions = np.searchsorted(ids, record_ids)
+        found = ids[np.minimum(positions, len(ids) - 1)] == record_ids if len(ids) else positions < 0
+        if not np.all(found):
+            raise KeyError(f"No record with id {record_ids[~found].flat[0]}.")
+        return positions
+
+    def row_types(self):
+        return self._row_type[:self._size]
+
+    def column(self, name):
+        return self._data[name][:self._size]
+
+    def positions(self, *row_types):
+        return np.flatnonzero(np.isin(self.row_types(), row_types))
+
+    def totals(self, row_type=RowType.DATA, land_type=None):
+        """Running totals of one row type, for one land type or all of them"""
+        buckets = self._totals[row_type]
+        if land_type is None:
+            sums = buckets.sum(axis=0)
+        else:
+            sums = buckets[LAND_TYPES.index(land_type) + 1 if land_type else 0]
+        return dict(zip(self.TOTALLED, sums.tolist()))
+
+    def totals_by_land_type(self, row_type=RowType.DATA):
+        """Running totals of one row type for each land type that has records"""
+        buckets = self._totals[row_type]
+        return {([""] + LAND_TYPES)[code]: dict(zip(self.TOTALLED, buckets[code].tolist()))
+                for code in np.flatnonzero(buckets.any(axis=1))}
+
+    def format_value(self, name, value):
+        """Display string for one stored value of the given column"""
+        kind = self._kinds[name]
+        if kind == EXTENT:
+            return str(Extent(value))
+        if kind == MONEY:
+            return format_paise(value)
+        if kind == LAND_TYPE:
+            return LAND_TYPES[value] if value >= 0 else ""
+        return str(value)
+
+    def get(self, record_id):
+        """One record as Python values: Extent objects, paise ints and strings"""
+        position = self.position(record_id)
+        record = {"id": int(record_id), "type": RowType(self._row_type[position])}
+        for name, kind, _ in self.COLUMNS:
+            value = self._data[name][position]
+            if kind == EXTENT:
+                value = Extent(value)
+            elif kind == LAND_TYPE:
+                value = LAND_TYPES[value] if value >= 0 else ""
+            elif kind == MONEY:
+                value = int(value)
+            record[name] = value
+        return record
+
+    def search(self, query, row_types=(RowType.DATA,), limit=None):
+        """Ids of the records of row_types matching query (see SearchIndex.query), at most limit
+        of them, and the number of matches"""
+        row_types = tuple(row_types)
+        index = self.view(("search", row_types), lambda: self._build_search(row_types))
+        matches = index.query(query)
+        return matches[:limit], len(matches)
+
+    def _build_search(self, row_types):
+        positions = self.positions(*row_types)
+        if self.SEARCH_COLUMN:
+            texts = self.column(self.SEARCH_COLUMN)[positions]
+        else:
+            texts = np.full(len(positions), "", dtype=object)
+        land_types = self.column("LandType")[positions] if "LandType" in self._data else np.full(len(positions), -1)
+        return SearchIndex(self.ids()[positions], texts, land_types)
+
+    def view(self, key, build):
+        """build() memoised until the data next changes"""
+        return self.views.get(key, self._version, build)
+
+    def frame(self):
+        """Typed DataFrame view of the sheet, rebuilt only when the data changes"""
+        return self.view("frame", self._build_frame)
+
+    def _build_frame(self):
+        import pandas as pd
+        data = {"type": pd.Categorical.from_codes(self.row_types(), [t.label for t in RowType])}
+        for name, kind, _ in self.COLUMNS:
+            column = self.column(name)
+            if kind == LAND_TYPE:
+                column = pd.Categorical.from_codes(column, LAND_TYPES)
+            data[name] = column
+        return pd.DataFrame(data)
+
+    def formatted(self):
+        """The sheet as display strings, one column per stored column"""
+        return self.view("formatted", self._build_formatted)
+
+    def _build_formatted(self):
+        import pandas as pd
+        frame = self.frame()
+        strings = {"type": frame["type"].astype(str)}
+        for name, kind, blank in self.COLUMNS:
+            values = frame[name]
+            if kind == EXTENT:
+                text = format_extents(values)
+            elif kind == MONEY:
+                text = format_money(values)
+            elif kind == LAND_TYPE:
+                text = values.astype(object).fillna("")
+            else:
+                text = values.astype(str)
+            if blank == BLANK_NONPOSITIVE:
+                text = text.where(values > 0, "")
+            elif blank == BLANK_ZERO:
+                text = text.where(values != 0, "")
+            elif blank == DASH_ZERO:
+                text = text.where(values != 0, "-")
+            strings[name] = text.to_numpy(dtype=object)
+        # Kept as Python strings: inferring a string dtype costs more than the formatting,
+        # and the print sheet reads the strings back out
+        formatted = pd.DataFrame(strings, dtype=object)
+        self.apply_row_rules(formatted, frame["type"].cat.codes.to_numpy())
+        return formatted
+
+    def apply_row_rules(self, formatted, row_type):
+        """Sheet-specific presentation of separator, total and other special rows"""
+        separator = row_type == RowType.SEPARATOR
+        formatted.loc[separator, [name for name, _, _ in self.COLUMNS]] = "-"
+
+
+class KamalStore(RecordStore):
+    COLUMNS = (
+        ("LandType", LAND_TYPE, None),
+        ("AsIs_TotalExtent", EXTENT, None),
+        ("AsIs_Kharab", EXTENT, None),
+        ("AsIs_Cultivable", EXTENT, None),
+        ("AsIs_Assessment", MONEY, BLANK_NONPOSITIVE),
+        ("Amended_TotalExtent", EXTENT, None),
+        ("Amended_Kharab", EXTENT, None),
+        ("Amended_Cultivable", EXTENT, None),
+        ("Amended_Assessment", MONEY, BLANK_ZERO),
+        ("Remark", EXTENT, DASH_ZERO),
+    )
+    TOTALLED = (
+        "AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable", "AsIs_Assessment",
+        "Amended_TotalExtent", "Amended_Kharab", "Amended_Cultivable", "Amended_Assessment",
+    )
+    CLIPPED = (
+        "AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable",
+        "Amended_TotalExtent", "Amended_Kharab", "Amended_Cultivable",
+    )
+
+    def apply_row_rules(self, formatted, row_type):
+        super().apply_row_rules(formatted, row_type)
+        total = row_type == RowType.TOTAL
+        formatted.loc[total, "LandType"] = "Total"
+        formatted.loc[total & (self.column("Amended_Assessment") < 0), "Amended_Assessment"] = ""
+
+
+class KJPStore(RecordStore):
+    COLUMNS = (
+        ("LandType", LAND_TYPE, None),
+        ("AsIs_SurveyHissa", TEXT, None),
+        ("AsIs_TotalExtent", EXTENT, None),
+        ("AsIs_Kharab", EXTENT, None),
+        ("AsIs_Cultivable", EXTENT, None),
+        ("AsIs_Rate", MONEY, BLANK_NONPOSITIVE),
+        ("AsIs_Assessment", MONEY, BLANK_NONPOSITIVE),
+        ("Amended_SurveyHissa", TEXT, None),
+        ("Amended_TotalExtent", EXTENT, None),
+        ("Amended_Kharab", EXTENT, None),
+        ("Amended_Cultivable", EXTENT, None),
+        ("Amended_Rate", MONEY, BLANK_NONPOSITIVE),
+        ("Amended_Assessment", MONEY, BLANK_NONPOSITIVE),
+        ("Note", TEXT, None),
+    )
+    TOTALLED = (
+        "AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable", "AsIs_Assessment",
+        "Amended_TotalExtent", "Amended_Kharab", "Amended_Cultivable", "Amended_Assessment",
+    )
+    CLIPPED = TOTALLED
+    SEARCH_COLUMN = "AsIs_SurveyHissa"
+
+    # Rows whose AsIs_SurveyHissa counts towards a survey's hissa numbers
+    HISSA_ROWS = (RowType.DATA, RowType.EX_KJP)
+
+    def __init__(self, capacity=64):
+        # survey number -> {hissa number: rows using it}, and each survey's highest hissa
+        self._hissas = {}
+        self._max_hissa = {}
+        super().__init__(capacity)
+
+    def _index(self, rows, sign):
+        rows = np.atleast_1d(rows)
+        rows = rows[np.isin(self._row_type[rows], self.HISSA_ROWS)]
+        if not len(rows):
+            return
+        import pandas as pd
+        parts = pd.Series(self._data["AsIs_SurveyHissa"][rows], dtype=object).str.rpartition("/")
+        numbered = (parts[0].str.strip() != "") & parts[2].str.strip().str.isdigit()
+        pairs = pd.DataFrame({"survey": parts[0][numbered].str.strip(),
+                              "hissa": parts[2][numbered].str.strip().astype(int)})
+        for (survey, hissa), count in pairs.value_counts(sort=False).items():
+            counts = self._hissas.setdefault(survey, {})
+            counts[hissa] = counts.get(hissa, 0) + sign * count
+            if counts[hissa] > 0:
+                self._max_hissa[survey] = max(self._max_hissa.get(survey, 0), hissa)
+                continue
+            del counts[hissa]
+            if not counts:
+                del self._hissas[survey], self._max_hissa[survey]
+            elif hissa == self._max_hissa[survey]:
+                self._max_hissa[survey] = max(counts)
+
+    def _a_rows(self, record_ids):
+        positions = self.positions(RowType.DATA) if record_ids is None else self.positions_of(record_ids)
+        return positions[self._row_type[positions] == RowType.DATA]
+
+    def reassess(self, record_ids=None):
+        """Recompute the A rows' as-is and amended assessments from their rates and cultivable
+        extents in one pass, for every A row or just those among record_ids.
+
+        Only rows whose assessments change are updated; returns how many did."""
+        positions = self._a_rows(record_ids)
+        data = self._data
+        as_is = assessment_paise(data["AsIs_Rate"][positions], data["AsIs_Cultivable"][positions])
+        amended = assessment_paise(data["Amended_Rate"][positions], data["Amended_Cultivable"][positions])
+        changed = (as_is != data["AsIs_Assessment"][positions]) | (amended != data["Amended_Assessment"][positions])
+        self.update_many(self._id[positions[changed]], AsIs_Assessment=as_is[changed],
+                         Amended_Assessment=amended[changed])
+        return int(changed.sum())
+
+    def set_rate(self, record_ids, rate_paise):
+        """Give A rows a new rate per acre, as-is and amended, reassessing just those rows.
+
+        rate_paise is one rate for all or one per record; rows other than A rows are left alone."""
+        positions = self.positions_of(record_ids)
+        rate = np.broadcast_to(np.asarray(rate_paise, dtype=np.int64), positions.shape)
+        a_rows = self._row_type[positions] == RowType.DATA
+        positions, rate = positions[a_rows], rate[a_rows]
+        data = self._data
+        self.update_many(self._id[positions], AsIs_Rate=rate, Amended_Rate=rate,
+                         AsIs_Assessment=assessment_paise(rate, data["AsIs_Cultivable"][positions]),
+                         Amended_Assessment=assessment_paise(rate, data["Amended_Cultivable"][positions]))
+
+    def rerate(self, rates_by_land_type):
+        """Give every A row its land type's rate from an array indexed by land type code (negative
+        where there is none) and reassess the rows whose rate changes; returns how many did"""
+        positions = self.positions(RowType.DATA)
+        codes = self._data["LandType"][positions]
+        rates = np.where(codes >= 0, np.asarray(rates_by_land_type)[np.maximum(codes, 0)], -1)
+        changed = (rates >= 0) & (rates != self._data["AsIs_Rate"][positions])
+        self.set_rate(self._id[positions[changed]], rates[changed])
+        return int(changed.sum())
+
+    def _copy_index(self, clone):
+        clone._hissas = {survey: dict(counts) for survey, counts in self._hissas.items()}
+        clone._max_hissa = dict(self._max_hissa)
+
+    def kamal_berij(self):
+        """The Kamal Berij records this sheet implies, one per land type, as KamalStore.extend columns,
+        read from the running totals; the extent A rows lost to KJP counts as kharab"""
+        column = {name: i for i, name in enumerate(self.TOTALLED)}
+        a_rows = self._totals[RowType.DATA, 1:]
+        present = np.flatnonzero(a_rows.any(axis=1))
+        a_rows = a_rows[present]
+        total = a_rows[:, column["AsIs_TotalExtent"]]
+        kjp = total - a_rows[:, column["Amended_TotalExtent"]]
+        amended_cultivable = a_rows[:, column["Amended_Cultivable"]]
+        return {
+            "LandType": present.astype(np.int8),
+            "AsIs_TotalExtent": total,
+            "AsIs_Kharab": a_rows[:, column["AsIs_Kharab"]],
+            "AsIs_Cultivable": a_rows[:, column["AsIs_Cultivable"]],
+            "AsIs_Assessment": a_rows[:, column["AsIs_Assessment"]],
+            "Amended_TotalExtent": total,
+            "Amended_Kharab": total - amended_cultivable,
+            "Amended_Cultivable": amended_cultivable,
+            "Amended_Assessment": a_rows[:, column["Amended_Assessment"]],
+            "Remark": kjp,
+        }
+
+    def without_land_type(self):
+        """Number of A and KJP rows with no land type, which kamal_berij() leaves out"""
+        rows = np.isin(self.row_types(), [RowType.DATA, RowType.KJP_ROW])
+        return int(np.count_nonzero(rows & (self.column("LandType") < 0)))
+
+    def max_hissa(self, survey):
+        """Highest hissa number recorded under survey, 0 if none"""
+        return self._max_hissa.get(str(survey).strip(), 0)
+
+    def next_hissa(self, survey):
+        return self.max_hissa(survey) + 1
+
+    def pair(self, record_id):
+        """The other half of an A/B pair: a data row's KJP row below it, or a KJP row's data row; None if unpaired"""
+        position = self.position(record_id)
+        if self._row_type[position] == RowType.KJP_ROW:
+            other = position - 1
+            wanted = RowType.DATA
+        else:
+            other = position + 1
+            wanted = RowType.KJP_ROW
+        if 0 <= other < self._size and self._row_type[other] == wanted:
+            return int(self._id[other])
+        return None
+
+    def apply_row_rules(self, formatted, row_type):
+        super().apply_row_rules(formatted, row_type)
+        kjp_row = row_type == RowType.KJP_ROW
+        formatted.loc[kjp_row, ["AsIs_TotalExtent", "AsIs_Kharab", "AsIs_Cultivable"]] = ""
+        formatted.loc[kjp_row, "Amended_Cultivable"] = BIN_SHETKI
+        ex_kjp = row_type == RowType.EX_KJP
+        formatted.loc[ex_kjp, "AsIs_Cultivable"] = ""
+        formatted.loc[ex_kjp, "Amended_Cultivable"] = formatted.loc[ex_kjp, "Note"]
+        total = row_type == RowType.TOTAL
+        formatted.loc[total, "AsIs_SurveyHissa"] = "Total"
+        formatted.loc[total, ["AsIs_Rate", "Amended_SurveyHissa", "Amended_Rate"]] = "-"
@@ -0,0 +1,341 @@
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+
+from records import DTYPES, EXTENT, ID_STEP, LAND_TYPE, MONEY
+
+# One SQLite file per village under this directory
+DATA_DIR = os.environ.get("KJP_DATA_DIR", "village_data")
+
+LOCATION_KEYS = ["district", "taluka", "hobli", "village", "kjp_share"]
+
+SQL_TYPES = {EXTENT: "INTEGER", MONEY: "INTEGER", LAND_TYPE: "INTEGER"}
+
+
+def location_complete(location):
+    return all(str(location.get(key, "")).strip() for key in LOCATION_KEYS)
+
+
+def village_path(location, data_dir=None):
+    """The village's database file, named from district/taluka/hobli/village/kjp_share"""
+    parts = [re.sub(r'[\s\\/:*?"<>|.]+', "_", str(location[key]).strip()) for key in LOCATION_KEYS]
+    return os.path.join(data_dir or DATA_DIR, "__".join(parts) + ".sqlite3")
+
+
+class VillageDB:
+    """A village's sheets in SQLite, one table per sheet, shared by every session working on the village.
+
+    Table rows are keyed by the store's record ids, which increase along
+    the sheet, so id order is the sheet order, and carry a version drawn
+    from a village-wide clock by every saved change, so a record's version
+    only grows, even when its id is deleted and used again. Ids of
+    appended records are handed out by the file's ``counters`` table, so
+    sessions adding records at the same time get different ids. Triggers
+    log each change to the ``changes`` feed, from which sessions pull what
+    others saved (see Workspace).
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # Streamlit reruns a session on whichever script thread is free; transactions are begun
+        # explicitly (see transaction), so each takes the write lock before it reads a counter
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS location (key TEXT PRIMARY KEY, value TEXT)")
+        # version 0 marks a deleted record
+        self.conn.execute("CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                          "tbl TEXT NOT NULL, id INTEGER NOT NULL, version INTEGER NOT NULL)")
+        # Village-wide counters, such as the last record id handed out for each table
+        self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO counters VALUES ('version', 0)")
+
+    @contextmanager
+    def transaction(self):
+        """One write transaction, holding the file's write lock from its start"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def save_location(self, location):
+        with self.transaction():
+            self.conn.executemany("INSERT OR REPLACE INTO location VALUES (?, ?)",
+                                  [(key, str(location.get(key, ""))) for key in LOCATION_KEYS])
+
+    def _create(self, table, store):
+        columns = ", ".join(f"{name} {SQL_TYPES.get(kind, 'TEXT')}" for name, kind, _ in store.COLUMNS)
+        with self.transaction():
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, "
+                              f"row_type INTEGER NOT NULL, version INTEGER NOT NULL DEFAULT 1, {columns})")
+            # Villages saved before records were versioned
+            if "version" not in [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            for event, row, version in [("INSERT", "NEW", "NEW.version"), ("UPDATE", "NEW", "NEW.version"),
+                                        ("DELETE", "OLD", "0")]:
+                self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_feed AFTER {event} ON {table} "
+                                  f"BEGIN INSERT INTO changes (tbl, id, version) "
+                                  f"VALUES ('{table}', {row}.id, {version}); END")
+            # Villages saved before ids were handed out here start after their highest id
+            self.conn.execute("INSERT OR IGNORE INTO counters VALUES (?, 0)", (f"{table}_id",))
+            self.conn.execute(f"UPDATE counters SET value = MAX(value, (SELECT COALESCE(MAX(id), 0) FROM {table})) "
+                              f"WHERE name = ?", (f"{table}_id",))
+            # and their versions, counted per record then, start the clock
+            self.conn.execute(f"UPDATE counters SET value = MAX(value, (SELECT COALESCE(MAX(version), 0) "
+                              f"FROM {table})) WHERE name = 'version'")
+
+    def _read(self, table, store):
+        import pandas as pd
+        names = [name for name, _, _ in store.COLUMNS]
+        return pd.read_sql_query(
+            f"SELECT id, row_type, version, {', '.join(names)} FROM {table} ORDER BY id", self.conn)
+
+    def _read_ids(self, table, store, record_ids):
+        """The saved rows of some records, in id order; deleted records are missing"""
+        import pandas as pd
+        names = [name for name, _, _ in store.COLUMNS]
+        # The ids go in as one JSON array, however many there are
+        return pd.read_sql_query(
+            f"SELECT id, row_type, version, {', '.join(names)} FROM {table} "
+            f"WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+            self.conn, params=(json.dumps([int(i) for i in record_ids]),))
+
+    def _columns(self, store, rows):
+        columns = {}
+        for name, kind, _ in store.COLUMNS:
+            values = rows[name]
+            columns[name] = (values.fillna("").astype(str).to_numpy(dtype=object) if DTYPES[kind] is object
+                             else values.fillna(0).to_numpy(dtype=DTYPES[kind]))
+        return columns
+
+    def _fill(self, store, rows):
+        """Bulk-append rows read from a table to store under their saved record ids"""
+        if rows.empty:
+            return
+        store.extend(rows["row_type"].to_numpy(dtype=np.int8), ids=rows["id"].to_numpy(dtype=np.int64),
+                     **self._columns(store, rows))
+
+    def _next(self, name, amount, floor=0):
+        """Advance counter name by amount from at least floor, in the caller's transaction; returns its new value"""
+        self.conn.execute("UPDATE counters SET value = MAX(value, ?) + ? WHERE name = ?", (floor, amount, name))
+        return self.conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+
+    def reserve_ids(self, table, count, after=0):
+        """count new record ids for table, ID_STEP apart, above after and every id handed out before,
+        so records two sessions add at the same time never share an id"""
+        with self.transaction():
+            last = self._next(f"{table}_id", count * ID_STEP, after)
+        return np.arange(last - (count - 1) * ID_STEP, last + 1, ID_STEP, dtype=np.int64)
+
+    def _last_change(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def load(self, table, store):
+        """Append the whole saved sheet to an empty store in one read; returns the Workspace
+        that writes the store's changes through and pulls other sessions' changes into it"""
+        self._create(table, store)
+        # Taken before the read, so changes saved meanwhile are pulled again rather than missed
+        seq = self._last_change()
+        rows = self._read(table, store)
+        self._fill(store, rows)
+        workspace = Workspace(self, table, store, dict(zip(rows["id"].tolist(), rows["version"].tolist())), seq)
+        store.subscribe(workspace.write)
+        store.id_source = workspace.new_ids
+        return workspace
+
+    def _values(self, store, positions):
+        columns = [store.column(name)[positions].tolist() for name, _, _ in store.COLUMNS]
+        return list(zip(store.row_types()[positions].tolist(), *columns))
+
+    def _versions(self, count):
+        """count new versions from the village clock, in the caller's transaction"""
+        last = self._next("version", count)
+        return range(last - count + 1, last + 1)
+
+    def _apply(self, sql, params):
+        """Run sql once per params row in the caller's transaction; returns the indices of rows it changed nothing for"""
+        self.conn.execute("SAVEPOINT apply")
+        try:
+            changed = self.conn.executemany(sql, params).rowcount
+        except sqlite3.IntegrityError:
+            changed = -1
+        missed = []
+        if changed != len(params):
+            # Some row conflicted: redo them one by one to learn which
+            self.conn.execute("ROLLBACK TO apply")
+            for index, row in enumerate(params):
+                try:
+                    changed = self.conn.execute(sql, row).rowcount
+                except sqlite3.IntegrityError:
+                    changed = 0
+                if not changed:
+                    missed.append(index)
+        self.conn.execute("RELEASE apply")
+        return missed
+
+    def _saved(self, table, record_ids):
+        """Those of record_ids still in table"""
+        return [record_id for record_id in record_ids
+                if self.conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (record_id,)).fetchone()]
+
+
+class Workspace:
+    """A session's store of a village sheet, kept in step with the shared table.
+
+    Local changes are written through record by record with optimistic
+    concurrency: an edit or delete is saved only while the record still
+    has the version this session last saw, and an insert only while its id
+    is free. Changes made inside ``batch`` are saved together, and a
+    change made outside one is saved on its own; either way a save that
+    loses to another user's change on any record is not made at all. The
+    records that lost are listed in ``conflicts``; ``pull`` puts back the
+    saved values of those and of every other record the save touched.
+    ``pull`` also applies what other sessions saved, reading only the
+    records the change feed names since the last pull.
+    """
+
+    def __init__(self, db, table, store, versions, seq):
+        self.db = db
+        self.table = table
+        self.store = store
+        # record id -> version this session last saw, and the last change feed entry read
+        self.versions = versions
+        self.seq = seq
+        self.conflicts = set()
+        # Records of saves rolled back with a conflict, and the changes of the open batch
+        self.unsaved = set()
+        self._batch = None
+
+    def new_ids(self, count, last):
+        """The store's id_source: ids for appended records, reserved in the shared file"""
+        return self.db.reserve_ids(self.table, count, last)
+
+    def write(self, store, event, record_ids, before):
+        """Store listener saving each change, or keeping it for the end of the open batch"""
+        ids = [int(i) for i in record_ids]
+        rows = None if event == "delete" else self.db._values(store, store.positions_of(record_ids))
+        if self._batch is not None:
+            self._batch.append((event, ids, rows))
+        else:
+            self._save([(event, ids, rows)])
+
+    @contextmanager
+    def batch(self):
+        """Save the changes made in the block together when it ends, such as a KJP record's
+        A and B rows: all of them, or none if any loses to another user's change"""
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+        finally:
+            changes, self._batch = self._batch, None
+            if changes:
+                self._save(changes)
+
+    def _save(self, changes):
+        """Write (event, record ids, row values) changes in one transaction, rolled back if any record loses"""
+        db = self.db
+        table = self.table
+        names = [name for name, _, _ in self.store.COLUMNS]
+        # Versions the save gives records, None for those it deletes; kept only once it commits
+        saved = {}
+
+        def seen(i):
+            return saved[i] if i in saved else self.versions.get(i, 0)
+
+        lost = set()
+        db.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for event, ids, rows in changes:
+                if event == "delete":
+                    missed = db._apply(f"DELETE FROM {table} WHERE id = ? AND version = ?",
+                                       [(i, seen(i) or 0) for i in ids])
+                    # A record someone else deleted first is gone either way
+                    lost.update(db._saved(table, [ids[k] for k in missed]))
+                    saved.update(dict.fromkeys(ids))
+                    continue
+                versions = db._versions(len(ids))
+                if event == "insert":
+                    missed = db._apply(
+                        f"INSERT INTO {table} (id, version, row_type, {', '.join(names)}) "
+                        f"VALUES ({', '.join('?' * (len(names) + 3))})",
+                        [(i, version) + row for i, version, row in zip(ids, versions, rows)])
+                    # Ids inserted between others, or after the last record, are not handed out
+                    # by reserve_ids; later appends must still start ID_STEP above them
+                    db._next(f"{table}_id", 0, max(ids))
+                else:
+                    missed = db._apply(
+                        f"UPDATE {table} SET row_type = ?, {', '.join(f'{name} = ?' for name in names)}, "
+                        f"version = ? WHERE id = ? AND version = ?",
+                        [row + (version, i, seen(i)) for i, version, row in zip(ids, versions, rows)])
+                lost.update(ids[k] for k in missed)
+                saved.update(zip(ids, versions))
+        except BaseException:
+            db.conn.execute("ROLLBACK")
+            raise
+        if lost:
+            db.conn.execute("ROLLBACK")
+            self.conflicts.update(lost)
+            self.unsaved.update(i for _, ids, _ in changes for i in ids)
+            return
+        db.conn.execute("COMMIT")
+        for i, version in saved.items():
+            if version is None:
+                self.versions.pop(i, None)
+            else:
+                self.versions[i] = version
+
+    def pull(self):
+        """Bring the store up to date with the table; returns the ids of the records refreshed
+        and of those in conflict, both sorted"""
+        feed = self.db.conn.execute("SELECT seq, id, version FROM changes WHERE tbl = ? AND seq > ? ORDER BY seq",
+                                    (self.table, self.seq)).fetchall()
+        latest = {}
+        for seq, record_id, version in feed:
+            latest[record_id] = version
+            self.seq = seq
+        stale = {i for i, version in latest.items() if self.versions.get(i, 0) != version}
+        conflicts = sorted(self.conflicts)
+        stale.update(self.unsaved)
+        self.conflicts = set()
+        self.unsaved = set()
+        stale = sorted(stale)
+        if stale:
+            self._refresh(stale)
+        return stale, conflicts
+
+    def _refresh(self, record_ids):
+        """Set these records to their saved values, without writing them back"""
+        store = self.store
+        rows = self.db._read_ids(self.table, store, record_ids)
+        saved = rows["id"].to_numpy(dtype=np.int64)
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+        gone = record_ids[np.isin(record_ids, store.ids()) & ~np.isin(record_ids, saved)]
+        known = np.isin(saved, store.ids())
+        row_types = rows["row_type"].to_numpy(dtype=np.int8)
+        columns = self.db._columns(store, rows)
+
+        def part(chosen):
+            return {"ids": saved[chosen], "row_types": row_types[chosen],
+                    "columns": {name: column[chosen] for name, column in columns.items()}}
+
+        with store.muted():
+            if len(gone):
+                store.remove(gone)
+            if known.any():
+                store.overwrite(part(known))
+            if not known.all():
+                store.restore(part(~known))
+        for i in gone.tolist():
+            self.versions.pop(i, None)
+        self.versions.update(zip(saved.tolist(), rows["version"].tolist()))
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extent import EXTENT_AANA, EXTENT_GUNTA, EXTENT_INVALID, EXTENT_OK, Extent, parse_extent_array
+
+CASES = [
+    ("1-2-3", 1 * 640 + 2 * 16 + 3, EXTENT_OK),
+    ("0-39-15", 39 * 16 + 15, EXTENT_OK),
+    ("12", 12 * 640, EXTENT_OK),
+    ("2-10", 2 * 640 + 10 * 16, EXTENT_OK),
+    ("A-G-A", 0, EXTENT_OK),
+    (" 1 - 2 - 3 ", 1 * 640 + 2 * 16 + 3, EXTENT_OK),
+    ("1.5-0-0", 960, EXTENT_OK),
+    ("1-40-0", 0, EXTENT_GUNTA),
+    ("1-0-16", 0, EXTENT_AANA),
+    ("1-2-3-4", 0, EXTENT_INVALID),
+    ("abc", 0, EXTENT_INVALID),
+    ("1-x-3", 0, EXTENT_INVALID),
+    ("", 0, EXTENT_OK),
+]
+# Beyond int64, which only the batch parser has to hold
+HUGE = "99999999999999999999-0-0"
+
+
+def test_batch_parse_agrees_with_the_scalar_parser():
+    aana, codes = parse_extent_array([text for text, _, _ in CASES] + [HUGE])
+    assert aana.tolist() == [expected for _, expected, _ in CASES] + [0]
+    assert codes.tolist() == [code for _, _, code in CASES] + [EXTENT_INVALID]
+    for text, expected, code in CASES:
+        if code == EXTENT_OK:
+            assert Extent.parse(text).aana == expected
+        else:
+            with pytest.raises(ValueError):
+                Extent.parse(text, "Total")
+
+
+def test_batch_parse_of_many_repeated_strings():
+    aana, codes = parse_extent_array(["0-5-0", "x", "0-5-0"] * 1000)
+    assert aana[:3].tolist() == [80, 0, 80] and codes[:3].tolist() == [EXTENT_OK, EXTENT_INVALID, EXTENT_OK]
+    assert aana.sum() == 2000 * 80
+
+
+def test_extents_format_as_acres_gunta_aana():
+    assert str(Extent.parse("2-10-0") - Extent.parse("0-5-8")) == "2-4-8"
+    # Non-positive extents show as 0-0-0
+    assert str(Extent.parse("0-5-0") - Extent.parse("1-0-0")) == "0-0-0"
@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import History
+from records import KJPStore, RowType
+from storage import VillageDB
+
+
+def hissas(store):
+    return list(store.column("AsIs_SurveyHissa"))
+
+
+def sheet(*survey_hissas):
+    store = KJPStore()
+    for survey_hissa in survey_hissas:
+        store.append(RowType.DATA, AsIs_SurveyHissa=survey_hissa, AsIs_TotalExtent=640)
+    return store, History(store)
+
+
+def test_undo_and_redo_an_edit():
+    store, history = sheet("1/1", "1/2")
+    record_id = int(store.ids()[0])
+    with history.action("Edit"):
+        store.update(record_id, AsIs_SurveyHissa="1/1A", AsIs_TotalExtent=320)
+    assert history.undo() == "Edit"
+    assert store.get(record_id)["AsIs_SurveyHissa"] == "1/1"
+    assert store.totals()["AsIs_TotalExtent"] == 1280
+    assert history.redo() == "Edit"
+    assert store.get(record_id)["AsIs_SurveyHissa"] == "1/1A"
+    assert store.totals()["AsIs_TotalExtent"] == 960
+    assert history.redo_label is None
+
+
+def test_undo_an_insert_and_redo_it_under_the_same_id():
+    store, history = sheet("1/1", "1/2")
+    with history.action("Add"):
+        inserted = store.insert(1, RowType.KJP_ROW, AsIs_SurveyHissa="1/1")
+    history.undo()
+    assert hissas(store) == ["1/1", "1/2"]
+    history.redo()
+    assert hissas(store) == ["1/1", "1/1", "1/2"]
+    assert int(store.ids()[1]) == inserted
+
+
+def test_undo_a_delete_puts_the_record_back_in_place():
+    store, history = sheet("1/1", "1/2", "1/3")
+    record_id = int(store.ids()[1])
+    store.delete(record_id)
+    assert history.undo_label == "delete"
+    history.undo()
+    assert hissas(store) == ["1/1", "1/2", "1/3"]
+    assert int(store.ids()[1]) == record_id
+
+
+def test_a_new_step_drops_the_redo_steps():
+    store, history = sheet("1/1")
+    with history.action("Add"):
+        store.append(RowType.DATA, AsIs_SurveyHissa="1/2")
+    history.undo()
+    with history.action("Add"):
+        store.append(RowType.DATA, AsIs_SurveyHissa="1/3")
+    assert history.redo_label is None
+
+
+def test_replaying_over_a_missing_record_raises_and_changes_nothing():
+    store, history = sheet("1/1", "1/2")
+    first, second = (int(i) for i in store.ids())
+    snapshot = store.snapshot([first])
+    store.delete(first)
+    with pytest.raises(KeyError):
+        store.overwrite(snapshot)
+    with pytest.raises(KeyError):
+        store.remove([first, second])
+    assert hissas(store) == ["1/2"]
+
+
+def test_undo_after_a_pull_skips_steps_over_records_changed_elsewhere(tmp_path):
+    path = str(tmp_path / "village.sqlite3")
+    mine, theirs = KJPStore(), KJPStore()
+    workspace = VillageDB(path).load("kjp", mine)
+    other = VillageDB(path).load("kjp", theirs)
+    history = History(mine)
+    with history.action("Add"):
+        kept = mine.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+        edited = mine.append(RowType.DATA, AsIs_SurveyHissa="1/2")
+    with history.action("Edit 1/2"):
+        mine.update(edited, AsIs_SurveyHissa="1/2A")
+    with history.action("Edit 1/1"):
+        mine.update(kept, AsIs_SurveyHissa="1/1A")
+    other.pull()
+    theirs.delete(edited)
+
+    changed, conflicts = workspace.pull()
+    history.forget(changed)
+    assert changed == [edited] and conflicts == []
+    # The edit of the deleted record goes, and with it the steps before it
+    assert history.undo() == "Edit 1/1"
+    assert history.undo_label is None
+    assert hissas(mine) == ["1/1"]
+    other.pull()
+    assert mine.fingerprint() == theirs.fingerprint()
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import DONE, FAILED, JobQueue, content_hash
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1, artifacts=2)
+    yield queue
+    queue.shutdown()
+
+
+def double(values, progress):
+    progress(0.5, "Half way")
+    return [value * 2 for value in values]
+
+
+def fail(progress):
+    raise ValueError("No sheet")
+
+
+def test_a_job_runs_in_the_background(queue):
+    job = queue.submit("Double", double, [1, 2])
+    assert job.future.result(timeout=5) == [2, 4]
+    assert job.state == DONE and job.result == [2, 4]
+    assert job.progress == 1.0 and not job.cached
+    assert queue.get(job.id) is job
+
+
+def test_a_failed_job_keeps_its_error(queue):
+    job = queue.submit("Fail", fail)
+    with pytest.raises(ValueError):
+        job.future.result(timeout=5)
+    assert job.state == FAILED and job.error == "No sheet" and job.result is None
+
+
+def test_unchanged_inputs_reuse_the_artifact(queue):
+    key = content_hash("double", np.arange(3))
+    first = queue.submit("Double", double, [1], key=key)
+    first.future.result(timeout=5)
+    again = queue.submit("Double", fail, key=key)
+    assert again.done and again.cached and again.result == [2]
+    assert queue.cached("Double", content_hash("double", np.arange(4))) is None
+
+
+def test_only_the_latest_artifacts_are_kept(queue):
+    for key in "abc":
+        queue.submit(key, double, [1], key=key).future.result(timeout=5)
+    assert queue.cached("a", "a") is None
+    assert queue.cached("c", "c").result == [2]
+
+
+def test_content_hash_tells_parts_apart():
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert content_hash(np.arange(3)) != content_hash(np.arange(3, dtype=np.int32))
+    assert content_hash([1, "x"], b"y") == content_hash((1, "x"), b"y")
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extent import Extent
+from records import KJPStore, RowType, assessment_paise
+
+
+def add_hissa(store, survey_hissa, total, kharab, kjp, rate_paise=10000, land_type="ಖುಷ್ಕಿ"):
+    """Append a hissa's A row, and its B row when part of it goes to KJP, as the KJP form does"""
+    total, kharab, kjp = Extent.parse(total), Extent.parse(kharab), Extent.parse(kjp)
+    cultivable = total - kharab
+    amended_total = total - kjp
+    amended_cultivable = amended_total - kharab
+    store.append(RowType.DATA, LandType=land_type, AsIs_SurveyHissa=survey_hissa,
+                 AsIs_TotalExtent=total, AsIs_Kharab=kharab, AsIs_Cultivable=cultivable,
+                 AsIs_Rate=rate_paise, AsIs_Assessment=assessment_paise(rate_paise, cultivable.aana),
+                 Amended_SurveyHissa=survey_hissa + "*", Amended_TotalExtent=amended_total,
+                 Amended_Kharab=kharab, Amended_Cultivable=amended_cultivable, Amended_Rate=rate_paise,
+                 Amended_Assessment=assessment_paise(rate_paise, amended_cultivable.aana))
+    if Extent.parse("0-0-0") < kjp < total:
+        store.append(RowType.KJP_ROW, LandType=land_type, Amended_SurveyHissa=survey_hissa + "*",
+                     Amended_TotalExtent=kjp, Amended_Kharab=kjp)
+
+
+def derived(store):
+    columns = store.kamal_berij()
+    return {name: str(Extent(int(columns[name][0]))) for name in
+            ["AsIs_TotalExtent", "Amended_Kharab", "Amended_Cultivable", "Remark"]}
+
+
+def test_partial_kjp_hissa():
+    store = KJPStore()
+    add_hissa(store, "1/1", "2-10-0", "0-5-0", "0-20-0")
+    assert derived(store) == {"AsIs_TotalExtent": "2-10-0", "Amended_Kharab": "0-25-0",
+                              "Amended_Cultivable": "1-25-0", "Remark": "0-20-0"}
+
+
+def test_hissa_wholly_to_kjp():
+    store = KJPStore()
+    add_hissa(store, "1/1", "2-10-0", "0-0-0", "1-0-0")
+    add_hissa(store, "1/2", "1-0-0", "0-0-0", "1-0-0")
+    columns = store.kamal_berij()
+    assert derived(store) == {"AsIs_TotalExtent": "3-10-0", "Amended_Kharab": "2-0-0",
+                              "Amended_Cultivable": "1-10-0", "Remark": "2-0-0"}
+    # The amended assessment leaves out the whole hissa, and so does the amended cultivable extent
+    assert columns["Amended_Assessment"][0] == assessment_paise(10000, Extent.parse("1-10-0").aana)
+
+
+def test_hissa_wholly_to_kjp_with_kharab():
+    store = KJPStore()
+    add_hissa(store, "1/1", "1-0-0", "0-10-0", "1-0-0")
+    assert derived(store) == {"AsIs_TotalExtent": "1-0-0", "Amended_Kharab": "1-0-0",
+                              "Amended_Cultivable": "0-0-0", "Remark": "1-0-0"}
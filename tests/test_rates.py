@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rates import RateMaster, rate_master, read_rates, save_rates
+from records import LAND_TYPES
+
+VILLAGE = {"district": "D", "taluka": "T", "hobli": "H", "village": "V"}
+TABLE = ("district,taluka,hobli,village,land_type,rate\n"
+         f"D,T,H,V,{LAND_TYPES[0]},100.5\n"
+         f"d,t,h, v ,{LAND_TYPES[1]},2000\n")
+
+
+def rows(text):
+    import csv
+    import io
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def test_rates_are_kept_in_paise_per_village_and_land_type():
+    master = RateMaster.from_rows(rows(TABLE))
+    assert master.rate(VILLAGE, LAND_TYPES[0]) == 10050
+    # Village names match whatever their case and surrounding spaces
+    assert master.rate(VILLAGE, LAND_TYPES[1]) == 200000
+    assert master.rate(VILLAGE, LAND_TYPES[2]) is None
+    assert master.rate(dict(VILLAGE, village="W"), LAND_TYPES[0]) is None
+    assert master.village_rates(VILLAGE).tolist() == [10050, 200000, -1]
+
+
+def test_a_bad_row_is_named():
+    with pytest.raises(ValueError, match="Row 3: unknown land type"):
+        RateMaster.from_rows(rows(TABLE.replace(LAND_TYPES[1], "x")))
+    with pytest.raises(ValueError, match="Row 2: invalid rate"):
+        RateMaster.from_rows(rows(TABLE.replace("100.5", "-1")))
+    with pytest.raises(ValueError, match="Row 2: invalid rate"):
+        RateMaster.from_rows(rows(TABLE.replace("100.5", "")))
+
+
+def test_a_missing_table_has_no_rates(tmp_path):
+    assert len(rate_master(str(tmp_path / "rates.csv"))) == 0
+
+
+def test_the_table_is_read_again_only_after_it_changes(tmp_path):
+    path = str(tmp_path / "rates.csv")
+    save_rates(TABLE.encode(), path)
+    master = rate_master(path)
+    assert rate_master(path) is master
+    save_rates(TABLE.replace("100.5", "7").encode(), path)
+    stat = os.stat(path)
+    # Some filesystems keep coarse times, so make sure the change shows
+    os.utime(path, ns=(stat.st_atime_ns, master.version + 1_000_000_000))
+    assert rate_master(path).rate(VILLAGE, LAND_TYPES[0]) == 700
+
+
+@pytest.mark.parametrize("name", ["rates.csv", "rates.sqlite3"])
+def test_saved_tables_read_back(tmp_path, name):
+    path = str(tmp_path / name)
+    save_rates(TABLE.encode(), path)
+    assert [row["rate"] for row in read_rates(path)] == ["100.5", "2000"]
+    assert rate_master(path).rate(VILLAGE, LAND_TYPES[1]) == 200000
+
+
+def test_a_bad_upload_leaves_the_table_alone(tmp_path):
+    path = str(tmp_path / "rates.csv")
+    save_rates(TABLE.encode(), path)
+    with pytest.raises(ValueError):
+        save_rates(TABLE.replace("2000", "lots").encode(), path)
+    assert len(read_rates(path)) == 2
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import LAND_TYPES, SearchIndex
+
+TEXTS = ["11/1", "112", "112/1", "112/1*", "112/1/A", "112/2", "112/10", "1120/1", "1121/3", "9/9"]
+
+
+def search(query):
+    texts = np.array(TEXTS, dtype=object)
+    land_types = np.array([0] * (len(TEXTS) - 1) + [1])
+    index = SearchIndex(np.arange(len(TEXTS)) * 1024, texts, land_types)
+    return [TEXTS[i // 1024] for i in index.query(query)]
+
+
+def test_a_survey_number_finds_that_survey_and_all_its_hissas():
+    assert search("112") == ["112", "112/1", "112/1*", "112/2", "112/10", "112/1/A"]
+
+
+def test_a_survey_hissa_finds_itself_and_what_is_under_it():
+    assert search("112/1") == ["112/1", "112/1*", "112/1/A"]
+
+
+def test_a_trailing_slash_lists_the_survey_hissas_in_number_order():
+    assert search("112/") == ["112/1", "112/1*", "112/2", "112/10", "112/1/A"]
+
+
+def test_a_range_of_hissas():
+    assert search("112/1-112/2") == ["112/1", "112/1*", "112/2"]
+    assert search("1120 – 1121") == ["1120/1", "1121/3"]
+
+
+def test_land_types_by_name_and_other_text_by_prefix():
+    # Only 9/9 is ತರಿ land
+    assert search("ತರ") == ["9/9"]
+    assert search("zz") == []
+    assert len(search("  ")) == len(TEXTS)
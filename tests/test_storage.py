@@ -0,0 +1,117 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import ID_STEP, KJPStore, RowType
+from storage import VillageDB
+
+
+def two_sessions(tmp_path):
+    """Two sessions' stores of one village sheet, each with its Workspace"""
+    path = str(tmp_path / "village.sqlite3")
+    first, second = KJPStore(), KJPStore()
+    return first, VillageDB(path).load("kjp", first), second, VillageDB(path).load("kjp", second)
+
+
+def hissas(store):
+    return list(store.column("AsIs_SurveyHissa"))
+
+
+def saved_hissas(workspace):
+    return [row[0] for row in workspace.db.conn.execute("SELECT AsIs_SurveyHissa FROM kjp ORDER BY id")]
+
+
+def test_records_appended_at_the_same_time_get_different_ids(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    mine = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    theirs = second.append(RowType.DATA, AsIs_SurveyHissa="1/2")
+    assert theirs >= mine + ID_STEP
+    assert not first_workspace.conflicts and not second_workspace.conflicts
+    first_workspace.pull()
+    second_workspace.pull()
+    assert hissas(first) == hissas(second) == saved_hissas(first_workspace) == ["1/1", "1/2"]
+
+
+def test_reserve_ids_hands_out_ids_above_every_other(tmp_path):
+    db = VillageDB(str(tmp_path / "village.sqlite3"))
+    db.load("kjp", KJPStore())
+    first = db.reserve_ids("kjp", 3)
+    second = db.reserve_ids("kjp", 2, after=10 * ID_STEP + 7)
+    assert list(first) == [ID_STEP, 2 * ID_STEP, 3 * ID_STEP]
+    assert list(second) == [11 * ID_STEP + 7, 12 * ID_STEP + 7]
+
+
+def test_a_row_inserted_after_the_last_keeps_clear_of_appended_ids(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    a_row = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    second_workspace.pull()
+    # The other session appends without pulling the B row first, as a fragment rerun does
+    b_row = first.insert(first.position(a_row) + 1, RowType.KJP_ROW, AsIs_SurveyHissa="1/1")
+    other = second.append(RowType.DATA, AsIs_SurveyHissa="1/2")
+    assert a_row < b_row < other
+    assert not first_workspace.conflicts and not second_workspace.conflicts
+    first_workspace.pull()
+    second_workspace.pull()
+    assert first.fingerprint() == second.fingerprint()
+    assert second.pair(a_row) == b_row
+
+
+def test_a_stale_edit_is_refused_and_pulled_back(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    record_id = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    second_workspace.pull()
+    first.update(record_id, AsIs_SurveyHissa="1/1A")
+    second.update(record_id, AsIs_SurveyHissa="1/1B")
+    assert second_workspace.conflicts == {record_id}
+    assert saved_hissas(first_workspace) == ["1/1A"]
+    changed, conflicts = second_workspace.pull()
+    assert changed == conflicts == [record_id]
+    assert hissas(second) == ["1/1A"]
+
+
+def test_a_batch_is_saved_whole_or_not_at_all(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    a_row = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    second_workspace.pull()
+    first.update(a_row, AsIs_SurveyHissa="1/1A")
+    with second_workspace.batch():
+        second.update(a_row, AsIs_SurveyHissa="1/1B")
+        second.insert(second.position(a_row) + 1, RowType.KJP_ROW, AsIs_SurveyHissa="1/1B")
+    # The B row lost along with its A row
+    assert saved_hissas(first_workspace) == ["1/1A"]
+    second_workspace.pull()
+    assert first.fingerprint() == second.fingerprint()
+
+
+def test_pull_sees_a_deleted_id_used_again(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    a_row = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    b_row = first.insert(1, RowType.KJP_ROW, AsIs_SurveyHissa="1/1", Amended_TotalExtent=5)
+    second_workspace.pull()
+    # Dropping a B row and adding it back, as a KJP edit does, brings back the same id
+    first.delete(b_row)
+    assert first.insert(first.position(a_row) + 1, RowType.KJP_ROW, AsIs_SurveyHissa="1/1",
+                        Amended_TotalExtent=7) == b_row
+    changed, _ = second_workspace.pull()
+    assert changed == [b_row]
+    assert second.get(b_row)["Amended_TotalExtent"].aana == 7
+
+
+def test_deleting_a_record_both_sessions_deleted_is_no_conflict(tmp_path):
+    first, first_workspace, second, second_workspace = two_sessions(tmp_path)
+    record_id = first.append(RowType.DATA, AsIs_SurveyHissa="1/1")
+    second_workspace.pull()
+    first.delete(record_id)
+    second.delete(record_id)
+    assert not second_workspace.conflicts
+    assert second_workspace.pull() == ([], [])
+
+
+def test_a_village_is_loaded_back_in_one_read(tmp_path):
+    first, first_workspace, _, _ = two_sessions(tmp_path)
+    first.extend([RowType.DATA] * 3, AsIs_SurveyHissa=["1/1", "1/2", "1/3"], AsIs_TotalExtent=[640, 320, 16])
+    reloaded = KJPStore()
+    VillageDB(first_workspace.db.path).load("kjp", reloaded)
+    assert reloaded.fingerprint() == first.fingerprint()
+    assert list(reloaded.ids()) == list(first.ids())